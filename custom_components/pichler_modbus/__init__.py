@@ -1,7 +1,8 @@
 """The SolaX Modbus Integration."""
 
 import asyncio
-from datetime import timedelta
+from collections import ChainMap
+from dataclasses import replace
 
 # import importlib.util, sys
 import importlib
@@ -12,8 +13,6 @@ from types import ModuleType, SimpleNamespace
 from typing import Any, Optional
 from weakref import ref as WeakRef
 
-from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
-
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import (
     CONF_HOST,
@@ -24,9 +23,10 @@ from homeassistant.const import (
 )
 from homeassistant.core import HomeAssistant, callback
 import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.storage import Store
 
 try:
     from homeassistant.components.modbus import ModbusHub as CoreModbusHub, get_hub as get_core_hub
@@ -39,6 +39,22 @@ except ImportError:
         """place holder dummy"""
 
 
+from .transport import acquire_link, lost_frame, release_link, request_group, request_priority
+from .writequeue import DeferredWriteQueue
+from .aggregate import Aggregator
+from .blockhealth import BlockHealth, GroupHealth
+from .decoder import BlockDecoder, decode_registers
+from .datastore import DataStore
+from .planner import (
+    block_cost,
+    keyFragments,
+    matchesFragment,
+    mergeRegisterMaps,
+    planBlocks,
+    readsData,
+    referencedKeys,
+    registerWidth,
+)
 from .sensor import SolaXModbusSensor
 
 _LOGGER = logging.getLogger(__name__)
@@ -61,7 +77,7 @@ _LOGGER = logging.getLogger(__name__)
 from pymodbus.constants import Endian
 from pymodbus.exceptions import ConnectionException, ModbusIOException
 from pymodbus.payload import BinaryPayloadBuilder, BinaryPayloadDecoder, Endian
-from pymodbus.framer import FramerType
+from pymodbus.pdu import ExceptionResponse
 
 from .const import (
     INVERTER_IDENT,
@@ -73,6 +89,7 @@ from .const import (
     CONF_READ_EPS,
     CONF_SERIAL_PORT,
     CONF_TCP_TYPE,
+    CONF_TCP_WINDOW,
     CONF_INVERTER_NAME_SUFFIX,
     CONF_CORE_HUB,
     DEFAULT_INVERTER_NAME_SUFFIX,
@@ -86,7 +103,10 @@ from .const import (
     DEFAULT_READ_EPS,
     DEFAULT_SCAN_INTERVAL,
     DEFAULT_SERIAL_PORT,
+    DEFAULT_CYCLE_DEADLINE,
+    DEFAULT_SLEEP_PROBE_INTERVAL,
     DEFAULT_TCP_TYPE,
+    DEFAULT_TCP_WINDOW,
     DOMAIN,
     REGISTER_S16,
     REGISTER_S32,
@@ -98,6 +118,27 @@ from .const import (
     REGISTER_ULSB16MSB16,
     REGISTER_WORDS,
     SCAN_GROUP_DEFAULT,
+    BLOCK_COST_TCP,
+    BLOCK_COST_RTU_OVER_TCP,
+    BLOCK_COST_SERIAL_TURNAROUND,
+    CONF_CYCLE_DEADLINE,
+    CONF_PUBLISH_DEADBAND_RELATIVE,
+    CONF_PUBLISH_MAX_INTERVAL,
+    CONF_PUBLISH_MIN_INTERVAL,
+    CONF_SCAN_INTERVAL_FAST,
+    CONF_SCAN_INTERVAL_MEDIUM,
+    CONF_SLEEP_PROBE_INTERVAL,
+    EVENT_LINK_HEALTH,
+    LINK_RETRIES,
+    POLL_TICK_TOLERANCE,
+    PUBLISH_FORCE_CYCLES,
+    PRIORITY_AUTOREPEAT,
+    PRIORITY_READ_FAST,
+    PRIORITY_READ_MEDIUM,
+    PRIORITY_READ_SLOW,
+    PRIORITY_WRITE,
+    READ_RETRY_BUDGET,
+    UNREADABLE_REPROBE_INTERVAL,
     # PLUGIN_PATH,
     SLEEPMODE_LASTAWAKE,
 )
@@ -199,7 +240,8 @@ async def async_unload_entry(hass, entry):
     """Unload SolaX mobus entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
-    hass.data[DOMAIN].pop(entry.options["name"])
+    hub = hass.data[DOMAIN].pop(entry.options["name"])["hub"]
+    await hub.async_close()
     return unload_ok
 
 
@@ -247,50 +289,79 @@ class SolaXModbusHub:
         """Initialize the Modbus hub."""
         _LOGGER.debug(f"solax modbushub creation with interface {interface} baudrate (only for serial): {baudrate}")
         self._hass = hass
-        if interface == "serial":
-            self._client = AsyncModbusSerialClient(
-                port=serial_port,
+        self._link = None  # shared modbus link (client and request scheduler), not used for the core hub
+        self._pipeline = None  # pipelined reads for plain modbus tcp, when enabled
+        if interface in ("serial", "tcp"):
+            self._link = acquire_link(
+                name,
+                interface,
+                host=host,
+                port=port,
+                tcp_type=tcp_type,
+                serial_port=serial_port,
                 baudrate=baudrate,
-                parity="N",
-                stopbits=1,
-                bytesize=8,
-                timeout=3,
-                retries=6,
+                window=int(config.get(CONF_TCP_WINDOW, DEFAULT_TCP_WINDOW)),
             )
-        elif interface == "tcp":
-            if tcp_type == "rtu":
-                self._client = AsyncModbusTcpClient(host=host, port=port, timeout=5, framer=FramerType.RTU, retries=6)
-            elif tcp_type == "ascii":
-                self._client = AsyncModbusTcpClient(
-                    host=host, port=port, timeout=5, framer=FramerType.ASCII, retries=6
-                )
-            else:
-                self._client = AsyncModbusTcpClient(host=host, port=port, timeout=5, retries=6)
+            self._client = self._link.client
+            self._pipeline = self._link.pipeline
+            self._link.listeners.append(self.link_health_changed)
         self._lock = asyncio.Lock()
         self._name = name
         self.inverterNameSuffix = config.get(CONF_INVERTER_NAME_SUFFIX)
         self._modbus_addr = modbus_addr
         self._seriesnumber = "still unknown"
         self.interface = interface
+        self.tcp_type = tcp_type
         self.read_serial_port = serial_port
         self._baudrate = int(baudrate)
         self.groups = {}  # group info, below
-        self.empty_interval_group = lambda: SimpleNamespace(interval=0, unsub_interval_method=None, device_groups={})
+        self.empty_interval_group = lambda: SimpleNamespace(
+            interval=0,
+            next_run=None,  # loop time of the next tick
+            device_groups={},
+            # cycle timing: lateness of the last tick, skipped ticks after overruns, cycles merged with other groups
+            timing=SimpleNamespace(
+                cycles=0,
+                overruns=0,
+                skipped=0,
+                merged=0,
+                lateness=0.0,
+                max_lateness=0.0,
+                duration=0.0,
+                deadline_misses=0,  # cycles that deferred blocks to the next tick
+            ),
+        )
+        self._poll_task = None
+        self._poll_wakeup = asyncio.Event()
+        self._merged_groups = {}  # (device key, due intervals) -> (component signature, merged device group)
         self.empty_device_group = lambda: SimpleNamespace(
             sensors=[],
-            inputBlocks={},
-            holdingBlocks={},
+            inputRegs={},
+            holdingRegs={},
+            inputBlocks=[],
+            holdingBlocks=[],
+            unreadable=[],  # descriptions of registers the device rejects
+            rotation=0,  # index of the block read first: the first one the cycle deadline deferred last time
             readPreparation=None,  # function to call before read group
             readFollowUp=None,  # function to call after read group
         )
-        self.data = {"_repeatUntil": {}}  # _repeatuntil contains button autorepeat expiry times
+        self.data = DataStore()  # all data keys; a dict-like view for the plugins
+        self.data["_repeatUntil"] = {}  # _repeatuntil contains button autorepeat expiry times
         self.tmpdata = {}  # for WRITE_DATA_LOCAL entities with corresponding prevent_update number/sensor
         self.tmpdata_expiry = {}  # expiry timestamps for tempdata
         self.cyclecount = 0  # temporary - remove later
-        self.slowdown = (
-            1  # slow down factor when modbus is not responding: 1 : no slowdown, 10: ignore 9 out of 10 cycles
-        )
+        self.readFailing = False  # the group being read failed before; we only avoid repeated logging
+        self.keyEntities = {}  # key -> entities showing it, to write only the states that changed
+        self.changedKeys = set()  # keys whose value changed in the last device group read
+        self.publishStats = {"published": 0, "forced": 0, "suppressed": 0, "deadband": 0, "interval": 0}
+        self.lastPublished = {}  # entity -> (published value, time)
+        self.publishPending = {}  # entities with a change held back by their minimum publish interval
+        self._publishFilters = {}  # key -> effective publish filter
+        self.aggregator = Aggregator()  # samples of aggregated sensors, see aggregate_interval
+        self.aggregatedKeys = {}  # key -> (description, poll interval) of the sensors publishing an aggregate
         self.computedSensors = {}
+        self.computedOrder = []  # (description, input keys, evaluate always) in dependency order
+        self.computedStats = {"evaluated": 0, "skipped": 0}
         self.computedButtons = {}
         self.computedSwitches = {}
         self.sensorEntities = {}  # all sensor entities, indexed by key
@@ -298,9 +369,29 @@ class SolaXModbusHub:
         self.switchEntities = {}
         # self.preventSensors = {} # sensors with prevent_update = True
         self.writeLocals = {}  # key to description lookup dict for write_method = WRITE_DATA_LOCAL entities
+        self.disabledKeys = set()  # keys of sensors whose entity is disabled: not read unless required
+        self.requiredKeys = set()  # keys used by code: computed sensors, numbers, selects, switches, plugin
+        self.requiredFragments = set()  # partial keys used by code, e.g. prefixes of generated keys
         self.sleepzero = []  # sensors that will be set to zero in sleepmode
         self.sleepnone = []  # sensors that will be cleared in sleepmode
-        self.writequeue = {}  # queue requests when inverter is in sleep mode
+        self.asleep = False  # isAwake turned false: only the wake_keys of the plugin are polled
+        self.sleepGroup = None  # device group reading the registers of the wake_keys
+        self.nextWakeProbe = 0.0
+        self.sleepStats = {"sleeps": 0, "probes": 0}
+        self.writequeue = DeferredWriteQueue(hass, name)  # writes to repeat when the inverter wakes up
+        self.unreadable = {"holding": {}, "input": {}}  # learned rejected (start, end) ranges -> time learned
+        self.unreadableReprobed = {"holding": set(), "input": set()}  # expired ranges, probed again
+        self.blockHealth = {}  # (register type, start, end) -> BlockHealth of the planned blocks
+        self.groupHealth = {}  # (interval, device key) -> GroupHealth of the device groups
+        self.retryBudget = 0  # resends of unanswered block reads left in the running device group read
+        self.retryStats = {"retried": 0, "exhausted": 0}
+        self.cycleDeadline = None  # loop time by which the running cycle has to be done, None: no limit
+        self.deadlineMissed = False  # the running cycle deferred blocks
+        self.deadlineStats = {"deferred": 0, "cancelled": 0}  # blocks deferred to the next tick, reads cancelled
+        self.unreadableUpdated = False
+        self._unreadable_stored = {}
+        self._unreadable_key = None
+        self._unreadable_store = Store(hass, self.UNREADABLE_STORAGE_VERSION, f"{DOMAIN}.{name}_unreadable")
         _LOGGER.debug(f"{self.name}: ready to call plugin to determine inverter type")
         self.plugin = plugin.plugin_instance  # getPlugin(name).plugin_instance
         self.wakeupButton = None
@@ -322,6 +413,9 @@ class SolaXModbusHub:
                 _LOGGER.info("next inverter check in 10sec")
                 await asyncio.sleep(10)
 
+        await self.async_load_unreadable()
+        await self.writequeue.async_load()
+
         plugin_name = self.plugin.plugin_name
         if self.inverterNameSuffix is not None and self.inverterNameSuffix != "":
             plugin_name = plugin_name + " " + self.inverterNameSuffix
@@ -391,6 +485,14 @@ class SolaXModbusHub:
 
         return g
 
+    def read_priority(self, interval):
+        """Scheduler priority class of the reads of an interval group."""
+        if interval <= self.config.get(CONF_SCAN_INTERVAL_FAST, DEFAULT_SCAN_INTERVAL):
+            return PRIORITY_READ_FAST
+        if interval <= self.config.get(CONF_SCAN_INTERVAL_MEDIUM, DEFAULT_SCAN_INTERVAL):
+            return PRIORITY_READ_MEDIUM
+        return PRIORITY_READ_SLOW
+
     def device_group_key(self, device_info: DeviceInfo):
         key = ""
         for identifier in device_info["identifiers"]:
@@ -400,26 +502,116 @@ class SolaXModbusHub:
 
         return key
 
+    def block_cost(self):
+        """Return the block planner cost model for the transport of this hub."""
+        if self.interface == "serial":
+            # 11 bit times per byte (start, 8 data, parity or stop, stop), 2 bytes per register
+            byte_ms = 11 * 1000.0 / self._baudrate
+            request, register = (8 + 5) * byte_ms + 2 * 3.5 * byte_ms + BLOCK_COST_SERIAL_TURNAROUND, 2 * byte_ms
+        elif self.interface == "tcp" and self.tcp_type in ("rtu", "ascii"):
+            request, register = BLOCK_COST_RTU_OVER_TCP
+        else:
+            request, register = BLOCK_COST_TCP
+        if self.plugin.block_request_cost is not None:
+            request = self.plugin.block_request_cost
+        if self.plugin.block_register_cost is not None:
+            register = self.plugin.block_register_cost
+        return block_cost(request=request, register=register, max_registers=self.plugin.block_size)
+
     @callback
     async def async_add_solax_modbus_sensor(self, sensor: SolaXModbusSensor):
         """Listen for data updates."""
-        # This is the first sensor, set up interval.
         interval = self.entity_group(sensor)
         interval_group = self.groups.setdefault(interval, self.empty_interval_group())
-        if not interval_group.device_groups:
-            interval_group.interval = interval
-
-            async def _refresh(_now: Optional[int] = None) -> None:
-                await self._check_connection()
-                await self.async_refresh_modbus_data(interval_group, _now)
-
-            interval_group.unsub_interval_method = async_track_time_interval(
-                self._hass, _refresh, timedelta(seconds=interval)
-            )
-
+        interval_group.interval = interval
         device_key = self.device_group_key(sensor.device_info)
         grp = interval_group.device_groups.setdefault(device_key, self.empty_device_group())
         grp.sensors.append(sensor)
+        self.keyEntities.setdefault(sensor.entity_description.key, []).append(sensor)
+        aggregate = getattr(sensor.entity_description, "aggregate", None)
+        if aggregate in Aggregator.AGGREGATES:
+            self.aggregatedKeys[sensor.entity_description.key] = (sensor.entity_description, interval)
+        elif aggregate:
+            _LOGGER.warning(f"{self._name}: unknown aggregate {aggregate} of {sensor.entity_description.key}, ignored")
+        # This is the first sensor, start polling; a new interval group is picked up by the running loop.
+        if self._poll_task is None:
+            self._poll_task = self._hass.async_create_background_task(
+                self.async_polling_loop(), f"{DOMAIN} {self._name} polling"
+            )
+        else:
+            self._poll_wakeup.set()
+
+    async def async_polling_loop(self):
+        """Poll all interval groups, one cycle at a time, on a common grid of ticks.
+
+        Every group ticks at multiples of its interval from the same start time, so with harmonic intervals
+        (5/15/60s) the ticks of slower groups coincide with ticks of the faster ones. Groups due on the same
+        tick are read in one pass over the union of their registers. Ticks are scheduled from the start, not
+        from the end of the previous cycle, so there is no drift; a cycle that overruns the interval of a
+        group skips the ticks that group missed instead of queueing them.
+        """
+        loop = asyncio.get_running_loop()
+        epoch = loop.time()
+        while self.groups:
+            now = loop.time()
+            interval_groups = [grp for grp in self.groups.values() if grp.interval]
+            for interval_group in interval_groups:
+                if interval_group.next_run is None:  # first tick of the group on the common grid
+                    interval_group.next_run = epoch + (int((now - epoch) // interval_group.interval) + 1) * (
+                        interval_group.interval
+                    )
+            next_run = min((grp.next_run for grp in interval_groups), default=now + DEFAULT_SCAN_INTERVAL)
+            if next_run > now:
+                self._poll_wakeup.clear()
+                try:  # until the next tick, or until a new interval group shows up
+                    await asyncio.wait_for(self._poll_wakeup.wait(), next_run - now)
+                    continue
+                except asyncio.TimeoutError:
+                    pass
+            start = loop.time()
+            due = [grp for grp in interval_groups if grp.next_run <= start + POLL_TICK_TOLERANCE]
+            if not due:
+                continue
+            for interval_group in due:
+                timing = interval_group.timing
+                timing.lateness = max(0.0, start - interval_group.next_run)
+                timing.max_lateness = max(timing.max_lateness, timing.lateness)
+                timing.cycles += 1
+                if len(due) > 1:
+                    timing.merged += 1
+                if self._link is not None:  # faster groups get more consecutive turns on a busy link
+                    self._link.set_weight(
+                        self._modbus_addr, interval_group.interval, round(max(self.groups) / interval_group.interval)
+                    )
+            fastest = min(grp.interval for grp in due)
+            request_group.set(fastest)  # runs in its own task, so this only tags the requests of this loop
+            request_priority.set(self.read_priority(fastest))
+            budget = self.config.get(CONF_CYCLE_DEADLINE, DEFAULT_CYCLE_DEADLINE)
+            self.cycleDeadline = start + fastest * budget / 100 if budget else None
+            self.deadlineMissed = False
+            try:
+                await self._check_connection()
+                await self.async_refresh_modbus_data(due)
+            except Exception:
+                _LOGGER.exception(f"{self._name}: polling of the {[grp.interval for grp in due]}s groups failed")
+            self.cycleDeadline = None
+            end = loop.time()
+            for interval_group in due:
+                timing = interval_group.timing
+                timing.duration = end - start
+                if self.deadlineMissed:
+                    timing.deadline_misses += 1
+                interval_group.next_run += interval_group.interval
+                if interval_group.next_run <= end:
+                    missed = int((end - interval_group.next_run) // interval_group.interval) + 1
+                    timing.overruns += 1
+                    timing.skipped += missed
+                    interval_group.next_run += missed * interval_group.interval
+                    _LOGGER.debug(
+                        f"{self._name}: {interval_group.interval}s cycle took {timing.duration:.1f}s, "
+                        f"skipping {missed} ticks"
+                    )
+        self._poll_task = None
 
     @callback
     async def async_remove_solax_modbus_sensor(self, sensor):
@@ -436,42 +628,282 @@ class SolaXModbusHub:
 
         _LOGGER.debug(f"remove sensor {sensor.entity_description.key}")
         grp.sensors.remove(sensor)
+        self.keyEntities[sensor.entity_description.key].remove(sensor)
+        if not self.keyEntities[sensor.entity_description.key]:
+            self.aggregatedKeys.pop(sensor.entity_description.key, None)
+        self.lastPublished.pop(sensor, None)
+        self.publishPending.pop(sensor, None)
 
         if not grp.sensors:
             interval_group.device_groups.pop(device_key)
 
             if not interval_group.device_groups:
-                # stop the interval timer upon removal of last device group from interval group
-                interval_group.unsub_interval_method()
-                interval_group.unsub_interval_method = None
+                # the polling loop drops the interval group with the removal of its last device group
                 self.groups.pop(interval)
 
                 if not self.groups:
-                    await self.async_close()
+                    # stop polling upon removal of the last interval group; the link is kept for writes and
+                    # for sensors added again, async_unload_entry releases it
+                    if self._poll_task is not None:
+                        self._poll_task.cancel()
+                        self._poll_task = None
 
-    async def async_refresh_modbus_data(self, interval_group, _now: Optional[int] = None) -> None:
-        """Time to update."""
+    def merged_device_group(self, key, components):
+        """Device group that reads the registers of the same device in several interval groups in one pass.
+
+        The merged plan is cached until one of the component groups is planned again.
+        """
+        signature = tuple(
+            (id(grp), id(grp.holdingRegs), id(grp.inputRegs), id(grp.holdingBlocks), id(grp.inputBlocks))
+            for grp in components
+        )
+        cached = self._merged_groups.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        merged = self.empty_device_group()
+        merged.readPreparation = components[0].readPreparation
+        merged.readFollowUp = components[0].readFollowUp
+        merged.holdingRegs = mergeRegisterMaps([grp.holdingRegs for grp in components])
+        merged.inputRegs = mergeRegisterMaps([grp.inputRegs for grp in components])
+        self.plan_device_group(merged)
+        self._merged_groups[key] = (signature, merged)
+        return merged
+
+    async def async_refresh_modbus_data(self, interval_groups) -> None:
+        """Time to update the interval groups that are due on this tick."""
         self.cyclecount = self.cyclecount + 1
-        if not interval_group.device_groups:
+        if self.asleep and not await self.async_probe_wake():
             return
-
-        if (self.cyclecount % self.slowdown) == 0:  # only execute once every slowdown count
-            for group in interval_group.device_groups.values():
-                update_result = await self.async_read_modbus_data(group)
-                if update_result:
-                    self.slowdown = 1  # return to full polling after succesfull cycle
-                    for sensor in group.sensors:
-                        sensor.modbus_data_updated()
-                else:
-                    _LOGGER.debug(f"assuming sleep mode - slowing down by factor 10")
-                    self.slowdown = 10
+        device_keys = dict.fromkeys(key for grp in interval_groups for key in grp.device_groups)
+        wake_keys = self.plugin.wake_keys or ()
+        wake_read = False  # a device group with a wake_key was read in this cycle
+
+        # each device group of an interval group fails and backs off on its own, e.g. a battery that does not
+        # answer does not hold back the inverter; while the link is backing off, the reads fail immediately
+        for device_key in device_keys:
+            due = [
+                grp
+                for grp in interval_groups
+                if device_key in grp.device_groups and self.group_health(grp.interval, device_key).due()
+            ]
+            if not due:
+                continue
+            components = [grp.device_groups[device_key] for grp in due]
+            if len(components) == 1:
+                group = components[0]
+            else:  # coinciding ticks: one read pass over the union of the registers
+                group = self.merged_device_group((device_key, tuple(grp.interval for grp in due)), components)
+            # every PUBLISH_FORCE_CYCLES cycles of a group (starting with the first), all its entities are written
+            forced = [
+                grp.device_groups[device_key] for grp in due if (grp.timing.cycles - 1) % PUBLISH_FORCE_CYCLES == 0
+            ]
+            healths = [self.group_health(grp.interval, device_key) for grp in due]
+            self.readFailing = any(health.failing for health in healths)
+            self.changedKeys = set()
+            update_result = await self.async_read_modbus_data(group)
+            if update_result:
+                self.publish_changes(components, forced)
+                wake_read = wake_read or any(
+                    sensor.entity_description.key in wake_keys for grp in components for sensor in grp.sensors
+                )
+            elif update_result is None:
+                _LOGGER.debug(f"device group {device_key} not ready")
+            else:
+                _LOGGER.debug(f"assuming sleep mode")
+                if not self.readFailing:  # the sleep values of its entities stay until its next successful read
+                    keys = {sensor.entity_description.key for grp in components for sensor in grp.sensors}
                     for i in self.sleepnone:
-                        self.data.pop(i, None)
+                        if i in keys:
+                            self.data.pop(i, None)
                     for i in self.sleepzero:
-                        self.data[i] = 0
-                    # self.data = {} # invalidate data - do we want this ??
+                        if i in keys:
+                            self.data[i] = 0
+                # self.data = {} # invalidate data - do we want this ??
+            # failures while the whole link is down are left to its circuit breaker
+            counted = self._link is None or not self._link.circuit_open
+            for grp, health in zip(due, healths):
+                change = health.record(bool(update_result), counted)
+                if change == "backing_off":
+                    _LOGGER.warning(
+                        f"{self._name}: device group {device_key} of the {grp.interval}s group keeps failing, "
+                        f"reading it less often"
+                    )
+                elif change == "recovered":
+                    _LOGGER.info(
+                        f"{self._name}: device group {device_key} of the {grp.interval}s group readable again"
+                    )
+
+            _LOGGER.debug(f"device group read done")
+
+        interval = self.config.get(CONF_SLEEP_PROBE_INTERVAL, DEFAULT_SLEEP_PROBE_INTERVAL)
+        if interval and wake_read and any(key in self.data for key in wake_keys):
+            if not self.plugin.isAwake(self.data):
+                self.enter_sleep(interval)
+
+    def sleep_group(self):
+        """Device group reading only the registers of the wake_keys of the plugin, None when none is polled."""
+        wake_keys = set(self.plugin.wake_keys)
+        group = self.empty_device_group()
+        holding, inputs = [], []  # wake registers of every device group, merged and sorted for the planner
+        for interval_group in self.groups.values():
+            for device_group in interval_group.device_groups.values():
+                for regs, wake_maps in ((device_group.holdingRegs, holding), (device_group.inputRegs, inputs)):
+                    wake_regs = {}
+                    for reg, descr in regs.items():
+                        keys = [sub.key for sub in descr.values()] if type(descr) is dict else [descr.key]
+                        if not wake_keys.isdisjoint(keys):
+                            wake_regs[reg] = descr
+                    wake_maps.append(wake_regs)
+                group.sensors += [
+                    sensor for sensor in device_group.sensors if sensor.entity_description.key in wake_keys
+                ]
+        group.holdingRegs = mergeRegisterMaps(holding)
+        group.inputRegs = mergeRegisterMaps(inputs)
+        if not group.holdingRegs and not group.inputRegs:
+            return None
+        self.plan_device_group(group)
+        return group
+
+    def enter_sleep(self, interval):
+        """Poll only the wake_keys from now on; the sleep values are set and published once."""
+        self.sleepGroup = self.sleep_group()
+        if self.sleepGroup is None:
+            return
+        self.asleep = True
+        self.sleepStats["sleeps"] += 1
+        self.nextWakeProbe = time() + interval
+        _LOGGER.info(
+            f"{self._name}: inverter is asleep, checking {', '.join(self.plugin.wake_keys)} every {interval}s"
+        )
+        for key in self.sleepnone:
+            self.data.pop(key, None)
+        for key in self.sleepzero:
+            self.data[key] = 0
+        self.changedKeys = set(self.sleepnone) | set(self.sleepzero)
+        self.publish_changes([], [])
+
+    async def async_probe_wake(self):
+        """Read the wake_keys when their probe is due; return True when the inverter woke up."""
+        now = time()
+        if now < self.nextWakeProbe:
+            return False
+        self.nextWakeProbe = now + self.config.get(CONF_SLEEP_PROBE_INTERVAL, DEFAULT_SLEEP_PROBE_INTERVAL)
+        self.sleepStats["probes"] += 1
+        self.changedKeys = set()
+        if not await self.async_read_modbus_data(self.sleepGroup):
+            return False
+        if self.plugin.isAwake(self.data):
+            _LOGGER.info(f"{self._name}: inverter woke up, polling all groups again")
+            self.asleep = False
+            return True
+        self.publish_changes([self.sleepGroup], [])
+        return False
+
+    def expire_holds(self):
+        """End the prevent_update holds that expired; return their keys."""
+        now = time()
+        expired = [key for key, expiry in self.tmpdata_expiry.items() if 0 < expiry <= now]
+        for key in expired:
+            self.tmpdata_expiry[key] = 0
+        if expired:
+            self.localsUpdated = True
+        return expired
+
+    def update_entity_values(self):
+        """Recompute the state values of all entities, after local data or a read_scale changed."""
+        for entities in self.keyEntities.values():
+            for entity in entities:
+                entity.update_value()
+
+    def publish_filter(self, descr):
+        """Effective publish filter of an entity description: entry options, description, plugin defaults."""
+        filt = self._publishFilters.get(descr.key)
+        if filt is None:
+            defaults = {}
+            if self.plugin.publish_defaults:
+                device_class = getattr(descr, "device_class", None)
+                unit = getattr(descr, "native_unit_of_measurement", None)
+                defaults = self.plugin.publish_defaults.get(
+                    (device_class, unit), self.plugin.publish_defaults.get((device_class, None), {})
+                )
+            filt = SimpleNamespace()
+            for field, option in (
+                ("publish_deadband", None),
+                ("publish_deadband_relative", CONF_PUBLISH_DEADBAND_RELATIVE),
+                ("publish_min_interval", CONF_PUBLISH_MIN_INTERVAL),
+                ("publish_max_interval", CONF_PUBLISH_MAX_INTERVAL),
+            ):
+                value = self.config.get(option) if option else None
+                if value and option == CONF_PUBLISH_DEADBAND_RELATIVE:
+                    value = value / 100  # entered in percent
+                if not value:
+                    value = getattr(descr, field, None)
+                if value is None:
+                    value = defaults.get(field)
+                setattr(filt, field.removeprefix("publish_"), value or 0)
+            self._publishFilters[descr.key] = filt
+        return filt
+
+    def publish_held(self, entity, now):
+        """Reason to hold back the state of an entity ("deadband" or "interval"), None to publish it."""
+        last = self.lastPublished.get(entity)
+        if last is None:
+            return None
+        value, published = last
+        filt = self.publish_filter(entity.entity_description)
+        if now - published < filt.min_interval:
+            return "interval"
+        if filt.max_interval and now - published >= filt.max_interval:
+            return None  # heartbeat
+        new = getattr(entity, "native_value", None)
+        if isinstance(new, (int, float)) and isinstance(value, (int, float)):
+            if abs(new - value) < max(filt.deadband, abs(value) * filt.deadband_relative):
+                return "deadband"
+        return None
+
+    def publish_changes(self, components, forced):
+        """Write the state of the entities whose keys changed in the last read, wherever their group is.
 
-                _LOGGER.debug(f"device group read done")
+        Changes within the deadband of an entity are dropped, changes within its minimum publish interval
+        are held back until the interval has passed. Entities with a maximum publish interval are written
+        again when it expires. The other entities of the read device groups keep their state, except in
+        the forced groups.
+        """
+        now = time()
+        stats = self.publishStats
+        candidates = dict.fromkeys(entity for key in self.changedKeys for entity in self.keyEntities.get(key, ()))
+        for entity in candidates:  # the state values of the other entities did not change
+            entity.update_value()
+        candidates.update(self.publishPending)
+        for grp in components:  # heartbeats
+            for sensor in grp.sensors:
+                filt = self.publish_filter(sensor.entity_description)
+                last = self.lastPublished.get(sensor)
+                if filt.max_interval and last is not None and now - last[1] >= filt.max_interval:
+                    candidates[sensor] = None
+        entities = {}
+        self.publishPending = {}
+        for entity in candidates:
+            reason = self.publish_held(entity, now)
+            if reason is None:
+                entities[entity] = None
+            else:
+                stats[reason] += 1
+                if reason == "interval":
+                    self.publishPending[entity] = None
+        published = len(entities)
+        for grp in forced:
+            for sensor in grp.sensors:
+                if sensor not in entities:
+                    sensor.update_value()  # also picks up data written outside of the read cycles
+                    entities[sensor] = None
+        for entity in entities:
+            self.publishPending.pop(entity, None)
+            entity.modbus_data_updated()
+            self.lastPublished[entity] = (getattr(entity, "native_value", None), now)
+        stats["published"] += published
+        stats["forced"] += len(entities) - published
+        stats["suppressed"] += sum(1 for grp in components for sensor in grp.sensors if sensor not in entities)
 
     @property
     def invertertype(self):
@@ -495,74 +927,236 @@ class SolaXModbusHub:
         return self._name
 
     async def async_close(self):
-        """Disconnect client."""
-        if self._client.connected:
-            self._client.close()
+        """Release the shared modbus link; it is disconnected when no other hub uses it."""
+        if self._link is not None:
+            self._link.listeners.remove(self.link_health_changed)
+            release_link(self._name, self._link)
+            self._link = None
+
+    def link_health_changed(self, key, previous, state):
+        """Announce health transitions of the modbus link as events, e.g. for automations or notifications."""
+        self._hass.bus.async_fire(
+            EVENT_LINK_HEALTH, {"hub": self._name, "link": key, "previous": previous, "state": state}
+        )
 
-    # async def async_connect(self):
-    #    """Connect client."""
-    #    _LOGGER.debug("connect modbus")
-    #    if not self._client.connected:
-    #        async with self._lock:
-    #            await self._client.connect()
+    def computed_inputs(self, descr, known):
+        """The data keys a computed sensor reads: declared in depends_on or inferred from its value function."""
+        if descr.depends_on is not None:
+            return set(descr.depends_on)
+        strings = referencedKeys(descr.value_function)
+        inputs = strings & known
+        fragments = keyFragments(strings - inputs)  # generated keys, e.g. per battery
+        inputs |= {key for key in known if matchesFragment(key, fragments)}
+        inputs.discard(descr.key)  # reading its own previous value is no dependency
+        return inputs
+
+    def plan_computed_sensors(self):
+        """Order the computed sensors so that each one is evaluated after the computed sensors it reads.
+
+        Sensors without known inputs, and those reading the autorepeat state, depend on more than the data
+        keys and are evaluated after every read. Sensors in a dependency cycle are evaluated after every read
+        as well, after all others, in declaration order.
+        """
+        known = set(self.sensorEntities) | set(self.computedSensors)
+        inputs = {key: self.computed_inputs(descr, known) for key, descr in self.computedSensors.items()}
+        pending = {key: inputs[key] & set(self.computedSensors) for key in self.computedSensors}
+        order = []
+        while True:
+            ready = [key for key, deps in pending.items() if not deps]
+            if not ready:
+                break
+            for key in ready:
+                order.append(key)
+                del pending[key]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        if pending:
+            _LOGGER.error(f"{self._name}: computed sensors with cyclic dependencies: {', '.join(pending)}")
+        self.computedOrder = [
+            (
+                self.computedSensors[key],
+                frozenset(inputs[key]),
+                not inputs[key] or "_repeatUntil" in inputs[key] or key in pending,
+            )
+            for key in order + list(pending)
+        ]
 
-    async def _check_connection(self):
-        if not self._client.connected:
-            _LOGGER.info("Inverter is not connected, trying to connect")
-            return await self.async_connect()
+    def evaluate_computed_sensors(self, data):
+        """Evaluate the computed sensors whose inputs changed in this read, in dependency order.
 
-        return self._client.connected
+        The value functions see the values of this read on top of the last known values of all other keys.
+        """
+        changed = data.changed()
+        context = ChainMap(data, self.data)
+        for descr, inputs, always in self.computedOrder:
+            if not always and inputs.isdisjoint(changed):
+                self.computedStats["skipped"] += 1
+                continue
+            self.computedStats["evaluated"] += 1
+            value = descr.value_function(0, descr, context)
+            data[descr.key] = value
+            if descr.key not in self.data or self.data[descr.key] != value:
+                changed.add(descr.key)
+
+    def block_statistics(self):
+        """Payload cache hits and misses per planned block, summed over the groups that read the same range."""
+        groups = [grp for interval_group in self.groups.values() for grp in interval_group.device_groups.values()]
+        groups += [merged for _, merged in self._merged_groups.values()]
+        stats = {}
+        for grp in groups:
+            for typ, blocks in (("holding", grp.holdingBlocks), ("input", grp.inputBlocks)):
+                for block in blocks:
+                    if block.cache is None:
+                        continue
+                    entry = stats.setdefault(f"{typ} 0x{block.start:x}-0x{block.end - 1:x}", {"hits": 0, "misses": 0})
+                    entry["hits"] += block.cache.hits
+                    entry["misses"] += block.cache.misses
+        return stats
 
-    async def async_connect(self):
-        result = False
+    async def async_read_blocks(self, data, reads):
+        """Read the blocks of a device group until the cycle deadline; return their results, None if deferred.
 
-        _LOGGER.debug(
-            "Trying to connect to Inverter at %s:%s",
-            self._client.comm_params.host,
-            self._client.comm_params.port,
-        )
+        The first block is always read, so every cycle makes progress. Reads that are still pending at the
+        deadline are cancelled; a request already sent completes in the background, see ModbusLink.call.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = self.cycleDeadline
+        if self._pipeline is not None and self._pipeline.active:
+            # issue all block reads at once, the link grants up to the pipeline window of them at a time
+            tasks = [asyncio.ensure_future(self.async_read_modbus_block(data, block, typ)) for block, typ, _ in reads]
+            if tasks:
+                await asyncio.wait(tasks, timeout=None if deadline is None else max(deadline - loop.time(), 0))
+                await asyncio.wait(tasks[:1])
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            self.deadlineStats["cancelled"] += sum(1 for task in pending if task.cancelled())
+            return [None if task.cancelled() else task.result() for task in tasks]
+        delivered = []
+        for block, typ, _ in reads:
+            timeout = None if deadline is None or not delivered else deadline - loop.time()
+            if timeout is not None and timeout <= 0:
+                break
+            try:
+                delivered.append(await asyncio.wait_for(self.async_read_modbus_block(data, block, typ), timeout))
+            except asyncio.TimeoutError:
+                self.deadlineStats["cancelled"] += 1
+                break
+        return delivered + [None] * (len(reads) - len(delivered))
+
+    def block_health(self, typ, block):
+        health = self.blockHealth.get((typ, block.start, block.end))
+        if health is None:
+            health = self.blockHealth[(typ, block.start, block.end)] = BlockHealth()
+        return health
+
+    def group_health(self, interval, device_key):
+        health = self.groupHealth.get((interval, device_key))
+        if health is None:
+            health = self.groupHealth[(interval, device_key)] = GroupHealth()
+        return health
+
+    def judge_blocks(self, data, reads, delivered):
+        """Record the outcome of each block read of a group; return whether the group read is usable.
+
+        The read is usable when at least one block was read, the failed blocks keep their last values or get
+        their static ignore_readerror values. When no block could be read, the device is taken as asleep and
+        nothing is written, whatever the ignore_readerror policy of the blocks.
+        """
+        readable = any(delivered)
+        for (block, typ, health), ok in zip(reads, delivered):
+            if readable and not ok and block.ignore_readerror != False:  # static data for the failed block
+                self.ignore_readerror_data(data, [block.descriptions[reg] for reg in block.regs])
+            change = health.record(ok, readable)
+            if change == "quarantined":
+                _LOGGER.warning(
+                    f"{self.name}: {typ} registers 0x{block.start:x}-0x{block.end - 1:x} keep failing, "
+                    f"reading them only every {health.probe_interval} cycles"
+                )
+            elif change == "recovered":
+                _LOGGER.info(f"{self.name}: {typ} registers 0x{block.start:x}-0x{block.end - 1:x} readable again")
+        return readable
+
+    def block_health_statistics(self):
+        """Read outcomes per block: success ratio, quarantine state, skipped reads and probes."""
+        return {
+            f"{typ} 0x{start:x}-0x{end - 1:x}": health.statistics()
+            for (typ, start, end), health in sorted(self.blockHealth.items())
+        }
+
+    def group_health_statistics(self):
+        """Read outcomes per device group of each interval group: state, failures, backoff and skipped ticks."""
+        return {
+            f"{interval}s {device_key}": health.statistics()
+            for (interval, device_key), health in sorted(self.groupHealth.items(), key=lambda item: item[0][0])
+        }
+
+    def diagnostics(self):
+        """Runtime statistics of the hub, for the diagnostics download."""
+        return {
+            "name": self._name,
+            "link": None if self._link is None else self._link.statistics(),
+            "writequeue": self.writequeue.statistics(),
+            "publish": self.publishStats,
+            "aggregation": self.aggregator.statistics(),
+            "blocks": self.block_statistics(),
+            "block_health": self.block_health_statistics(),
+            "group_health": self.group_health_statistics(),
+            "retries": self.retryStats,
+            "deadline": self.deadlineStats,
+            "sleep": {"asleep": self.asleep, **self.sleepStats},
+            "computed": self.computedStats,
+            "data": self.data.statistics(),
+            "interval_groups": {interval: dict(vars(group.timing)) for interval, group in self.groups.items()},
+        }
 
-        result = await self._client.connect()
-        if result:
-            _LOGGER.info(
-                "Inverter connected at %s:%s",
-                self._client.comm_params.host,
-                self._client.comm_params.port,
-            )
-        else:
-            _LOGGER.warning(
-                "Unable to connect to Inverter at %s:%s",
-                self._client.comm_params.host,
-                self._client.comm_params.port,
-            )
-        return result
+    async def _check_connection(self):
+        if self._link is None:
+            return False
+        return await self._link.async_check_connection()
 
-    async def async_read_holding_registers(self, unit, address, count):
-        """Read holding registers."""
+    async def async_connect(self):
+        return await self._link.async_connect()
+
+    async def async_read_holding_registers(self, unit, address, count, retries=LINK_RETRIES):
+        """Read holding registers; an unanswered request is sent again up to retries times."""
+        if self._pipeline is not None and self._pipeline.active:
+            async with self._link.guard(unit):
+                timeout = self._link.timeout(unit)
+                return await self._pipeline.read_holding_registers(address, count, slave=unit or 1, timeout=timeout)
         kwargs = {"slave": unit} if unit else {}
-        async with self._lock:
+        async with self._link.request(unit, retries):
             await self._check_connection()
-            resp = await self._client.read_holding_registers(address, count, **kwargs)
+            resp = await self._link.call(self._client.read_holding_registers(address, count, **kwargs))
         return resp
 
-    async def async_read_input_registers(self, unit, address, count):
-        """Read input registers."""
+    async def async_read_input_registers(self, unit, address, count, retries=LINK_RETRIES):
+        """Read input registers; an unanswered request is sent again up to retries times."""
+        if self._pipeline is not None and self._pipeline.active:
+            async with self._link.guard(unit):
+                timeout = self._link.timeout(unit)
+                return await self._pipeline.read_input_registers(address, count, slave=unit or 1, timeout=timeout)
         kwargs = {"slave": unit} if unit else {}
-        async with self._lock:
+        async with self._link.request(unit, retries):
             await self._check_connection()
-            resp = await self._client.read_input_registers(address, count, **kwargs)
+            resp = await self._link.call(self._client.read_input_registers(address, count, **kwargs))
         return resp
 
-    async def async_lowlevel_write_register(self, unit, address, payload):
-        _LOGGER.debug(f"writing lowlevel register {address} value {payload}")
-
-        kwargs = {"slave": unit} if unit else {}
+    def encode_register(self, payload):
+        """Encode a 16 bit value as register list, with the byte order of the plugin."""
         # builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.BIG)
         builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
         builder.reset()
         builder.add_16bit_int(payload)
-        payload = builder.to_registers()
-        async with self._lock:
+        return builder.to_registers()
+
+    async def async_lowlevel_write_register(self, unit, address, payload):
+        _LOGGER.debug(f"writing lowlevel register {address} value {payload}")
+
+        kwargs = {"slave": unit} if unit else {}
+        payload = self.encode_register(payload)
+        async with self._link.request(unit):
             await self._check_connection()
             resp = await self._client.write_register(address, payload[0], **kwargs)
         return resp
@@ -576,7 +1170,7 @@ class SolaXModbusHub:
             # try to write anyway - could be a command that inverter responds to while asleep
             res = await self.async_lowlevel_write_register(unit, address, payload)
             # put request in queue, in order to repeat it when inverter wakes up
-            self.writequeue[address] = payload
+            self.writequeue.add(unit, address, self.encode_register(payload))
             # wake up inverter
             if self.wakeupButton:
                 _LOGGER.info("waking up inverter: pressing awake button")
@@ -589,14 +1183,23 @@ class SolaXModbusHub:
                 _LOGGER.warning("cannot wakeup inverter: no awake button found")
             return res
 
+    async def async_lowlevel_write_registers(self, unit, address, payload):
+        """Write a list of encoded register values in one request."""
+        kwargs = {"slave": unit} if unit else {}
+        async with self._link.request(unit):
+            await self._check_connection()
+            try:
+                resp = await self._client.write_registers(address, payload, **kwargs)
+            except (ConnectionException, ModbusIOException) as e:
+                original_message = str(e)
+                raise HomeAssistantError(f"Error writing multiple Modbus registers: {original_message}") from e
+        return resp
+
     async def async_write_registers_single(self, unit, address, payload):  # Needs adapting for regiater que
         """Write registers multi, but write only one register of type 16bit"""
         kwargs = {"slave": unit} if unit else {}
-        builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
-        builder.reset()
-        builder.add_16bit_int(payload)
-        payload = builder.to_registers()
-        async with self._lock:
+        payload = self.encode_register(payload)
+        async with self._link.request(unit):
             await self._check_connection()
             try:
                 resp = await self._client.write_registers(address, payload, **kwargs)
@@ -605,6 +1208,11 @@ class SolaXModbusHub:
                 raise HomeAssistantError(f"Error writing single Modbus registers: {original_message}") from e
         return resp
 
+    def defer_registers_write(self, unit, address, payload):
+        """Queue a multi register write made while the inverter sleeps; autorepeated writes repeat anyway."""
+        if not self.plugin.isAwake(self.data) and request_priority.get() != PRIORITY_AUTOREPEAT:
+            self.writequeue.add(unit, address, payload)
+
     async def async_write_registers_multi(self, unit, address, payload):  # Needs adapting for regiater que
         """Write registers multi.
         unit is the modbus address of the device that will be writen to
@@ -617,7 +1225,6 @@ class SolaXModbusHub:
         All register descriptions referenced in the payload must be consecutive (without leaving holes)
         32bit integers will be converted to 2 modbus register values according to the endian strategy of the plugin
         """
-        kwargs = {"slave": unit} if unit else {}
         builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
         builder.reset()
         if isinstance(payload, list):
@@ -654,14 +1261,8 @@ class SolaXModbusHub:
             payload = builder.to_registers()
             # for easier debugging, make next line a _LOGGER.info line
             _LOGGER.debug(f"Ready to write multiple registers at 0x{address:02x}: {payload}")
-            async with self._lock:
-                await self._check_connection()
-                try:
-                    resp = await self._client.write_registers(address, payload, **kwargs)
-                except (ConnectionException, ModbusIOException) as e:
-                    original_message = str(e)
-                    raise HomeAssistantError(f"Error writing multiple Modbus registers: {original_message}") from e
-            return resp
+            self.defer_registers_write(unit, address, payload)
+            return await self.async_lowlevel_write_registers(unit, address, payload)
         else:
             _LOGGER.error(f"write_registers_multi expects a list of tuples 0x{address:02x} payload: {payload}")
             return None
@@ -681,185 +1282,434 @@ class SolaXModbusHub:
             res = False
         return res
 
-    def treat_address(self, data, decoder, descr, initval=0):
-        return_value = None
-        val = None
-        if self.cyclecount < 5:
-            _LOGGER.debug(f"treating register 0x{descr.register:02x} : {descr.key}")
-        try:
-            if descr.unit == REGISTER_U16:
-                val = decoder.decode_16bit_uint()
-            elif descr.unit == REGISTER_S16:
-                val = decoder.decode_16bit_int()
-            elif descr.unit == REGISTER_U32:
-                val = decoder.decode_32bit_uint()
-            elif descr.unit == REGISTER_S32:
-                val = decoder.decode_32bit_int()
-            elif descr.unit == REGISTER_STR:
-                val = str(decoder.decode_string(descr.wordcount * 2).decode("ascii"))
-            elif descr.unit == REGISTER_WORDS:
-                val = [decoder.decode_16bit_uint() for val in range(descr.wordcount)]
-            elif descr.unit == REGISTER_ULSB16MSB16:
-                val = decoder.decode_16bit_uint() + decoder.decode_16bit_uint() * 256 * 256
-            elif descr.unit == REGISTER_U8L:
-                val = initval % 256
-            elif descr.unit == REGISTER_U8H:
-                val = initval >> 8
-            else:
-                _LOGGER.warning(f"undefinded unit for entity {descr.key} - setting value to zero")
-                val = 0
-        except Exception as ex:
-            if self.cyclecount < 5:
-                _LOGGER.warning(
-                    f"{self.name}: read failed at 0x{descr.register:02x}: {descr.key}",
-                    exc_info=True,
-                )
-            else:
-                _LOGGER.warning(f"{self.name}: read failed at 0x{descr.register:02x}: {descr.key} ")
-        """ TO BE REMOVED
-        if descr.prevent_update:
-            if  (self.tmpdata_expiry.get(descr.key, 0) > time()):
-                val = self.tmpdata.get(descr.key, None)
-                if val == None:
-                    LOGGER.warning(f"cannot find tmpdata for {descr.key} - setting value to zero")
-                    val = 0
-            else: # expired
-                if self.tmpdata_expiry.get(descr.key, 0) > 0: self.localsUpdated = True
-                self.tmpdata_expiry[descr.key] = 0 # update locals only once
-        """
+    async def async_read_block_registers(self, block, typ):
+        """Read the registers of a block.
 
-        if val == None:  # E.g. if errors have occurred during readout
-            return_value = None
-        elif type(descr.scale) is dict:  # translate int to string
-            return_value = descr.scale.get(val, "Unknown")
-        elif callable(descr.scale):  # function to call ?
-            return_value = descr.scale(val, descr, data)
-        else:  # apply simple numeric scaling and rounding if not a list of words
+        Returns a tuple (registers, errmsg, rejected); rejected is True when the device answered with the
+        ILLEGAL DATA ADDRESS exception, so the failure is caused by the addressed registers. Other exception
+        responses (device busy, gateway errors) say nothing about the registers.
+        An unanswered read is sent again as long as the retry budget of the device group read lasts.
+        """
+        read = self.async_read_input_registers if typ == "input" else self.async_read_holding_registers
+        while True:
             try:
-                return_value = round(val * descr.scale, descr.rounding)
-            except:
-                return_value = val  # probably a REGISTER_WORDS instance
-        # if (descr.sleepmode != SLEEPMODE_LASTAWAKE) or self.awakeplugin(self.data): self.data[descr.key] = return_value
-        if (self.tmpdata_expiry.get(descr.key, 0) == 0) and (
-            (descr.sleepmode != SLEEPMODE_LASTAWAKE) or self.plugin.isAwake(self.data)
+                realtime_data = await read(
+                    unit=self._modbus_addr, address=block.start, count=block.end - block.start, retries=0
+                )
+                break
+            except Exception as ex:
+                if not (lost_frame(ex) or lost_frame(ex.__cause__)):
+                    return None, f"exception {str(ex)} ", False
+                if self.retryBudget <= 0:
+                    self.retryStats["exhausted"] += 1
+                    return None, f"exception {str(ex)} ", False
+                self.retryBudget -= 1
+                self.retryStats["retried"] += 1
+        if realtime_data is None:
+            return None, "no response ", False
+        if realtime_data.isError():
+            rejected = isinstance(realtime_data, ExceptionResponse)
+            return None, f"read_error ", rejected and realtime_data.exception_code == ExceptionResponse.ILLEGAL_ADDRESS
+        return realtime_data.registers, None, False
+
+    def decode_modbus_block(self, data, block, registers):
+        """Decode the registers of a block into data, or reuse the values of the last read if they are unchanged.
+
+        The cached values are the same objects as in the last read, so the publishing layer sees them as
+        unchanged at once. Scale functions that read other keys are cached with the values of the keys they
+        declare in depends_on.
+        """
+        cache = block.cache
+        if cache is None:
+            self.decode_block_registers(data, block, registers)
+            return
+        inputs = [data.get(key) for key in cache.inputs]
+        if (
+            cache.registers == registers
+            and cache.inputValues == inputs
+            and not any(self.tmpdata_expiry.get(key, 0) for key in cache.values)
         ):
-            data[descr.key] = return_value  # case prevent_update number
+            cache.hits += 1
+            data.update(cache.values)
+            return
+        cache.misses += 1
+        self.decode_block_registers(data, block, registers)
+        cache.values = {key: data[key] for key in cache.keys if key in data}
+        cache.inputValues = inputs
+        # a held back key (prevent_update) was not stored, so the values are incomplete: do not reuse them
+        cache.registers = list(registers) if len(cache.values) == len(cache.keys) else None
+
+    def decode_block_registers(self, data, block, registers):
+        awake = lambda: self.plugin.isAwake(self.data)
+        if block.decoder is not None and len(registers) == block.decoder.count:
+            block.decoder.decode(self.name, registers, data, self.tmpdata_expiry, awake)
+            return
+        decode_registers(
+            self.name,
+            block,
+            registers,
+            data,
+            self.plugin.order16,
+            self.plugin.order32,
+            self.tmpdata_expiry,
+            awake,
+            verbose=self.cyclecount < 5,
+        )
+
+    def ignore_readerror_data(self, data, descriptions):
+        for descr in descriptions:
+            if not (type(descr) is dict):
+                if (descr.ignore_readerror != True) and (descr.ignore_readerror != False):
+                    data[descr.key] = descr.ignore_readerror  # return something static
+
+    async def async_bisect_modbus_block(self, data, block, typ, unreadable):
+        """Read a rejected block in halves until the rejected registers are isolated.
+
+        Decodes the parts that can be read and appends the (start, end) ranges of the single
+        registers (or register groups of one entity, or unused gaps) that the device rejects to unreadable.
+        When both halves are readable and adjacent, the device rejects the length of the block: the empty
+        range (split, split) is appended, a boundary that planned blocks do not span.
+        Returns True when at least one part could be read, None when a part failed for another
+        reason than a rejection (e.g. timeout), so the result cannot be trusted.
+        """
+        half = len(block.regs) // 2
+        readable = False
+        learned = len(unreadable)
+        for regs in (block.regs[:half], block.regs[half:]):
+            end = max(reg + registerWidth(block.descriptions[reg]) for reg in regs)
+            part = replace(block, start=regs[0], end=end, regs=regs, decoder=None, cache=None)
+            registers, errmsg, rejected = await self.async_read_block_registers(part, typ)
+            if errmsg is None:
+                self.decode_modbus_block(data, part, registers)
+                readable = True
+            elif not rejected:
+                return None
+            elif len(regs) > 1:
+                res = await self.async_bisect_modbus_block(data, part, typ, unreadable)
+                if res is None:
+                    return None
+                readable = readable or res
+            else:
+                unreadable.append((part.start, part.end))
+        if len(unreadable) == learned:  # both halves are readable: the gap between them or the length is rejected
+            gap_start = max(reg + registerWidth(block.descriptions[reg]) for reg in block.regs[:half])
+            if gap_start < block.regs[half]:
+                unreadable.append((gap_start, block.regs[half]))
+            elif gap_start == block.regs[half]:
+                unreadable.append((gap_start, gap_start))
+        return readable
 
     async def async_read_modbus_block(self, data, block, typ):
-        errmsg = None
         if self.cyclecount < 5:
             _LOGGER.debug(
                 f"{self.name} modbus {typ} block start: 0x{block.start:x} end: 0x{block.end:x}  len: {block.end - block.start} \nregs: {block.regs}"
             )
-        try:
-            if typ == "input":
-                realtime_data = await self.async_read_input_registers(
-                    unit=self._modbus_addr,
-                    address=block.start,
-                    count=block.end - block.start,
+        registers, errmsg, rejected = await self.async_read_block_registers(block, typ)
+        if errmsg == None:
+            self.decode_modbus_block(data, block, registers)
+            return True
+        if rejected and len(block.regs) > 1:
+            unreadable = []
+            if await self.async_bisect_modbus_block(data, block, typ, unreadable):
+                # the device answers, but rejects some of the registers: learn them and plan around them
+                if unreadable:
+                    self.learn_unreadable(typ, unreadable)
+                rejected_descriptions = [
+                    block.descriptions[reg]
+                    for reg in block.regs
+                    if self.is_unreadable(typ, reg, block.descriptions[reg])
+                ]
+                self.ignore_readerror_data(data, rejected_descriptions)
+                return True
+        # block read failure, judged by judge_blocks
+        if block.ignore_readerror == False and not self.readFailing:
+            _LOGGER.info(
+                f"{errmsg}: {self.name} cannot read {typ} registers at device {self._modbus_addr} position 0x{block.start:x}",
+                exc_info=True,
+            )
+        return False
+
+    # learned map of register ranges that the device rejects, persisted per serial number and firmware
+    UNREADABLE_STORAGE_VERSION = 1
+
+    def is_unreadable(self, typ, reg, descr):
+        end = reg + registerWidth(descr)
+        for start, stop in self.unreadable[typ]:
+            if start < end and reg < stop:
+                return True
+        return False
+
+    def learn_unreadable(self, typ, ranges):
+        for start, end in ranges:
+            if (start, end) in self.unreadable[typ]:
+                continue
+            if (start, end) in self.unreadableReprobed[typ]:
+                _LOGGER.debug(f"{self.name}: device still rejects {typ} registers from 0x{start:x} up to 0x{end:x}")
+            elif start == end:
+                _LOGGER.warning(
+                    f"{self.name}: device rejects {typ} reads across register 0x{start:x}, splitting blocks there"
                 )
             else:
-                realtime_data = await self.async_read_holding_registers(
-                    unit=self._modbus_addr,
-                    address=block.start,
-                    count=block.end - block.start,
+                _LOGGER.warning(
+                    f"{self.name}: device rejects {typ} registers 0x{start:x}-0x{end - 1:x}, no longer reading them"
                 )
-        except Exception as ex:
-            errmsg = f"exception {str(ex)} "
-        else:
-            if realtime_data.isError():
-                errmsg = f"read_error "
-        if errmsg == None:
-            decoder = BinaryPayloadDecoder.fromRegisters(
-                realtime_data.registers,
-                self.plugin.order16,
-                wordorder=self.plugin.order32,
-            )
-            prevreg = block.start
-            for reg in block.regs:
-                if (reg - prevreg) > 0:
-                    decoder.skip_bytes((reg - prevreg) * 2)
-                    if self.cyclecount < 5:
-                        _LOGGER.debug(f"skipping bytes {(reg-prevreg) * 2}")
-                descr = block.descriptions[reg]
-                if type(descr) is dict:  #  set of byte values
-                    val = decoder.decode_16bit_uint()
-                    for k in descr:
-                        self.treat_address(data, decoder, descr[k], val)
-                    prevreg = reg + 1
-                else:  # single value
-                    self.treat_address(data, decoder, descr)
-                    if descr.unit in (
-                        REGISTER_S32,
-                        REGISTER_U32,
-                        REGISTER_ULSB16MSB16,
-                    ):
-                        prevreg = reg + 2
-                    elif descr.unit in (
-                        REGISTER_STR,
-                        REGISTER_WORDS,
-                    ):
-                        prevreg = reg + descr.wordcount
-                    else:
-                        prevreg = reg + 1
+            self.unreadable[typ][(start, end)] = time()
+            self.unreadableUpdated = True
+
+    def expire_unreadable(self):
+        """Drop the ranges learned more than UNREADABLE_REPROBE_INTERVAL ago, so they are read again.
+
+        A range may have been learned from a transient error, or the device may accept it again; if it still
+        rejects the range, the next read of its block learns it again. Returns whether any range expired.
+        """
+        limit = time() - UNREADABLE_REPROBE_INTERVAL
+        expired = False
+        for typ, ranges in self.unreadable.items():
+            for key, learned in list(ranges.items()):
+                if learned < limit:
+                    del ranges[key]
+                    self.unreadableReprobed[typ].add(key)
+                    expired = True
+        if expired:
+            _LOGGER.info(f"{self.name}: probing learned unreadable register ranges again")
+        return expired
+
+    async def async_load_unreadable(self):
+        stored = await self._unreadable_store.async_load() or {}
+        self._unreadable_stored = stored.get("devices", {})
+        key = stored.get("last", {}).get(self.seriesnumber, f"{self.seriesnumber}_unknown")
+        self.select_unreadable(key)
+
+    def select_unreadable(self, key):
+        entry = self._unreadable_stored.get(key, {})
+        self._unreadable_key = key
+        now = time()  # ranges stored without the time they were learned count as learned now
+        self.unreadable = {
+            typ: {(r[0], r[1]): r[2] if len(r) > 2 else now for r in entry.get(typ, [])}
+            for typ in ("holding", "input")
+        }
+        if self.unreadable["holding"] or self.unreadable["input"]:
+            _LOGGER.info(f"{self.name}: using learned unreadable register ranges for {key}: {self.unreadable}")
+
+    async def async_update_unreadable(self):
+        """Persist newly learned ranges and switch maps when the firmware version becomes known or changes."""
+        firmware = self.plugin.getSoftwareVersion(self.data)
+        key = self._unreadable_key if firmware is None else f"{self.seriesnumber}_{firmware}"
+        if key != self._unreadable_key:
+            if self._unreadable_key.endswith("_unknown"):  # learned on this firmware before it was known
+                self._unreadable_stored.pop(self._unreadable_key, None)
+                self._unreadable_key = key
+            else:  # firmware changed: the learned ranges may no longer apply
+                self.select_unreadable(key)
+                self.unreadableUpdated = True
+        elif not (self.expire_unreadable() or self.unreadableUpdated):
+            return
+        self.unreadableUpdated = False
+        self.replan_device_groups()
+        self._unreadable_stored[self._unreadable_key] = {
+            typ: sorted([start, end, learned] for (start, end), learned in ranges.items())
+            for typ, ranges in self.unreadable.items()
+        }
+        await self._unreadable_store.async_save(
+            {"devices": self._unreadable_stored, "last": {self.seriesnumber: self._unreadable_key}}
+        )
+
+    def update_disabled_keys(self):
+        """Collect the sensors whose entity is disabled and the keys that code depends on; True if changed."""
+        registry = er.async_get(self._hass)
+        disabled = set()
+        for key, sensor in self.sensorEntities.items():
+            descr = sensor.entity_description
+            if getattr(descr, "internal", None):
+                continue  # never registered, polled on behalf of other entities
+            entity_id = registry.async_get_entity_id(Platform.SENSOR, DOMAIN, sensor.unique_id)
+            if entity_id is None:  # not registered yet: it will be created with its default
+                if not descr.entity_registry_enabled_default:
+                    disabled.add(key)
+            elif registry.async_get(entity_id).disabled_by is not None:
+                disabled.add(key)
+
+        required = set()
+        functions = [method for method in vars(type(self.plugin)).values() if callable(method)]
+        if self.plugin.BATTERY_CONFIG is not None:
+            functions += [method for method in vars(type(self.plugin.BATTERY_CONFIG)).values() if callable(method)]
+        plugin = self.plugin
+        required.update(plugin.wake_keys or ())
+        for descr in (*plugin.NUMBER_TYPES, *plugin.SELECT_TYPES, *plugin.SWITCH_TYPES, *plugin.BUTTON_TYPES):
+            for attr in ("key", "sensor_key", "autorepeat"):
+                if isinstance(getattr(descr, attr, None), str):
+                    required.add(getattr(descr, attr))
+            functions += [getattr(descr, "value_function", None), getattr(descr, "scale", None)]
+        for key, sensor in self.sensorEntities.items():
+            if key not in disabled:
+                functions += [sensor.entity_description.value_function, sensor.entity_description.scale]
+        strings = set()
+        seen = set()
+        while functions:  # also the functions of disabled computed sensors that enabled code depends on
+            for function in functions:
+                if callable(function):
+                    strings |= referencedKeys(function, seen)
+            functions = []
+            for key in strings & disabled - required:
+                required.add(key)
+                descr = self.sensorEntities[key].entity_description
+                functions += [descr.value_function, descr.scale]
+        required |= strings & set(self.sensorEntities)
+        fragments = keyFragments(strings - required)
+
+        changed = (disabled, required, fragments) != (self.disabledKeys, self.requiredKeys, self.requiredFragments)
+        self.disabledKeys, self.requiredKeys, self.requiredFragments = disabled, required, fragments
+        return changed
+
+    def is_register_needed(self, descr):
+        """True unless the register only backs disabled entities that no code depends on."""
+        if type(descr) is dict:
+            return any(self.is_register_needed(byte_descr) for byte_descr in descr.values())
+        key = descr.key
+        if key not in self.disabledKeys or key in self.requiredKeys:
             return True
-        else:  # block read failure
-            firstdescr = block.descriptions[block.start]  # check only first item in block
-            if firstdescr.ignore_readerror != False:  # ignore block read errors and return static data
-                for reg in block.regs:
-                    descr = block.descriptions[reg]
-                    if not (type(descr) is dict):
-                        if (descr.ignore_readerror != True) and (descr.ignore_readerror != False):
-                            data[descr.key] = descr.ignore_readerror  # return something static
-                return True
+        return matchesFragment(key, self.requiredFragments)
+
+    def track_entity_registry(self):
+        """Re-plan the reads when an entity of this hub is enabled or disabled; returns the unsubscribe."""
+
+        @callback
+        def _registry_updated(event):
+            if event.data["action"] != "update" or "disabled_by" not in event.data.get("changes", {}):
+                return
+            entry = er.async_get(self._hass).async_get(event.data["entity_id"])
+            if entry is None or entry.platform != DOMAIN or not entry.unique_id.startswith(f"{self._name}_"):
+                return
+            if self.update_disabled_keys():
+                _LOGGER.info(f"{self._name}: {entry.entity_id} enabled or disabled, planning the reads again")
+                self.replan_device_groups()
+
+        return self._hass.bus.async_listen(er.EVENT_ENTITY_REGISTRY_UPDATED, _registry_updated)
+
+    def plan_device_group(self, device_group):
+        """Split the registers of a device group in read blocks.
+
+        Leaves out the learned unreadable registers and the registers that only back disabled entities.
+        """
+        cost = self.block_cost()
+        auto = self.plugin.auto_block_ignore_readerror
+        device_group.unreadable = []
+        for typ, regs in (("holding", device_group.holdingRegs), ("input", device_group.inputRegs)):
+            readable = {}
+            for reg, descr in regs.items():
+                if not self.is_register_needed(descr):
+                    continue
+                if self.is_unreadable(typ, reg, descr):
+                    device_group.unreadable.append(descr)
+                else:
+                    readable[reg] = descr
+            blocks = planBlocks(readable, cost, auto, self.unreadable[typ])
+            for block in blocks:
+                block.decoder = BlockDecoder.compile(block, self.plugin.order16, self.plugin.order32)
+                block.cache = self.block_cache(block)
+            if typ == "holding":
+                device_group.holdingBlocks = blocks
             else:
-                if self.slowdown == 1:
-                    _LOGGER.info(
-                        f"{errmsg}: {self.name} cannot read {typ} registers at device {self._modbus_addr} position 0x{block.start:x}",
-                        exc_info=True,
-                    )
-                return False
+                device_group.inputBlocks = blocks
+
+    def block_cache(self, block):
+        """Cache of the last payload and decoded values of a block.
+
+        None if the values depend on the sleep state, or on other keys that a scale function does not declare.
+        """
+        descriptions = []
+        for reg in block.regs:
+            descr = block.descriptions[reg]
+            descriptions += descr.values() if type(descr) is dict else [descr]
+        if any(descr.sleepmode == SLEEPMODE_LASTAWAKE for descr in descriptions):
+            return None
+        inputs = []  # keys read by the scale functions of the block
+        for descr in descriptions:
+            if callable(descr.scale) and readsData(descr.scale):
+                if descr.depends_on is None:
+                    return None
+                inputs += descr.depends_on
+        keys = list(dict.fromkeys(descr.key for descr in descriptions))
+        inputs = list(dict.fromkeys(inputs))
+        return SimpleNamespace(registers=None, values={}, keys=keys, inputs=inputs, inputValues=None, hits=0, misses=0)
+
+    def replan_device_groups(self):
+        for interval_group in self.groups.values():
+            for device_group in interval_group.device_groups.values():
+                self.plan_device_group(device_group)
 
     async def async_read_modbus_registers_all(self, group):
         if group.readPreparation is not None:
             if not await group.readPreparation(self.data):
                 _LOGGER.info(f"device group read cancel")
-                return True
+                return None  # not a failure of the device, but no data either
         else:
             _LOGGER.debug(f"device group inverter")
 
-        data = {"_repeatUntil": self.data["_repeatUntil"]}
-        res = True
-        for block in group.holdingBlocks:
-            res = res and await self.async_read_modbus_block(data, block, "holding")
-        for block in group.inputBlocks:
-            res = res and await self.async_read_modbus_block(data, block, "input")
+        data = self.data.cycle()  # the values of this read, committed at once after it
+        self.retryBudget = READ_RETRY_BUDGET
+        data["_repeatUntil"] = self.data["_repeatUntil"]
+        blocks = [
+            (block, typ, self.block_health(typ, block))
+            for typ, typ_blocks in (("holding", group.holdingBlocks), ("input", group.inputBlocks))
+            for block in typ_blocks
+        ]
+        first = group.rotation % len(blocks) if blocks else 0
+        blocks = blocks[first:] + blocks[:first]
+        # every block is read and judged on its own; quarantined blocks are only read now and then as a probe
+        reads = [entry for entry in blocks if entry[2].due()]
+        if blocks and not reads:  # all blocks are quarantined and none is due for a probe: nothing to read
+            _LOGGER.debug(f"{self.name}: all blocks of the device group are quarantined, waiting for their probes")
+            return True
+        expired = self.expire_holds()  # their registers are stored again from this read on
+        delivered = await self.async_read_blocks(data, reads)
+        deferred = [entry for entry, ok in zip(reads, delivered) if ok is None]
+        if deferred:  # the next read starts with them
+            self.deadlineMissed = True
+            self.deadlineStats["deferred"] += len(deferred)
+            group.rotation = (first + blocks.index(deferred[0])) % len(blocks)
+            reads, delivered = zip(*[(entry, ok) for entry, ok in zip(reads, delivered) if ok is not None])
+        res = self.judge_blocks(data, reads, delivered)
+        if res:  # learned unreadable registers get their static values along with a delivered read
+            self.ignore_readerror_data(data, group.unreadable)
 
         if self.localsUpdated:
             await self._hass.async_add_executor_job(self.saveLocalData)
             self.plugin.localDataCallback(self)
+            self.update_entity_values()
         if not self.localsLoaded:
             await self._hass.async_add_executor_job(self.loadLocalData)
-        for reg in self.computedSensors:
-            descr = self.computedSensors[reg]
-            data[descr.key] = descr.value_function(0, descr, data)
+            if self.localsLoaded:
+                self.update_entity_values()
+        self.evaluate_computed_sensors(data)
 
         if group.readFollowUp is not None:
             if not await group.readFollowUp(self.data, data):
                 _LOGGER.warning(f"device group check not success")
                 return True
 
-        for key, value in data.items():
-            self.data[key] = value
+        now = time()
+        for key, (descr, interval) in self.aggregatedKeys.items():
+            if key in data:  # self.data keeps the raw value, the entity shows the aggregate
+                if self.aggregator.add(descr, data[key], now, interval):
+                    self.changedKeys.add(key)
+        # values reused from an unchanged block payload are the same object, the commit skips comparing them
+        self.changedKeys.update(key for key in data.commit(now) if key not in self.aggregatedKeys)
+        self.changedKeys.update(expired)  # their entities showed the held value
+
+        if res:
+            await self.async_update_unreadable()
 
         if res and self.writequeue and self.plugin.isAwake(self.data):  # self.awakeplugin(self.data):
             # process outstanding write requests
-            _LOGGER.info(f"inverter is now awake, processing outstanding write requests {self.writequeue}")
-            for addr in self.writequeue.keys():
-                val = self.writequeue.get(addr)
-                await self.async_write_register(self._modbus_addr, addr, val)
-            self.writequeue = {}  # make sure we do not write multiple times
+            _LOGGER.info(f"inverter is now awake, processing {len(self.writequeue)} outstanding register writes")
+            token = request_priority.set(PRIORITY_WRITE)  # queued user writes, not part of the polling
+            try:  # written entries leave the queue, failed ones stay with their backoff
+                await self.writequeue.async_flush(self.async_lowlevel_write_registers)
+            finally:
+                request_priority.reset(token)
         self.last_ts = time()
+        token = request_priority.set(PRIORITY_AUTOREPEAT)
         for (
             k,
             v,
@@ -873,6 +1723,7 @@ class SolaXModbusHub:
                     address=buttondescr.register,
                     payload=payload,
                 )
+        request_priority.reset(token)
         return res
 
 
@@ -981,8 +1832,8 @@ class SolaXCoreModbusHub(SolaXModbusHub, CoreModbusHub):
             delay = False
             await asyncio.sleep(10)
 
-    async def async_read_holding_registers(self, unit, address, count):
-        """Read holding registers."""
+    async def async_read_holding_registers(self, unit, address, count, retries=LINK_RETRIES):
+        """Read holding registers; the core modbus client keeps its own timeout and retries."""
         kwargs = {"slave": unit} if unit else {}
         async with self._lock:
             hub = await self._check_connection()
@@ -999,8 +1850,8 @@ class SolaXCoreModbusHub(SolaXModbusHub, CoreModbusHub):
         except (TypeError, AttributeError) as e:
             raise HomeAssistantError(f"Error reading Modbus holding registers: core modbus access failed") from e
 
-    async def async_read_input_registers(self, unit, address, count):
-        """Read input registers."""
+    async def async_read_input_registers(self, unit, address, count, retries=LINK_RETRIES):
+        """Read input registers; the core modbus client keeps its own timeout and retries."""
         kwargs = {"slave": unit} if unit else {}
         async with self._lock:
             hub = await self._check_connection()
@@ -1039,6 +1890,24 @@ class SolaXCoreModbusHub(SolaXModbusHub, CoreModbusHub):
         except (TypeError, AttributeError) as e:
             raise HomeAssistantError(f"Error writing single Modbus input register: core modbus access failed") from e
 
+    async def async_lowlevel_write_registers(self, unit, address, payload):
+        """Write a list of encoded register values in one request."""
+        kwargs = {"slave": unit} if unit else {}
+        async with self._lock:
+            hub = await self._check_connection()
+        try:
+            if hub._config_delay:
+                return None
+            async with hub._lock:
+                try:
+                    resp = await self._client.write_registers(address, payload, **kwargs)
+                except (ConnectionException, ModbusIOException) as e:
+                    original_message = str(e)
+                    raise HomeAssistantError(f"Error writing multiple Modbus registers: {original_message}") from e
+            return resp
+        except (TypeError, AttributeError) as e:
+            raise HomeAssistantError(f"Error writing multiple Modbus registers: core modbus access failed") from e
+
     async def async_write_registers_single(self, unit, address, payload):  # Needs adapting for regiater que
         """Write registers multi, but write only one register of type 16bit"""
         builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
@@ -1074,7 +1943,6 @@ class SolaXCoreModbusHub(SolaXModbusHub, CoreModbusHub):
         All register descriptions referenced in the payload must be consecutive (without leaving holes)
         32bit integers will be converted to 2 modbus register values according to the endian strategy of the plugin
         """
-        kwargs = {"slave": unit} if unit else {}
         builder = BinaryPayloadBuilder(byteorder=self.plugin.order16, wordorder=self.plugin.order32)
         builder.reset()
         if isinstance(payload, list):
@@ -1111,22 +1979,8 @@ class SolaXCoreModbusHub(SolaXModbusHub, CoreModbusHub):
             payload = builder.to_registers()
             # for easier debugging, make next line a _LOGGER.info line
             _LOGGER.debug(f"Ready to write multiple registers at 0x{address:02x}: {payload}")
-            async with self._lock:
-                hub = await self._check_connection()
-            try:
-                if hub._config_delay:
-                    return None
-                async with hub._lock:
-                    try:
-                        resp = await self._client.write_registers(address, payload, **kwargs)
-                    except (ConnectionException, ModbusIOException) as e:
-                        original_message = str(e)
-                        raise HomeAssistantError(f"Error writing multiple Modbus registers: {original_message}") from e
-                return resp
-            except (TypeError, AttributeError) as e:
-                raise HomeAssistantError(
-                    f"Error writing single Modbus Modbus registers: core modbus access failed"
-                ) from e
+            self.defer_registers_write(unit, address, payload)
+            return await self.async_lowlevel_write_registers(unit, address, payload)
         else:
             _LOGGER.error(f"write_registers_multi expects a list of tuples 0x{address:02x} payload: {payload}")
         return None
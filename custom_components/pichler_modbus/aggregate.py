@@ -0,0 +1,108 @@
+"""Aggregation of fast polled values: samples per key collected over a window, published as mean/min/max/last."""
+
+from array import array
+from math import ceil
+
+from .const_base import (
+    AGGREGATE_INTERVAL_DEFAULT,
+    AGGREGATE_LAST,
+    AGGREGATE_MAX,
+    AGGREGATE_MAX_SAMPLES,
+    AGGREGATE_MEAN,
+    AGGREGATE_MIN,
+)
+
+
+class SampleRing:
+    """Fixed size ring buffer of float samples; when full, the oldest sample is overwritten."""
+
+    __slots__ = ("_samples", "_next", "count")
+
+    def __init__(self, capacity):
+        self._samples = array("d", bytes(8 * capacity))
+        self._next = 0
+        self.count = 0
+
+    def add(self, value):
+        self._samples[self._next] = value
+        self._next = (self._next + 1) % len(self._samples)
+        self.count = min(self.count + 1, len(self._samples))
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+    def values(self):
+        """The samples, oldest first."""
+        if self.count < len(self._samples):
+            return self._samples[: self.count]
+        return self._samples[self._next :] + self._samples[: self._next]
+
+
+class Aggregator:
+    """Samples of the keys with an aggregate, published once per aggregate_interval.
+
+    Every read adds a sample; when the window of a key has lasted aggregate_interval seconds, its aggregates
+    are computed and the ring is cleared for the next window. Values that are not numbers are not sampled.
+    The ring stores floats, so min, max and last are returned as int again when all samples of the window were.
+    """
+
+    AGGREGATES = (AGGREGATE_MEAN, AGGREGATE_MIN, AGGREGATE_MAX, AGGREGATE_LAST)
+
+    def __init__(self):
+        self._rings = {}  # key -> SampleRing of the current window
+        self._window_start = {}  # key -> time of the first sample of the current window
+        self._integral = {}  # key -> all samples of the current window are int
+        self.results = {}  # key -> aggregates of the last completed window, incl. "samples"
+        self.samples = 0
+        self.windows = 0
+
+    def add(self, descr, value, now, poll_interval):
+        """Add a sample; return True when the window of the key completed and its aggregates changed."""
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        interval = self.interval(descr)
+        ring = self._rings.get(descr.key)
+        if ring is None:
+            capacity = min(AGGREGATE_MAX_SAMPLES, ceil(interval / max(poll_interval, 0.1)) + 1)
+            ring = self._rings[descr.key] = SampleRing(capacity)
+        if ring.count == 0:
+            self._window_start[descr.key] = now
+            self._integral[descr.key] = True
+        ring.add(value)
+        self._integral[descr.key] = self._integral[descr.key] and isinstance(value, int)
+        self.samples += 1
+        if now - self._window_start[descr.key] < interval and descr.key in self.results:
+            return False  # the first window is published right away, so the entity has a state
+        samples = ring.values()
+        cast = int if self._integral[descr.key] else float
+        result = {
+            AGGREGATE_MEAN: round(sum(samples) / len(samples), descr.rounding),
+            AGGREGATE_MIN: cast(min(samples)),
+            AGGREGATE_MAX: cast(max(samples)),
+            AGGREGATE_LAST: cast(samples[-1]),
+            "samples": len(samples),
+        }
+        ring.clear()
+        self.windows += 1
+        changed = self.results.get(descr.key) != result
+        self.results[descr.key] = result
+        return changed
+
+    @staticmethod
+    def interval(descr):
+        """Seconds per published aggregate of a key, AGGREGATE_INTERVAL_DEFAULT when not declared."""
+        return descr.aggregate_interval or AGGREGATE_INTERVAL_DEFAULT
+
+    def value(self, descr):
+        """The published aggregate of a key, None before its first window completed."""
+        result = self.results.get(descr.key)
+        return None if result is None else result[descr.aggregate]
+
+    def statistics(self):
+        return {
+            "keys": len(self._rings),
+            "buffered": sum(ring.count for ring in self._rings.values()),
+            "samples": self.samples,
+            "windows": self.windows,
+        }
@@ -0,0 +1,141 @@
+"""Health of device groups and their register blocks: what keeps failing is read less often, the rest at full rate."""
+
+from .const_base import (
+    BLOCK_PROBE_CYCLES,
+    BLOCK_PROBE_MAX_CYCLES,
+    BLOCK_QUARANTINE_FAILURES,
+    GROUP_BACKOFF_MAX_CYCLES,
+    GROUP_FAILURE_THRESHOLD,
+)
+
+
+class BlockHealth:
+    """Read outcomes of one register block.
+
+    Failures only count towards the quarantine in group reads where other blocks were read, so a sleeping or
+    unreachable device does not quarantine its blocks. A quarantined block is skipped and read as a probe
+    every probe_interval group reads; a successful probe lifts the quarantine, a failed one doubles the interval.
+    """
+
+    __slots__ = ("reads", "failures", "consecutive", "quarantined", "probe_interval", "wait", "skipped", "probes")
+
+    def __init__(self):
+        self.reads = 0
+        self.failures = 0
+        self.consecutive = 0  # failures in a row while the group was readable
+        self.quarantined = False
+        self.probe_interval = BLOCK_PROBE_CYCLES
+        self.wait = 0  # group reads until the next probe
+        self.skipped = 0
+        self.probes = 0
+
+    def due(self):
+        """Whether the block is read in this group read; counts the skipped reads of a quarantined block."""
+        if not self.quarantined:
+            return True
+        if self.wait > 1:
+            self.wait -= 1
+            self.skipped += 1
+            return False
+        self.wait = self.probe_interval
+        self.probes += 1
+        return True
+
+    def record(self, delivered, group_readable):
+        """Judge a read; return "quarantined" or "recovered" when the state of the block changed, else None."""
+        self.reads += 1
+        if delivered:
+            self.consecutive = 0
+            if self.quarantined:
+                self.quarantined = False
+                self.probe_interval = BLOCK_PROBE_CYCLES
+                return "recovered"
+            return None
+        self.failures += 1
+        if not group_readable:
+            return None
+        self.consecutive += 1
+        if self.quarantined:
+            self.probe_interval = min(self.probe_interval * 2, BLOCK_PROBE_MAX_CYCLES)
+            self.wait = self.probe_interval
+        elif self.consecutive >= BLOCK_QUARANTINE_FAILURES:
+            self.quarantined = True
+            self.wait = self.probe_interval
+            return "quarantined"
+        return None
+
+    def statistics(self):
+        return {
+            "reads": self.reads,
+            "failures": self.failures,
+            "success_ratio": round((self.reads - self.failures) / self.reads, 3) if self.reads else None,
+            "quarantined": self.quarantined,
+            "skipped": self.skipped,
+            "probes": self.probes,
+        }
+
+
+class GroupHealth:
+    """Read outcomes of one device group in one interval group, e.g. a battery pack polled every 60s.
+
+    After GROUP_FAILURE_THRESHOLD failed reads in a row the group backs off: it skips one tick, and twice as
+    many after every further failure, up to GROUP_BACKOFF_MAX_CYCLES. A successful read ends the backoff.
+    Failures that are not counted, e.g. while the whole link is down, do not lead to a backoff.
+    """
+
+    __slots__ = ("reads", "failures", "consecutive", "backoff", "wait", "skipped")
+
+    def __init__(self):
+        self.reads = 0
+        self.failures = 0
+        self.consecutive = 0  # counted failures in a row
+        self.backoff = 0  # ticks skipped after the last failure, 0 while not backing off
+        self.wait = 0  # ticks to skip before the next read
+        self.skipped = 0
+
+    @property
+    def failing(self):
+        return self.consecutive > 0
+
+    @property
+    def state(self):
+        if self.backoff:
+            return "backing_off"
+        return "failing" if self.consecutive else "ok"
+
+    def due(self):
+        """Whether the group is read on this tick; counts the skipped ticks while backing off."""
+        if self.wait > 0:
+            self.wait -= 1
+            self.skipped += 1
+            return False
+        return True
+
+    def record(self, success, counted=True):
+        """Judge a read; return "backing_off" or "recovered" when the backoff started or ended, else None."""
+        self.reads += 1
+        if success:
+            recovered = self.backoff > 0
+            self.consecutive = 0
+            self.backoff = 0
+            return "recovered" if recovered else None
+        self.failures += 1
+        if not counted:
+            return None
+        self.consecutive += 1
+        if self.consecutive < GROUP_FAILURE_THRESHOLD:
+            return None
+        started = self.backoff == 0
+        self.backoff = min(self.backoff * 2 or 1, GROUP_BACKOFF_MAX_CYCLES)
+        self.wait = self.backoff
+        return "backing_off" if started else None
+
+    def statistics(self):
+        return {
+            "state": self.state,
+            "reads": self.reads,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive,
+            "backoff": self.backoff,
+            "skipped": self.skipped,
+        }
@@ -34,6 +34,15 @@ from .const import (
 	DOMAIN,
     DEFAULT_TCP_TYPE,
     CONF_TCP_TYPE,
+    CONF_TCP_WINDOW,
+    CONF_PUBLISH_DEADBAND_RELATIVE,
+    CONF_PUBLISH_MIN_INTERVAL,
+    CONF_PUBLISH_MAX_INTERVAL,
+    CONF_CYCLE_DEADLINE,
+    DEFAULT_CYCLE_DEADLINE,
+    CONF_SLEEP_PROBE_INTERVAL,
+    DEFAULT_SLEEP_PROBE_INTERVAL,
+    DEFAULT_TCP_WINDOW,
 	CONF_INVERTER_NAME_SUFFIX,
 	CONF_READ_EPS,
     CONF_READ_DCB,
@@ -126,6 +135,11 @@ OPTION_SCHEMA = vol.Schema( {
         vol.Optional(CONF_READ_EPS, default=DEFAULT_READ_EPS): bool,
         vol.Optional(CONF_READ_DCB, default=DEFAULT_READ_DCB): bool,
         vol.Optional(CONF_READ_PM, default=DEFAULT_READ_PM): bool,
+        vol.Optional(CONF_PUBLISH_DEADBAND_RELATIVE, default=0): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+        vol.Optional(CONF_PUBLISH_MIN_INTERVAL, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_PUBLISH_MAX_INTERVAL, default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(CONF_CYCLE_DEADLINE, default=DEFAULT_CYCLE_DEADLINE): vol.All(vol.Coerce(float), vol.Range(min=0, max=100)),
+        vol.Optional(CONF_SLEEP_PROBE_INTERVAL, default=DEFAULT_SLEEP_PROBE_INTERVAL): vol.All(vol.Coerce(float), vol.Range(min=0)),
     } )
 
 SERIAL_SCHEMA = vol.Schema( {
@@ -137,6 +151,7 @@ TCP_SCHEMA = vol.Schema( {
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_PORT, default=DEFAULT_PORT): int,
         vol.Required(CONF_TCP_TYPE, default=DEFAULT_TCP_TYPE): selector.SelectSelector(selector.SelectSelectorConfig(options=TCP_TYPES), ),
+        vol.Optional(CONF_TCP_WINDOW, default=DEFAULT_TCP_WINDOW): vol.All(int, vol.Range(min=1, max=8)),
     } )
 
 CORE_SCHEMA = vol.Schema( {
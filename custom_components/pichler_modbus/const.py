@@ -45,6 +45,8 @@ except ImportError:
         VOLT_AMPERE_REACTIVE = POWER_VOLT_AMPERE_REACTIVE
 
 
+from .const_base import *  # noqa: F401,F403  register units, sleep modes and tuning of the polling engine
+
 # ================================= Definitions for config_flow ==========================================================
 
 DOMAIN = "pichler_modbus"
@@ -56,6 +58,15 @@ DEFAULT_PORT = 502
 DEFAULT_MODBUS_ADDR = 1
 DEFAULT_TCP_TYPE = "tcp"
 CONF_TCP_TYPE = "tcp_type"
+CONF_PUBLISH_DEADBAND_RELATIVE = "publish_deadband_relative"  # per entry overrides of the publish filter
+CONF_PUBLISH_MIN_INTERVAL = "publish_min_interval"
+CONF_PUBLISH_MAX_INTERVAL = "publish_max_interval"
+CONF_CYCLE_DEADLINE = "cycle_deadline"  # time budget of a polling cycle, in percent of its interval
+DEFAULT_CYCLE_DEADLINE = 80
+CONF_SLEEP_PROBE_INTERVAL = "sleep_probe_interval"  # seconds between reads of the wake indicators while asleep
+DEFAULT_SLEEP_PROBE_INTERVAL = 60
+CONF_TCP_WINDOW = "tcp_window"  # max outstanding read requests for plain modbus tcp, 1 = no pipelining
+DEFAULT_TCP_WINDOW = 1
 TMPDATA_EXPIRY = 120  # seconds before temp entities return to modbus value
 CONF_INVERTER_NAME_SUFFIX = "inverter_name_suffix"
 CONF_READ_EPS = "read_eps"
@@ -79,10 +90,6 @@ DEFAULT_BAUDRATE = "19200"
 DEFAULT_PLUGIN = "solax"
 DEFAULT_READ_BATTERY = False
 PLUGIN_PATH = f"{pathlib.Path(__file__).parent.absolute()}/plugin_*.py"
-SLEEPMODE_NONE = None
-SLEEPMODE_ZERO = 0  # when no communication at all
-SLEEPMODE_LAST = 1  # when no communication at all
-SLEEPMODE_LASTAWAKE = 2  # when still responding but register must be ignored when not awake
 # keys for config
 CONF_SCAN_INTERVAL_MEDIUM = "scan_interval_medium"
 CONF_SCAN_INTERVAL_FAST = "scan_interval_fast"
@@ -90,20 +97,34 @@ CONF_SCAN_INTERVAL_FAST = "scan_interval_fast"
 SCAN_GROUP_DEFAULT = CONF_SCAN_INTERVAL  # default scan group, slow; should always work
 SCAN_GROUP_MEDIUM = CONF_SCAN_INTERVAL_MEDIUM  # medium speed scanning (energy, temp, soc...)
 SCAN_GROUP_FAST = CONF_SCAN_INTERVAL_FAST  # fast scanning (power,...)
+# block planner cost model per transport: fixed cost per read request and cost per register, in ms
+BLOCK_COST_TCP = (40.0, 0.5)
+BLOCK_COST_RTU_OVER_TCP = (80.0, 1.0)  # RS485 gateways: the serial bus behind the gateway dominates
+BLOCK_COST_SERIAL_TURNAROUND = 20.0  # ms of device turnaround per request on top of the frame times
+POLL_TICK_TOLERANCE = 0.1  # seconds: interval group ticks this close together are read in one pass
+# publish filter defaults that plugins can use as publish_defaults; energy counters are published on every change
+PUBLISH_DEFAULTS = {
+    (SensorDeviceClass.POWER, UnitOfPower.WATT): {"publish_deadband": 5},
+    (SensorDeviceClass.POWER, UnitOfPower.KILO_WATT): {"publish_deadband": 0.005},
+    (SensorDeviceClass.APPARENT_POWER, UnitOfApparentPower.VOLT_AMPERE): {"publish_deadband": 5},
+    (SensorDeviceClass.REACTIVE_POWER, UnitOfReactivePower.VOLT_AMPERE_REACTIVE): {"publish_deadband": 5},
+    (SensorDeviceClass.ENERGY, None): {},
+}
+PUBLISH_FORCE_CYCLES = 20  # cycles of an interval group after which all its entities are written, changed or not
+# deferred writes while the inverter sleeps
+WRITEQUEUE_MAX_REGISTERS = 123  # modbus limit for one write_registers request
+WRITEQUEUE_MAX_RETRIES = 5
+WRITEQUEUE_BACKOFF = 30  # seconds before the first retry, doubled for every further failure
+WRITEQUEUE_MAX_BACKOFF = 600
+WRITEQUEUE_SAVE_DELAY = 5  # seconds to collect queue changes before saving them
+READ_RETRY_BUDGET = 3  # resends of unanswered block reads per device group read, shared by its blocks
+UNREADABLE_REPROBE_INTERVAL = 86400  # seconds after which learned rejected register ranges are read again
+EVENT_LINK_HEALTH = f"{DOMAIN}_link_health"
 
 # ================================= Definitions for Sensor Declarations =================================================
 
 REG_HOLDING = 1  # modbus holding register
 REG_INPUT = 2  # modbus input register
-REGISTER_U16 = "_uint16"
-REGISTER_U32 = "_uint32"
-REGISTER_S16 = "_int16"
-REGISTER_S32 = "_int32"
-REGISTER_ULSB16MSB16 = "_ulsb16msb16"  # probably same as REGISTER_U32 - suggest to remove later
-REGISTER_STR = "_string"  # nr of bytes must be specified in wordcount and is 2*wordcount
-REGISTER_WORDS = "_words"  # nr or words must be specified in wordcount
-REGISTER_U8L = "_int8L"
-REGISTER_U8H = "_int8H"
 WRITE_SINGLE_MODBUS = 1  # use write_single_modbus command
 WRITE_MULTISINGLE_MODBUS = 2  # use write_mutiple modbus command for single register
 WRITE_DATA_LOCAL = 3  # write only to local data storage (not persistent)
@@ -139,6 +160,10 @@ class plugin_base:
     auto_block_ignore_readerror: bool | None = (
         None  # if True or False, inserts a ignore_readerror statement for each block
     )
+    block_request_cost: float | None = None  # overrides the per transport block planner request cost (ms)
+    block_register_cost: float | None = None  # overrides the per transport block planner register cost (ms)
+    publish_defaults: dict | None = None  # (device class, unit) or (device class, None) -> publish filter fields
+    wake_keys: list | None = None  # keys polled while isAwake is false, enough to notice the device waking up
     order16: int | None = None  # Endian.BIG or Endian.LITTLE
     order32: int | None = None
     inverter_model: str = None
@@ -192,6 +217,8 @@ class BaseModbusSensorEntityDescription(SensorEntityDescription):
     newblock: bool = False  # set to True to start a new modbus read block operation - do not use frequently
     # prevent_update: bool = False # if set to True, value will not be re-read/updated with each polling cycle; only when read value changes
     value_function: callable = None  #  value = function(initval, descr, datadict)
+    depends_on: list = None  # data keys read by the value_function of a computed sensor or by a scale function
+    # None: inferred from the code of a value_function; a block whose scale function reads its datadict is not cached
     wordcount: int = None  # only for unit = REGISTER_STR and REGISTER_WORDS
     sleepmode: int = SLEEPMODE_LAST  # or SLEEPMODE_ZERO or SLEEPMODE_NONE
     ignore_readerror: bool = False  # if not False, ignore read errors for this block and return this static value
@@ -202,6 +229,15 @@ class BaseModbusSensorEntityDescription(SensorEntityDescription):
     # When simply set to True, no initial value will be returned, but the block will be considered valid
     value_series: int = None  # if not None, the value is part of a series of values with similar properties
     # The name and key must contain a placeholder {} that is replaced by the preceding number
+    # publish filter, applied before the state is written; None falls back to the plugin publish_defaults
+    publish_deadband: float = None  # absolute change, in the unit of the entity, needed to publish a new value
+    publish_deadband_relative: float = None  # change relative to the last published value needed to publish
+    publish_min_interval: float = None  # seconds; a change is held back until this long after the last publish
+    publish_max_interval: float = None  # seconds; heartbeat: publish again after this long, even without change
+    # aggregation: poll fast, publish one aggregate of the samples per aggregate_interval
+    aggregate: str = None  # AGGREGATE_MEAN, AGGREGATE_MIN, AGGREGATE_MAX or AGGREGATE_LAST
+    aggregate_interval: float = None  # seconds per published aggregate, None: AGGREGATE_INTERVAL_DEFAULT
+    aggregate_attributes: bool = False  # add mean, min, max, last and the number of samples as state attributes
 
 
 @dataclass
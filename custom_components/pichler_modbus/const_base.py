@@ -0,0 +1,71 @@
+"""Constants of the modules that work without Home Assistant: block planner, decoder, modbus link, read health
+and aggregates. const.py re-exports all of them, plugins keep importing them from there."""
+
+# ================================= Definitions for Sensor Declarations =================================================
+
+REGISTER_U16 = "_uint16"
+REGISTER_U32 = "_uint32"
+REGISTER_S16 = "_int16"
+REGISTER_S32 = "_int32"
+REGISTER_ULSB16MSB16 = "_ulsb16msb16"  # probably same as REGISTER_U32 - suggest to remove later
+REGISTER_STR = "_string"  # nr of bytes must be specified in wordcount and is 2*wordcount
+REGISTER_WORDS = "_words"  # nr or words must be specified in wordcount
+REGISTER_U8L = "_int8L"
+REGISTER_U8H = "_int8H"
+SLEEPMODE_NONE = None
+SLEEPMODE_ZERO = 0  # when no communication at all
+SLEEPMODE_LAST = 1  # when no communication at all
+SLEEPMODE_LASTAWAKE = 2  # when still responding but register must be ignored when not awake
+
+# ================================= Polling and link tuning =============================================================
+
+SERIAL_TURNAROUND_DELAY = 0.005  # seconds of extra bus silence for RS485 transceiver direction switching
+UTILISATION_PERIOD = 60  # seconds over which the bus utilisation of a modbus link is measured
+DECODE_VECTOR_MIN_FIELDS = 32  # plain numeric entities a block needs to be decoded with NumPy
+# aggregates a sensor can publish instead of every polled value
+AGGREGATE_MEAN = "mean"
+AGGREGATE_MIN = "min"
+AGGREGATE_MAX = "max"
+AGGREGATE_LAST = "last"
+AGGREGATE_MAX_SAMPLES = 1024  # ring buffer size limit per aggregated key
+AGGREGATE_INTERVAL_DEFAULT = 60  # seconds per published aggregate when a sensor declares no aggregate_interval
+# health of the register blocks of a device group
+BLOCK_QUARANTINE_FAILURES = 3  # failures in a row, while the rest of the group is read, that quarantine a block
+BLOCK_PROBE_CYCLES = 4  # group reads between two probes of a quarantined block, doubled after each failed probe
+BLOCK_PROBE_MAX_CYCLES = 64
+GROUP_FAILURE_THRESHOLD = 3  # failed reads in a row after which a device group of an interval group backs off
+GROUP_BACKOFF_MAX_CYCLES = 16  # ticks a backing off device group skips at most; 1 at first, doubled per failure
+# connection manager of a modbus link
+LINK_CONNECTED = "connected"
+LINK_DEGRADED = "degraded"  # some requests failed, but not enough to open the circuit breaker
+LINK_BACKING_OFF = "backing_off"  # circuit open: requests fail fast until the next connection attempt
+LINK_OFFLINE = "offline"  # circuit open and backoff at its maximum
+LINK_FAILURE_THRESHOLD = 3  # consecutive failed requests that open the circuit
+LINK_BACKOFF_MIN = 5  # seconds until the first attempt after the circuit opened, doubled after each failure
+LINK_BACKOFF_MAX = 300
+LINK_BACKOFF_JITTER = 0.2  # +- fraction of the backoff, so hubs and restarts do not retry in lockstep
+LINK_TIMEOUT_SERIAL = 3  # seconds: request timeout until round trips are measured, and its ceiling
+LINK_TIMEOUT_TCP = 5
+LINK_TIMEOUT_MIN = 0.3  # floor of the measured request timeout
+LINK_TIMEOUT_FACTOR = 3.0  # request timeout: 99th percentile of the round trips of a unit times this factor
+LINK_LATENCY_SAMPLES = 200  # last round trips per unit the timeout is derived from
+LINK_LATENCY_MIN_SAMPLES = 20
+LINK_RETRIES = 2  # resends of an unanswered request outside the polling reads, e.g. writes
+# pipelined reads on plain modbus tcp
+PIPELINE_FALLBACK_STRIKES = 3  # requests in a row without response, while others were outstanding, that disable it
+PIPELINE_LATE_RESPONSES = 16  # timed out transactions whose late response is dropped instead of disabling it
+PIPELINE_RETRY_DELAY = 600  # seconds until pipelining is tried again after a fallback, doubled for each fallback
+PIPELINE_RETRY_MAX = 86400
+# request priority classes of the link scheduler, lower goes first
+PRIORITY_WRITE = 0  # writes issued by the user: numbers, selects, buttons, services
+PRIORITY_AUTOREPEAT = 1  # remote control writes repeated by the polling cycle
+PRIORITY_READ_FAST = 2
+PRIORITY_READ_MEDIUM = 3
+PRIORITY_READ_SLOW = 4
+PRIORITY_NAMES = {
+    PRIORITY_WRITE: "write",
+    PRIORITY_AUTOREPEAT: "autorepeat",
+    PRIORITY_READ_FAST: "read_fast",
+    PRIORITY_READ_MEDIUM: "read_medium",
+    PRIORITY_READ_SLOW: "read_slow",
+}
@@ -0,0 +1,186 @@
+"""Slot-indexed data store: the values of all data keys in preallocated lists, committed per read by a buffer swap."""
+
+from array import array
+from collections.abc import MutableMapping
+
+MISSING = object()  # value of a slot that has no data
+
+
+class DataStore(MutableMapping):
+    """The data of a hub; every key has an integer slot with its value, a change bit and the time of its last change.
+
+    Slots are resolved once, when entities and block decoders are set up, and grow for keys that show up later.
+    Reads see the front buffer. A read cycle stages its values in the back buffer, and committing swaps the
+    buffers, so all values of a cycle become visible at once; afterwards only the slots written in the cycle
+    are copied to the new back buffer to keep both in sync. As a MutableMapping, the store is the datadict
+    of the plugin value functions; writes through the mapping are visible immediately.
+    """
+
+    def __init__(self, keys=()):
+        self._slots = {}  # key -> slot
+        self._keys = []  # slot -> key
+        self._front = []  # committed values
+        self._back = []  # the front values, and the values staged by the current cycle
+        self._staged = bytearray()  # 1 for the slots written in the current cycle
+        self._written = []  # slots written in the current cycle, in write order
+        self.changed = bytearray()  # 1 for the slots whose value changed with the last commit that wrote them
+        self.stamps = array("d")  # time of the last change of each slot
+        self.commits = 0
+        for key in keys:
+            self.slot(key)
+
+    def slot(self, key):
+        """The slot of a key, allocated on first use."""
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = len(self._keys)
+            self._keys.append(key)
+            self._front.append(MISSING)
+            self._back.append(MISSING)
+            self._staged.append(0)
+            self.changed.append(0)
+            self.stamps.append(0.0)
+        return slot
+
+    def value(self, slot, default=None):
+        value = self._front[slot]
+        return default if value is MISSING else value
+
+    def __getitem__(self, key):
+        slot = self._slots.get(key)
+        value = MISSING if slot is None else self._front[slot]
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        slot = self._slots.get(key)
+        value = MISSING if slot is None else self._front[slot]
+        return default if value is MISSING else value
+
+    def __contains__(self, key):
+        slot = self._slots.get(key)
+        return slot is not None and self._front[slot] is not MISSING
+
+    def __setitem__(self, key, value):
+        slot = self.slot(key)
+        self._front[slot] = value
+        if not self._staged[slot]:  # a value staged by the running cycle wins at commit, as before
+            self._back[slot] = value
+
+    def __delitem__(self, key):
+        slot = self._slots.get(key)
+        if slot is None or self._front[slot] is MISSING:
+            raise KeyError(key)
+        self._front[slot] = MISSING
+        if not self._staged[slot]:
+            self._back[slot] = MISSING
+
+    def __iter__(self):
+        return (key for key, value in zip(self._keys, self._front) if value is not MISSING)
+
+    def __len__(self):
+        return sum(1 for value in self._front if value is not MISSING)
+
+    def __repr__(self):
+        return f"DataStore({dict(self)})"
+
+    def cycle(self):
+        """Start a read cycle; values staged by a cycle that was not committed are dropped."""
+        self.discard()
+        return DataCycle(self)
+
+    def buffers(self):
+        """(back buffer, staged flags, written slots) of the current cycle, for writers that resolved their slots."""
+        return self._back, self._staged, self._written
+
+    def stage(self, slot, value):
+        self._back[slot] = value
+        if not self._staged[slot]:
+            self._staged[slot] = 1
+            self._written.append(slot)
+
+    def discard(self):
+        front, back, staged = self._front, self._back, self._staged
+        for slot in self._written:
+            back[slot] = front[slot]
+            staged[slot] = 0
+        self._written = []
+
+    def commit(self, now):
+        """Make the values staged by the cycle visible at once; return the keys whose value changed."""
+        front, back, changed, keys = self._front, self._back, self.changed, self._keys
+        written = self._written
+        changed_keys = []
+        for slot in written:
+            old = front[slot]
+            new = back[slot]
+            if old is MISSING or (old is not new and old != new):
+                changed[slot] = 1
+                self.stamps[slot] = now
+                changed_keys.append(keys[slot])
+            else:
+                changed[slot] = 0
+        self._front, self._back = back, front
+        staged = self._staged
+        for slot in written:  # the new back buffer lags behind in the written slots only
+            front[slot] = back[slot]
+            staged[slot] = 0
+        self._written = []
+        self.commits += 1
+        return changed_keys
+
+    def statistics(self):
+        return {"slots": len(self._keys), "values": len(self), "commits": self.commits}
+
+
+class DataCycle(MutableMapping):
+    """The values staged by one read cycle: a dict-like view of the keys written in the cycle only."""
+
+    __slots__ = ("store",)
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, key):
+        store = self.store
+        slot = store._slots.get(key)
+        if slot is None or not store._staged[slot]:
+            raise KeyError(key)
+        return store._back[slot]
+
+    def __contains__(self, key):
+        slot = self.store._slots.get(key)
+        return slot is not None and self.store._staged[slot] == 1
+
+    def __setitem__(self, key, value):
+        self.store.stage(self.store.slot(key), value)
+
+    def __delitem__(self, key):
+        store = self.store
+        slot = store._slots.get(key)
+        if slot is None or not store._staged[slot]:
+            raise KeyError(key)
+        store._back[slot] = store._front[slot]
+        store._staged[slot] = 0
+        store._written.remove(slot)
+
+    def __iter__(self):
+        keys = self.store._keys
+        return (keys[slot] for slot in list(self.store._written))
+
+    def __len__(self):
+        return len(self.store._written)
+
+    def changed(self):
+        """The keys whose staged value differs from the committed one."""
+        store = self.store
+        front, back, keys = store._front, store._back, store._keys
+        return {
+            keys[slot]
+            for slot in store._written
+            if front[slot] is MISSING or (front[slot] is not back[slot] and front[slot] != back[slot])
+        }
+
+    def commit(self, now):
+        return self.store.commit(now)
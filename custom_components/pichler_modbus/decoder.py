@@ -0,0 +1,412 @@
+"""Precompiled block decoding: one struct.Struct per read block instead of a decoder call per register."""
+
+import logging
+import struct
+
+from pymodbus.constants import Endian
+from pymodbus.payload import BinaryPayloadDecoder
+
+try:
+    import numpy as np
+except ImportError:  # the scalar decoder is used
+    np = None
+
+from .const_base import (
+    DECODE_VECTOR_MIN_FIELDS,
+    REGISTER_S16,
+    REGISTER_S32,
+    REGISTER_STR,
+    REGISTER_U16,
+    REGISTER_U32,
+    REGISTER_U8H,
+    REGISTER_U8L,
+    REGISTER_ULSB16MSB16,
+    REGISTER_WORDS,
+    SLEEPMODE_LASTAWAKE,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SCALE_NUMERIC, SCALE_DICT, SCALE_CALLABLE = range(3)
+
+
+def _u32_high_first(values, index):
+    return values[index] << 16 | values[index + 1]
+
+
+def _u32_low_first(values, index):
+    return values[index + 1] << 16 | values[index]
+
+
+def _s32_high_first(values, index):
+    value = values[index] << 16 | values[index + 1]
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def _s32_low_first(values, index):
+    value = values[index + 1] << 16 | values[index]
+    return value - 0x100000000 if value & 0x80000000 else value
+
+
+def _ulsb16msb16(values, index):
+    return values[index] + values[index + 1] * 256 * 256
+
+
+def _string(values, index):
+    return str(values[index].decode("ascii"))
+
+
+def _words(count):
+    def words(values, index):
+        return list(values[index : index + count])
+
+    return words
+
+
+def _u8l(values, index):
+    return values[index] % 256
+
+
+def _u8h(values, index):
+    return values[index] >> 8
+
+
+def treat_address(name, data, decoder, descr, held, awake, initval=0, verbose=False):
+    """Decode one entity at the position of a BinaryPayloadDecoder and store its scaled value in data.
+
+    Byte values (REGISTER_U8L, REGISTER_U8H) take their register from initval. Values of keys with a non-zero
+    expiry in held are not stored, nor are SLEEPMODE_LASTAWAKE values while awake() is False.
+    """
+    return_value = None
+    val = None
+    if verbose:
+        _LOGGER.debug(f"treating register 0x{descr.register:02x} : {descr.key}")
+    try:
+        if descr.unit == REGISTER_U16:
+            val = decoder.decode_16bit_uint()
+        elif descr.unit == REGISTER_S16:
+            val = decoder.decode_16bit_int()
+        elif descr.unit == REGISTER_U32:
+            val = decoder.decode_32bit_uint()
+        elif descr.unit == REGISTER_S32:
+            val = decoder.decode_32bit_int()
+        elif descr.unit == REGISTER_STR:
+            val = str(decoder.decode_string(descr.wordcount * 2).decode("ascii"))
+        elif descr.unit == REGISTER_WORDS:
+            val = [decoder.decode_16bit_uint() for val in range(descr.wordcount)]
+        elif descr.unit == REGISTER_ULSB16MSB16:
+            val = decoder.decode_16bit_uint() + decoder.decode_16bit_uint() * 256 * 256
+        elif descr.unit == REGISTER_U8L:
+            val = initval % 256
+        elif descr.unit == REGISTER_U8H:
+            val = initval >> 8
+        else:
+            _LOGGER.warning(f"undefinded unit for entity {descr.key} - setting value to zero")
+            val = 0
+    except Exception as ex:
+        if verbose:
+            _LOGGER.warning(f"{name}: read failed at 0x{descr.register:02x}: {descr.key}", exc_info=True)
+        else:
+            _LOGGER.warning(f"{name}: read failed at 0x{descr.register:02x}: {descr.key} ")
+
+    if val == None:  # E.g. if errors have occurred during readout
+        return_value = None
+    elif type(descr.scale) is dict:  # translate int to string
+        return_value = descr.scale.get(val, "Unknown")
+    elif callable(descr.scale):  # function to call ?
+        return_value = descr.scale(val, descr, data)
+    else:  # apply simple numeric scaling and rounding if not a list of words
+        try:
+            return_value = round(val * descr.scale, descr.rounding)
+        except:
+            return_value = val  # probably a REGISTER_WORDS instance
+    if (held.get(descr.key, 0) == 0) and ((descr.sleepmode != SLEEPMODE_LASTAWAKE) or awake()):
+        data[descr.key] = return_value  # case prevent_update number
+
+
+def decode_registers(name, block, registers, data, order16, order32, held, awake, verbose=False):
+    """Decode the registers of a block register by register with BinaryPayloadDecoder and treat_address.
+
+    This is the decoding of the blocks BlockDecoder.compile does not handle, and the reference it is tested
+    against.
+    """
+    decoder = BinaryPayloadDecoder.fromRegisters(registers, order16, wordorder=order32)
+    prevreg = block.start
+    for reg in block.regs:
+        if (reg - prevreg) > 0:
+            decoder.skip_bytes((reg - prevreg) * 2)
+            if verbose:
+                _LOGGER.debug(f"skipping bytes {(reg-prevreg) * 2}")
+        descr = block.descriptions[reg]
+        if type(descr) is dict:  #  set of byte values
+            val = decoder.decode_16bit_uint()
+            for k in descr:
+                treat_address(name, data, decoder, descr[k], held, awake, val, verbose)
+            prevreg = reg + 1
+        else:  # single value
+            treat_address(name, data, decoder, descr, held, awake, verbose=verbose)
+            if descr.unit in (
+                REGISTER_S32,
+                REGISTER_U32,
+                REGISTER_ULSB16MSB16,
+            ):
+                prevreg = reg + 2
+            elif descr.unit in (
+                REGISTER_STR,
+                REGISTER_WORDS,
+            ):
+                prevreg = reg + descr.wordcount
+            else:
+                prevreg = reg + 1
+
+
+class BlockDecoder:
+    """Decoding program of a read block, compiled once when the block is planned.
+
+    The registers of a response are packed once and a single unpack_from yields the raw values of all
+    entities; a parallel list of fields holds the description, the index of its first raw value, an
+    optional post-processor combining or converting raw values, and the scaling. The results are the
+    same as decoding the block register by register with decode_registers.
+    """
+
+    def __init__(self, count, fmt, fields, vector=None):
+        self.count = count  # registers in a response
+        self._registers = struct.Struct(f">{count}H")
+        self._values = struct.Struct(fmt)
+        self._fields = fields  # (descr, key, index, post, scale kind, scale, rounding, lastawake, vector index)
+        self._vector = vector
+        self.lastawake = any(field[7] for field in fields)
+        self._store = None  # data store the slots below belong to
+        self._data_slots = ()
+
+    @classmethod
+    def compile(cls, block, order16, order32):
+        """Return the decoder of a block, or None when it has to be decoded register by register.
+
+        Blocks with overlapping registers, units the legacy decoder does not advance over, or byte orders
+        other than big and little endian keep the legacy decoding, so the results stay the same.
+        """
+        if order16 not in (Endian.BIG, Endian.LITTLE) or order32 not in (Endian.BIG, Endian.LITTLE):
+            return None
+        same_order = order16 == order32  # then 32 bit values are native struct codes
+        fmt = [order16.value]
+        fields = []
+        words = {}  # field index -> (register offset, 32 bit, signed) of the plain integer fields
+        index = 0
+        position = block.start
+        for reg in block.regs:
+            if reg < position:
+                return None  # overlapping declarations: the legacy decoder reads them shifted
+            if reg > position:
+                fmt.append(f"{(reg - position) * 2}x")
+            descr = block.descriptions[reg]
+            if type(descr) is dict:  # byte values sharing one register
+                if any(sub.unit not in (REGISTER_U8L, REGISTER_U8H) for sub in descr.values()):
+                    return None
+                fmt.append("H")
+                for sub in descr.values():
+                    fields.append(cls._field(sub, index, _u8l if sub.unit == REGISTER_U8L else _u8h))
+                index += 1
+                position = reg + 1
+                continue
+            unit = descr.unit
+            width = 1
+            if unit in (REGISTER_U16, REGISTER_S16, REGISTER_U32, REGISTER_S32):
+                words[len(fields)] = (
+                    reg - block.start,
+                    unit in (REGISTER_U32, REGISTER_S32),
+                    unit in (REGISTER_S16, REGISTER_S32),
+                )
+            if unit == REGISTER_U16:
+                fmt.append("H")
+                fields.append(cls._field(descr, index, None))
+                index += 1
+            elif unit == REGISTER_S16:
+                fmt.append("h")
+                fields.append(cls._field(descr, index, None))
+                index += 1
+            elif unit in (REGISTER_U32, REGISTER_S32):
+                width = 2
+                if same_order:
+                    fmt.append("I" if unit == REGISTER_U32 else "i")
+                    fields.append(cls._field(descr, index, None))
+                    index += 1
+                else:
+                    if unit == REGISTER_U32:
+                        post = _u32_high_first if order32 == Endian.BIG else _u32_low_first
+                    else:
+                        post = _s32_high_first if order32 == Endian.BIG else _s32_low_first
+                    fmt.append("HH")
+                    fields.append(cls._field(descr, index, post))
+                    index += 2
+            elif unit == REGISTER_ULSB16MSB16:
+                width = 2
+                fmt.append("HH")
+                fields.append(cls._field(descr, index, _ulsb16msb16))
+                index += 2
+            elif unit in (REGISTER_STR, REGISTER_WORDS) and descr.wordcount:
+                width = descr.wordcount
+                if unit == REGISTER_STR:
+                    fmt.append(f"{width * 2}s")
+                    fields.append(cls._field(descr, index, _string))
+                    index += 1
+                else:
+                    fmt.append(f"{width}H")
+                    fields.append(cls._field(descr, index, _words(width)))
+                    index += width
+            else:
+                return None  # single byte values or unknown units
+            position = reg + width
+        vector = None
+        if np is not None:
+            vector = VectorDecoder.compile(fields, words, order16, order32)
+        if vector is None:
+            fields = [(*field, None) for field in fields]
+        else:
+            fields = [(*field, vector.slots.get(number)) for number, field in enumerate(fields)]
+        return cls(block.end - block.start, "".join(fmt), fields, vector)
+
+    @staticmethod
+    def _field(descr, index, post):
+        if type(descr.scale) is dict:
+            kind = SCALE_DICT
+        elif callable(descr.scale):
+            kind = SCALE_CALLABLE
+        else:
+            kind = SCALE_NUMERIC
+        return (
+            descr,
+            descr.key,
+            index,
+            post,
+            kind,
+            descr.scale,
+            descr.rounding,
+            descr.sleepmode == SLEEPMODE_LASTAWAKE,
+        )
+
+    def decode(self, name, registers, data, held, awake):
+        """Decode the registers of a response into the DataCycle data, like treat_address does for each entity.
+
+        Values of keys with a non-zero expiry in held are not stored; awake() is only called when an entity
+        with SLEEPMODE_LASTAWAKE is found, and at most once. The values are staged in the slots of the data
+        store directly, the slots are resolved on the first decode.
+        """
+        if self._store is not data.store:
+            self._store = data.store
+            self._data_slots = [data.store.slot(field[1]) for field in self._fields]
+        back, staged, written = data.store.buffers()
+        payload = self._registers.pack(*registers)
+        values = self._values.unpack_from(payload)
+        vector = None if self._vector is None else self._vector.decode(payload)
+        is_awake = None
+        for field, slot in zip(self._fields, self._data_slots):
+            descr, key, index, post, kind, scale, rounding, lastawake, vector_index = field
+            if vector_index is not None:
+                value = vector[vector_index]
+            else:
+                if post is None:
+                    val = values[index]
+                else:
+                    try:
+                        val = post(values, index)
+                    except Exception:
+                        _LOGGER.warning(f"{name}: read failed at 0x{descr.register:02x}: {key} ")
+                        val = None
+                if val is None:
+                    value = None
+                elif kind == SCALE_NUMERIC:
+                    try:
+                        value = round(val * scale, rounding)
+                    except Exception:
+                        value = val  # probably a REGISTER_WORDS instance
+                elif kind == SCALE_DICT:
+                    value = scale.get(val, "Unknown")
+                else:
+                    value = scale(val, descr, data)
+            if held.get(key, 0) == 0:
+                if lastawake:
+                    if is_awake is None:
+                        is_awake = awake()
+                    if not is_awake:
+                        continue
+                back[slot] = value
+                if not staged[slot]:
+                    staged[slot] = 1
+                    written.append(slot)
+
+
+class VectorDecoder:
+    """NumPy evaluation of the plain numeric fields of a block: 16/32 bit integers with a number as scale.
+
+    All raw values are gathered from one array view of the response and scaled in one operation. Rounding
+    is done with rint on the value times 10**rounding. That equals the correctly rounded round() unless the
+    product is close to a half, so those few values are rounded with round() again; the products are kept
+    below 2**38, where the error of the multiplication is far below the margin. Integer scales keep integer
+    results, like round() does for integers.
+    """
+
+    HALF_MARGIN = 1e-4  # distance from a half below which round() decides
+    MAX_PRODUCT = 2.0**38
+
+    def __init__(self, dtype, int_fields, float_fields):
+        columns = int_fields + float_fields  # (low word, high word, 32 bit, signed, rounding, scale)
+        self._dtype = dtype
+        self._low = np.array([column[0] for column in columns], dtype=np.intp)
+        self._high = np.array([column[1] for column in columns], dtype=np.intp)
+        self._wide = np.array([column[2] for column in columns], dtype=np.int64) * 65536
+        self._signed = any(column[3] for column in columns)
+        self._limit = np.array([(1 << 62) if not c[3] else 0x80000000 if c[2] else 0x8000 for c in columns])
+        self._correction = np.array([0x100000000 if column[2] else 0x10000 for column in columns])
+        self._ints = len(int_fields)
+        self._int_scale = np.array([column[5] for column in int_fields], dtype=np.int64)
+        self._float_scale = np.array([column[5] for column in float_fields], dtype=np.float64)
+        self._pow10 = np.array([10.0 ** column[4] for column in float_fields])
+        self._roundings = [column[4] for column in float_fields]
+        self.slots = {}  # field index of the block decoder -> index in the decoded values
+
+    @classmethod
+    def compile(cls, fields, words, order16, order32):
+        """Return the vector decoder of the plain numeric fields, None when there are too few of them."""
+        int_fields = []
+        float_fields = []
+        for number, (offset, wide, signed) in words.items():
+            _, _, _, _, kind, scale, rounding, _ = fields[number]
+            if kind != SCALE_NUMERIC or type(rounding) is not int or rounding < 0:
+                continue
+            if wide:
+                high, low = (offset, offset + 1) if order32 == Endian.BIG else (offset + 1, offset)
+            else:
+                high = low = offset
+            column = (low, high, wide, signed, rounding, scale)
+            largest = 2.0**32 if wide else 2.0**16
+            if type(scale) is int and abs(scale) < 1 << 30:
+                int_fields.append((number, column))
+            elif type(scale) is float and largest * abs(scale) * 10.0**rounding < cls.MAX_PRODUCT:
+                float_fields.append((number, column))
+        if len(int_fields) + len(float_fields) < DECODE_VECTOR_MIN_FIELDS:
+            return None
+        decoder = cls(
+            np.dtype(">u2" if order16 == Endian.BIG else "<u2"),
+            [column for _, column in int_fields],
+            [column for _, column in float_fields],
+        )
+        decoder.slots = {number: slot for slot, (number, _) in enumerate(int_fields + float_fields)}
+        return decoder
+
+    def decode(self, payload):
+        """The scaled and rounded values of the fields, in slot order, as Python numbers."""
+        words = np.frombuffer(payload, dtype=self._dtype).astype(np.int64)
+        raw = words[self._low] + words[self._high] * self._wide
+        if self._signed:
+            raw -= self._correction * (raw >= self._limit)
+        values = (raw[: self._ints] * self._int_scale).tolist()
+        if len(self._float_scale):
+            scaled = raw[self._ints :] * self._float_scale
+            shifted = scaled * self._pow10
+            nearest = np.rint(shifted)
+            rounded = (nearest / self._pow10).tolist()
+            for i in np.flatnonzero(np.abs(shifted - nearest) > 0.5 - self.HALF_MARGIN).tolist():
+                rounded[i] = round(float(scaled[i]), self._roundings[i])
+            values += rounded
+        return values
@@ -0,0 +1,13 @@
+"""Diagnostics support for the modbus hub: scheduler and polling statistics."""
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict:
+    """Return diagnostics for a config entry."""
+    hub = hass.data[DOMAIN][entry.options[CONF_NAME]]["hub"]
+    return hub.diagnostics()
@@ -96,9 +96,11 @@ class SolaXModbusNumber(NumberEntity):
         self._state = number_info.state  # not used AFAIK
         self.entity_description = number_info
         self._write_method = number_info.write_method
+        self._value = None  # state, computed by update_value when the data changed
 
     async def async_added_to_hass(self) -> None:
         """Register callbacks."""
+        self.update_value()
         await self._hub.async_add_solax_modbus_sensor(self)
 
     async def async_will_remove_from_hass(self) -> None:
@@ -122,8 +124,11 @@ class SolaXModbusNumber(NumberEntity):
     def unique_id(self) -> Optional[str]:
         return f"{self._platform_name}_{self._key}"
 
-    @property
-    def native_value(self) -> float:
+    def update_value(self) -> None:
+        """Compute the state once, when the data, a local value or the read_scale changed."""
+        self._value = self._compute_value()
+
+    def _compute_value(self) -> float:
         descr = self.entity_description
         if descr.prevent_update:
             if self._hub.tmpdata_expiry.get(descr.key, 0) > time():
@@ -160,6 +165,10 @@ class SolaXModbusNumber(NumberEntity):
                 # _LOGGER.warning(f"****** (debug) initializing {self._key}  = {res}")
                 return res
 
+    @property
+    def native_value(self) -> float:
+        return self._value
+
     async def async_set_native_value(self, value: float) -> None:
         """Change the number value."""
         if value is None:
@@ -207,4 +216,5 @@ class SolaXModbusNumber(NumberEntity):
                 # corresponding_sensor.async_write_ha_state()
             self._hub.localsUpdated = True  # mark to save permanently
         # _LOGGER.info(f"*** data written part 2 {self._key}: {self._hub.data[self._key]}")
+        self.update_value()
         self.async_write_ha_state()  # is this needed ?
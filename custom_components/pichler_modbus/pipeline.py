@@ -0,0 +1,173 @@
+"""Pipelined Modbus TCP reads: several outstanding requests, matched to their responses by transaction id."""
+
+import asyncio
+import logging
+from time import monotonic
+
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from pymodbus.framer import FramerSocket
+from pymodbus.pdu import DecodePDU
+from pymodbus.pdu.register_message import ReadHoldingRegistersRequest, ReadInputRegistersRequest
+
+from .const_base import PIPELINE_FALLBACK_STRIKES, PIPELINE_LATE_RESPONSES, PIPELINE_RETRY_DELAY, PIPELINE_RETRY_MAX
+
+_LOGGER = logging.getLogger(__name__)
+
+MBAP_HEADER_SIZE = 7
+
+
+class ModbusTcpPipeline:
+    """Modbus TCP read client with a bounded window of in-flight requests.
+
+    Only usable for the plain Modbus TCP framing, as RTU or ASCII over TCP frames carry no transaction id.
+    The responses are the pymodbus response objects, so they can be decoded like those of the normal client.
+    When the device misbehaves (a response to a transaction that was never sent, or PIPELINE_FALLBACK_STRIKES
+    requests in a row without response while others were outstanding) the pipeline falls back: its connection
+    is closed, the requests in flight fail as lost frames and active turns False, so the caller continues with
+    the sequential client. A late response to a request that timed out is dropped and is no reason to fall
+    back. Pipelining is tried again PIPELINE_RETRY_DELAY seconds after a fallback, doubled after each further
+    fallback up to PIPELINE_RETRY_MAX.
+    """
+
+    def __init__(self, name, host, port, window, timeout=5):
+        self._name = name
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self.window = window
+        self._configured_window = window
+        self._retry_at = None  # monotonic time at which pipelining is tried again after a fallback
+        self._retry_delay = PIPELINE_RETRY_DELAY
+        self._strikes = 0  # requests in a row without response while others were outstanding
+        self._timed_out = []  # transaction ids of the last requests that got no response in time
+        self.fallbacks = 0
+        self._framer = FramerSocket(DecodePDU(False))
+        self._reader = None
+        self._writer = None
+        self._receive_task = None
+        self._connect_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(window)
+        self._pending = {}  # transaction id -> future of the response
+        self._next_tid = 0
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    @property
+    def active(self):
+        """False while pipelining is disabled by a fallback, until its retry delay has passed."""
+        if self._retry_at is not None and monotonic() >= self._retry_at:
+            self._retry_at = None
+            self.window = self._configured_window
+            _LOGGER.info(f"{self._name}: trying pipelined reads with window {self.window} again")
+        return self.window > 1
+
+    async def async_connect(self):
+        async with self._connect_lock:
+            if self.connected:
+                return True
+            try:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self._host, self._port), self._timeout
+                )
+            except (OSError, asyncio.TimeoutError) as ex:
+                _LOGGER.warning(f"{self._name}: pipelined connection to {self._host}:{self._port} failed: {ex}")
+                self._reader = self._writer = None
+                return False
+            self._receive_task = asyncio.create_task(self._async_receive())
+            _LOGGER.info(f"{self._name}: pipelined connection to {self._host}:{self._port} with window {self.window}")
+            return True
+
+    def close(self):
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            self._receive_task = None
+        self._disconnect(ConnectionException("pipelined connection closed"))
+
+    def _disconnect(self, ex):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._fail_pending(ex)
+
+    def fallback(self, reason):
+        """Hand the reads back to the sequential client until the retry delay has passed."""
+        if self.window > 1:
+            _LOGGER.warning(
+                f"{self._name}: disabling pipelined reads ({reason}), falling back to one request at a time, "
+                f"trying again in {self._retry_delay:.0f}s"
+            )
+            self.window = 1
+            self.fallbacks += 1
+            self._retry_at = monotonic() + self._retry_delay
+            self._retry_delay = min(self._retry_delay * 2, PIPELINE_RETRY_MAX)
+            self._strikes = 0
+        # requests in flight were sent on this connection: they fail as lost frames and are read again in turn
+        if self._receive_task is not None:
+            self._receive_task.cancel()
+            self._receive_task = None
+        self._disconnect(ModbusIOException("pipelined reads disabled"))
+
+    def _fail_pending(self, ex):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ex)
+        self._pending = {}
+
+    async def _async_receive(self):
+        try:
+            while True:
+                header = await self._reader.readexactly(MBAP_HEADER_SIZE)
+                length = int.from_bytes(header[4:6], "big")
+                frame = header + await self._reader.readexactly(length - 1)
+                _, pdu = self._framer.processIncomingFrame(frame)
+                future = self._pending.pop(pdu.transaction_id, None) if pdu else None
+                if future is None:
+                    if pdu is not None and pdu.transaction_id in self._timed_out:
+                        _LOGGER.debug(f"{self._name}: dropping late response to transaction {pdu.transaction_id}")
+                        continue
+                    self._receive_task = None  # this task ends here, the fallback closes the connection
+                    self.fallback(f"unexpected response {pdu}")
+                    return
+                if not future.done():
+                    future.set_result(pdu)
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:  # connection lost or garbage received
+            _LOGGER.info(f"{self._name}: pipelined connection lost: {ex}")
+            self._disconnect(ConnectionException(f"pipelined connection lost: {ex}"))
+
+    async def _async_execute(self, request, timeout=None):
+        async with self._slots:
+            if not self.active:  # disabled while this request waited for a slot
+                raise ModbusIOException("pipelined reads disabled")
+            if not self.connected and not await self.async_connect():
+                raise ConnectionException(f"cannot connect to {self._host}:{self._port}")
+            self._next_tid = self._next_tid % 65000 + 1
+            request.transaction_id = self._next_tid
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request.transaction_id] = future
+            outstanding = len(self._pending)
+            self._writer.write(self._framer.buildFrame(request))
+            try:
+                response = await asyncio.wait_for(future, timeout or self._timeout)
+            except asyncio.TimeoutError as ex:
+                self._pending.pop(request.transaction_id, None)
+                self._timed_out = self._timed_out[-PIPELINE_LATE_RESPONSES + 1 :] + [request.transaction_id]
+                if outstanding > 1:
+                    self._strikes += 1
+                    if self._strikes >= PIPELINE_FALLBACK_STRIKES:
+                        self.fallback(f"{self._strikes} requests without response while others were outstanding")
+                raise ModbusIOException(f"no response for transaction {request.transaction_id}") from ex
+            if outstanding > 1:  # the device answers while others are outstanding
+                self._strikes = 0
+            return response
+
+    async def read_holding_registers(self, address, count, slave=1, timeout=None):
+        request = ReadHoldingRegistersRequest(address=address, count=count, dev_id=slave)
+        return await self._async_execute(request, timeout)
+
+    async def read_input_registers(self, address, count, slave=1, timeout=None):
+        request = ReadInputRegistersRequest(address=address, count=count, dev_id=slave)
+        return await self._async_execute(request, timeout)
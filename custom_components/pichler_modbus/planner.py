@@ -0,0 +1,153 @@
+""" Read block planning: the register blocks of a device group and the data keys scale functions read.
+Works without Home Assistant, so it can be tested on its own. """
+import logging
+from typing import Any
+from dataclasses import dataclass
+import inspect
+import dis
+
+from .const_base import REGISTER_U32, REGISTER_S32, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS, REGISTER_U8H, REGISTER_U8L
+
+_LOGGER = logging.getLogger(__name__)
+
+# =================================== sorting and grouping of entities ================================================
+
+@dataclass
+class block():
+    start: int = None # start address of the block
+    end: int = None # end address of the block
+    #order16: int = None # byte endian for 16bit registers
+    #order32: int = None # word endian for 32bit registers
+    descriptions: Any = None
+    regs: Any = None # sorted list of registers used in this block
+    ignore_readerror: Any = False # block read errors are ignored when not False, see BaseModbusSensorEntityDescription
+    decoder: Any = None # precompiled BlockDecoder, None: decoded register by register
+    cache: Any = None # last payload and decoded values, see SolaXModbusHub.block_cache
+
+
+@dataclass
+class block_cost():
+    request: float = 80.0 # fixed cost of one read request in ms (round trip, framing, turnaround)
+    register: float = 1.0 # cost of transferring one register in ms
+    max_registers: int = 100 # maximum number of registers in one read request
+
+
+def registerWidth(descr):
+    """ number of registers occupied by a description or a dict of byte descriptions """
+    if type(descr) is dict: return 1 # couple of byte values
+    if descr.unit in (REGISTER_STR, REGISTER_WORDS,):
+        if (descr.wordcount): return descr.wordcount
+        _LOGGER.warning(f"invalid or missing missing wordcount for {descr.key}")
+        return 1
+    if descr.unit in (REGISTER_S32, REGISTER_U32, REGISTER_ULSB16MSB16,): return 2
+    return 1
+
+
+def referencedKeys(func, _seen = None):
+    """ string constants in the code of a function and of the module functions it calls: the data keys it may use """
+    seen = set() if _seen is None else _seen
+    func = getattr(func, "__func__", func) # bound method
+    code = getattr(func, "__code__", None)
+    if code is None or code in seen: return set()
+    seen.add(code)
+    keys = set()
+    codes = [code]
+    while codes:
+        c = codes.pop()
+        for const in c.co_consts:
+            if isinstance(const, str): keys.add(const)
+            elif inspect.iscode(const): codes.append(const) # nested function or lambda
+        for name in c.co_names:
+            target = func.__globals__.get(name)
+            if inspect.isfunction(target): keys |= referencedKeys(target, seen)
+    return keys
+
+
+def keyFragments(strings):
+    """ the strings from referencedKeys that may be parts of keys built at runtime, e.g. the series keys of value_series:
+    a function reading f"battery_{nr}_voltage" only has the constants "battery_" and "_voltage" in its code.
+    Keys are lower case words joined by underscores, so a fragment has an underscore. It needs 6 characters as well:
+    shorter ones like "_1", "pv_" or "_kw" are substrings of many unrelated keys and would keep most registers in
+    the plan, while a fragment naming a quantity ("_power", "battery_") is longer. Errs on the side of reading. """
+    return {s for s in strings if "_" in s and len(s) >= 6}
+
+
+def matchesFragment(key, fragments):
+    """ whether a data key contains one of the keyFragments, i.e. may be a generated key a function reads """
+    return any(fragment in key for fragment in fragments)
+
+
+def readsData(func):
+    """ whether a scale function(initval, descr, datadict) uses its datadict, i.e. its value may depend on other keys """
+    bound = hasattr(func, "__self__")
+    func = getattr(func, "__func__", func) # bound method
+    code = getattr(func, "__code__", None)
+    if code is None or code.co_argcount < 3 + bound: return True # unknown callables may read anything
+    name = code.co_varnames[2 + bound]
+    if name in code.co_cellvars: return True # passed on to a nested function
+    for ins in dis.get_instructions(code):
+        if ins.opname.startswith("LOAD_FAST") and name in (ins.argval if type(ins.argval) is tuple else (ins.argval,)): return True
+    return False
+
+
+def mergeRegisterMaps(maps):
+    """ union of several register dicts, sorted; byte descriptions of the same register are combined in a dict """
+    merged = {}
+    for regs in maps:
+        for reg, descr in regs.items():
+            first = merged.get(reg)
+            if first is None or first is descr: merged[reg] = descr
+            elif type(first) is dict or type(descr) is dict or first.unit in (REGISTER_U8H, REGISTER_U8L,):
+                firsts = first if type(first) is dict else { first.unit: first }
+                seconds = descr if type(descr) is dict else { descr.unit: descr }
+                merged[reg] = { **firsts, **seconds }
+            else: merged[reg] = descr # same register declared in two groups
+    return dict(sorted(merged.items()))
+
+
+def planBlocks( descriptions, cost, auto_block_ignore_readerror, unreadable = () ):
+    """ split the sorted register dict in read blocks with the lowest total cost
+
+    Each block costs cost.request plus cost.register for every register between its start and end,
+    including the unused gaps. A block never spans more than cost.max_registers registers
+    (unless a single entity is larger), never spans one of the (start, end) ranges in unreadable
+    (an empty range (split, split) only forbids blocks that start before and end after split)
+    and a new block is always started at an entity that declares newblock or a non-False ignore_readerror.
+    A block takes the ignore_readerror of its first entity; later blocks that were only split off by the planner
+    get auto_block_ignore_readerror instead, when it is True or False.
+    """
+    regs = list(descriptions)
+    n = len(regs)
+    ends = []
+    forced = []
+    for reg in regs:
+        descr = descriptions[reg]
+        ends.append(reg + registerWidth(descr))
+        forced.append((not type(descr) is dict) and (descr.newblock or (descr.ignore_readerror is not False)))
+    best = [0.0] * (n + 1) # best[j]: lowest cost for reading the first j registers
+    cut = [0] * (n + 1) # cut[j]: index of the first register of the last block in the best plan for j
+    for j in range(1, n + 1):
+        best[j] = None
+        end = 0
+        for i in range(j - 1, -1, -1): # candidate last block regs[i:j]
+            end = max(end, ends[i])
+            if (i < j - 1) and ((end - regs[i]) > cost.max_registers): break
+            if any((start < end) and (regs[i] < stop) for (start, stop) in unreadable): break
+            total = best[i] + cost.request + (end - regs[i]) * cost.register
+            if (best[j] is None) or (total < best[j]):
+                best[j] = total
+                cut[j] = i
+            if forced[i]: break # a block may not extend before a forced boundary
+    blocks = []
+    j = n
+    while j > 0:
+        i = cut[j]
+        curblockregs = regs[i:j]
+        first = descriptions[curblockregs[0]]
+        ignore_readerror = False if type(first) is dict else first.ignore_readerror
+        if (i > 0) and (ignore_readerror is False) and ( (auto_block_ignore_readerror == True) or (auto_block_ignore_readerror == False) ):
+            if (type(first) is dict) or not first.newblock: ignore_readerror = auto_block_ignore_readerror # automatically created block; the first block keeps the flag of its first entity
+        blocks.insert(0, block(start = regs[i], end = max(ends[i:j]), descriptions = descriptions, regs = curblockregs, ignore_readerror = ignore_readerror))
+        j = i
+    if n: _LOGGER.debug(f"planned {len(blocks)} blocks with estimated cost {best[n]:.1f}ms using {cost}")
+    return blocks
@@ -868,4 +868,5 @@ plugin_instance = pichler_plugin(
     order16=Endian.BIG,
     order32=Endian.LITTLE,
     auto_block_ignore_readerror=True,
+    publish_defaults=PUBLISH_DEFAULTS,
 )
@@ -8097,4 +8097,6 @@ plugin_instance = solax_plugin(
     order16=Endian.BIG,
     order32=Endian.LITTLE,
     auto_block_ignore_readerror=True,
+    publish_defaults=PUBLISH_DEFAULTS,
+    wake_keys=["run_mode", "pv_voltage_1", "pv_voltage_2"],
 )
@@ -60,9 +60,11 @@ class SolaXModbusSelect(SelectEntity):
         self.entity_description = select_info
         self._attr_options = list(select_info.option_dict.values())
         self._write_method = select_info.write_method
+        self._value = None # state, computed by update_value when the data changed
 
     async def async_added_to_hass(self):
         """Register callbacks."""
+        self.update_value()
         await self._hub.async_add_solax_modbus_sensor(self)
 
     async def async_will_remove_from_hass(self) -> None:
@@ -71,12 +73,15 @@ class SolaXModbusSelect(SelectEntity):
     def modbus_data_updated(self):
         self.async_write_ha_state()
 
-    @property
-    def current_option(self) -> str:
+    def update_value(self):
         if self._key in self._hub.data:
-            return self._hub.data[self._key]
+            self._value = self._hub.data[self._key]
         else:
-            return self.entity_description.initvalue
+            self._value = self.entity_description.initvalue
+
+    @property
+    def current_option(self) -> str:
+        return self._value
 
     @property
     def name(self):
@@ -110,4 +115,5 @@ class SolaXModbusSelect(SelectEntity):
             elif self._write_method == WRITE_DATA_LOCAL:
                 _LOGGER.info(f"*** local data written {self._key}: {payload}")
                 self._hub.localsUpdated = True # mark to save permanently
+        self.update_value()
         self.async_write_ha_state()
\ No newline at end of file
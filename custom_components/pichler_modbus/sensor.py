@@ -10,64 +10,13 @@ from copy import copy
 import homeassistant.util.dt as dt_util
 
 from .const import ATTR_MANUFACTURER, DOMAIN, SLEEPMODE_NONE, SLEEPMODE_ZERO
-from .const import INVERTER_IDENT, REG_INPUT, REG_HOLDING, REGISTER_U32, REGISTER_S32, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS, REGISTER_U8H, REGISTER_U8L, CONF_READ_BATTERY
+from .const import INVERTER_IDENT, REG_INPUT, REG_HOLDING, CONF_READ_BATTERY
 from .const import BaseModbusSensorEntityDescription
 from homeassistant.components.sensor import SensorEntityDescription
 from homeassistant.helpers.device_registry import DeviceInfo
 
 _LOGGER = logging.getLogger(__name__)
 
-INVALID_START = 99999
-
-
-# =================================== sorting and grouping of entities ================================================
-
-@dataclass
-class block():
-    start: int = None # start address of the block
-    end: int = None # end address of the block
-    #order16: int = None # byte endian for 16bit registers
-    #order32: int = None # word endian for 32bit registers
-    descriptions: Any = None
-    regs: Any = None # sorted list of registers used in this block
-
-
-def splitInBlocks( descriptions, block_size, auto_block_ignore_readerror ):
-    start = INVALID_START
-    end = 0
-    blocks = []
-    curblockregs = []
-    for reg in descriptions:
-        descr = descriptions[reg]
-        if (not type(descr) is dict) and (descr.newblock or ((reg - start) > block_size)):
-            if ((end - start) > 0):
-                _LOGGER.debug(f"Starting new block at 0x{reg:x} ")
-                if  ( (auto_block_ignore_readerror == True) or (auto_block_ignore_readerror == False) ) and not descr.newblock: # automatically created block
-                    descr.ignore_readerror = auto_block_ignore_readerror
-                #newblock = block(start = start, end = end, order16 = descriptions[start].order16, order32 = descriptions[start].order32, descriptions = descriptions, regs = curblockregs)
-                newblock = block(start = start, end = end, descriptions = descriptions, regs = curblockregs)
-                blocks.append(newblock)
-                start = INVALID_START
-                end = 0
-                curblockregs = []
-            else: _LOGGER.info(f"newblock declaration found for empty block")
-
-        if start == INVALID_START: start = reg
-        if type(descr) is dict: end = reg+1 # couple of byte values
-        else:
-            _LOGGER.debug(f"adding register 0x{reg:x} {descr.key} to block with start 0x{start:x}")
-            if descr.unit in (REGISTER_STR, REGISTER_WORDS,):
-                if (descr.wordcount): end = reg+descr.wordcount
-                else: _LOGGER.warning(f"invalid or missing missing wordcount for {descr.key}")
-            elif descr.unit in (REGISTER_S32, REGISTER_U32, REGISTER_ULSB16MSB16,):  end = reg + 2
-            else: end = reg + 1
-        curblockregs.append(reg)
-    if ((end-start)>0): # close last block
-        #newblock = block(start = start, end = end, order16 = descriptions[start].order16, order32 = descriptions[start].order32, descriptions = descriptions, regs = curblockregs)
-        newblock = block(start = start, end = end, descriptions = descriptions, regs = curblockregs)
-        blocks.append(newblock)
-    return blocks
-
 # ========================================================================================================================
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -167,6 +116,8 @@ async def async_setup_entry(hass, entry, async_add_entities):
                          battery_config.battery_sensor_type, name_prefix, key_prefix, readPreparation, readFollowUp)
 
     async_add_entities(entities)
+    hub.update_disabled_keys() # registers of disabled entities are left out of the block plan
+    entry.async_on_unload(hub.track_entity_registry())
     _LOGGER.info(f"{hub_name} sensor groups: {len(groups)}")
     #now the groups are available
     for interval, interval_group in groups.items():
@@ -183,8 +134,9 @@ async def async_setup_entry(hass, entry, async_add_entities):
             hub_device_group = hub_interval_group.device_groups.setdefault(device_name, hub.empty_device_group())
             hub_device_group.readPreparation = device_group.readPreparation
             hub_device_group.readFollowUp = device_group.readFollowUp
-            hub_device_group.holdingBlocks = splitInBlocks(holdingRegs, hub.plugin.block_size, hub.plugin.auto_block_ignore_readerror)
-            hub_device_group.inputBlocks = splitInBlocks(inputRegs, hub.plugin.block_size, hub.plugin.auto_block_ignore_readerror)
+            hub_device_group.holdingRegs = holdingRegs
+            hub_device_group.inputRegs = inputRegs
+            hub.plan_device_group(hub_device_group)
             hub.computedSensors = computedRegs
 
             for i in hub_device_group.holdingBlocks: _LOGGER.info(f"{hub_name} returning holding block: 0x{i.start:x} 0x{i.end:x} {i.regs}")
@@ -192,6 +144,7 @@ async def async_setup_entry(hass, entry, async_add_entities):
             _LOGGER.debug(f"holdingBlocks: {hub_device_group.holdingBlocks}")
             _LOGGER.debug(f"inputBlocks: {hub_device_group.inputBlocks}")
 
+    hub.plan_computed_sensors()
     _LOGGER.info(f"computedRegs: {hub.computedSensors}")
     return True
 
@@ -281,9 +234,13 @@ class SolaXModbusSensor(SensorEntity):
         self._hub = hub
         self.entity_id = "sensor." + platform_name + "_" + description.key
         self.entity_description: BaseModbusSensorEntityDescription = description
+        self._slot = hub.data.slot(description.key) # resolved once, the state is read by slot
+        self._value = None # state and attributes, computed by update_value when the data changed
+        self._attributes = None
 
     async def async_added_to_hass(self):
         """Register callbacks."""
+        self.update_value()
         await self._hub.async_add_solax_modbus_sensor(self)
 
     async def async_will_remove_from_hass(self) -> None:
@@ -308,10 +265,28 @@ class SolaXModbusSensor(SensorEntity):
     def unique_id(self) -> Optional[str]:
         return f"{self._platform_name}_{self.entity_description.key}"
 
+    def update_value(self):
+        """Compute the state from the hub data with the current read_scale; called by the hub when the data changed."""
+        descr = self.entity_description
+        result = self._hub.aggregator.results.get(descr.key)
+        if descr.aggregate and result is not None:
+            val = result[descr.aggregate]*descr.read_scale
+        else:
+            val = self._hub.data.value(self._slot, None)
+            if val is not None:
+                try:    val = val*descr.read_scale # a bit ugly as we might multiply strings or other types with 1
+                except: pass # not a number
+        self._value = val
+        if descr.aggregate_attributes and result is not None:
+            self._attributes = {name: (value if name == "samples" else value*descr.read_scale) for name, value in result.items()}
+        else: self._attributes = None
+
     @property
     def native_value(self):
         """Return the state of the sensor."""
-        if self.entity_description.key in self._hub.data:
-            try:    val = self._hub.data[self.entity_description.key]*self.entity_description.read_scale # a bit ugly as we might multiply strings or other types with 1
-            except: val = self._hub.data[self.entity_description.key] # not a number
-            return val
+        return self._value
+
+    @property
+    def extra_state_attributes(self):
+        """Aggregates of the last window, for sensors with aggregate_attributes."""
+        return self._attributes
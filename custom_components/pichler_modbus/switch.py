@@ -62,11 +62,16 @@ class SolaXModbusSwitch(SwitchEntity):
         self._bit = switch_info.register_bit
         self._value_function = switch_info.value_function
         self._last_command_time = None  # Tracks last user action
+        self._value = False  # state, computed by update_value on each poll and command
+
+    async def async_added_to_hass(self):
+        self.update_value()
 
     async def async_turn_on(self, **kwargs):
         """Turn the switch on."""
         self._attr_is_on = True
         self._last_command_time = datetime.now()  # Record user action time
+        self.update_value()
         self.async_write_ha_state()
         await self._write_switch_to_modbus()
 
@@ -74,6 +79,7 @@ class SolaXModbusSwitch(SwitchEntity):
         """Turn the switch off."""
         self._attr_is_on = False
         self._last_command_time = datetime.now()  # Record user action time
+        self.update_value()
         self.async_write_ha_state()
         await self._write_switch_to_modbus()
 
@@ -86,9 +92,14 @@ class SolaXModbusSwitch(SwitchEntity):
         _LOGGER.debug(f"Writing {self._platform_name} {self._key} to register {self._register} with value {payload}")
         await self._hub.async_write_registers_single(unit=self._modbus_addr, address=self._register, payload=payload)
 
-    @property
-    def is_on(self):
-        """Return the state of the switch."""
+    async def async_update(self):
+        """Polled by HA before the state is written."""
+        self.update_value()
+
+    def update_value(self):
+        self._value = self._compute_is_on()
+
+    def _compute_is_on(self):
         # Prioritize user action within debounce time
         if self._last_command_time and datetime.now() - self._last_command_time < DEBOUNCE_TIME:
             return self._attr_is_on
@@ -100,6 +111,11 @@ class SolaXModbusSwitch(SwitchEntity):
 
         return self._attr_is_on
 
+    @property
+    def is_on(self):
+        """Return the state of the switch."""
+        return self._value
+
     @property
     def unique_id(self) -> Optional[str]:
         return f"{self._platform_name}_{self._key}"
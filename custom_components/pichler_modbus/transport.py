@@ -0,0 +1,533 @@
+"""Process wide registry of modbus links, shared by all hubs that talk over the same gateway or serial port."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import heapq
+import logging
+from random import uniform
+from time import monotonic
+
+from pymodbus.client import AsyncModbusSerialClient, AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusException, ModbusIOException
+from pymodbus.framer import FramerType
+
+from .const_base import (
+    LINK_BACKING_OFF,
+    LINK_BACKOFF_JITTER,
+    LINK_BACKOFF_MAX,
+    LINK_BACKOFF_MIN,
+    LINK_CONNECTED,
+    LINK_DEGRADED,
+    LINK_FAILURE_THRESHOLD,
+    LINK_LATENCY_MIN_SAMPLES,
+    LINK_LATENCY_SAMPLES,
+    LINK_OFFLINE,
+    LINK_RETRIES,
+    LINK_TIMEOUT_FACTOR,
+    LINK_TIMEOUT_MIN,
+    LINK_TIMEOUT_SERIAL,
+    LINK_TIMEOUT_TCP,
+    PRIORITY_NAMES,
+    PRIORITY_WRITE,
+    SERIAL_TURNAROUND_DELAY,
+    UTILISATION_PERIOD,
+)
+from .aggregate import SampleRing
+from .pipeline import ModbusTcpPipeline
+
+_LOGGER = logging.getLogger(__name__)
+
+LINKS = {}  # link key -> ModbusLink
+
+# group (e.g. the scan interval) on whose behalf the current task issues requests, used for fair arbitration
+request_group = ContextVar("request_group", default=None)
+# priority class of the requests of the current task; outside of a polling task, requests are user writes
+request_priority = ContextVar("request_priority", default=PRIORITY_WRITE)
+
+
+def serial_frame_gap(baudrate):
+    """Silent time between two RTU frames: 3.5 character times (fixed 1.75ms above 19200 baud) plus turnaround."""
+    if baudrate > 19200:
+        silent = 0.00175
+    else:
+        silent = 3.5 * 11 / baudrate  # 11 bits per character
+    return silent + SERIAL_TURNAROUND_DELAY
+
+
+def lost_frame(ex):
+    """True for a request that got no response in time, as opposed to a refused connection or an error response."""
+    return isinstance(ex, (ModbusIOException, asyncio.TimeoutError))
+
+
+class LatencyTracker:
+    """Round trip times of the last requests to one unit, and the request timeout derived from them.
+
+    The timeout is the 99th percentile times LINK_TIMEOUT_FACTOR, between LINK_TIMEOUT_MIN and the default
+    timeout of the link, which also applies until LINK_LATENCY_MIN_SAMPLES round trips are known. A single
+    request without response is a lost frame and leaves the timeout alone; from the second one in a row the
+    timeout doubles, so a device that became slower gets answered again and its round trips raise the timeout.
+    """
+
+    UPDATE_EVERY = 10  # round trips between two updates of the percentiles
+
+    def __init__(self, default):
+        self._samples = SampleRing(LINK_LATENCY_SAMPLES)
+        self._pending = 0  # round trips since the last update
+        self.default = default
+        self.timeout = default
+        self.p50 = None
+        self.p99 = None
+        self.timeouts = 0
+        self._misses = 0  # requests without response in a row
+
+    def add(self, seconds):
+        self._misses = 0
+        self._samples.add(seconds)
+        self._pending += 1
+        if self._pending >= self.UPDATE_EVERY:
+            self._update()
+
+    def timed_out(self):
+        self.timeouts += 1
+        self._misses += 1
+        if self._misses > 1:
+            self.timeout = min(self.timeout * 2, self.default)
+
+    def _update(self):
+        self._pending = 0
+        if self._samples.count < LINK_LATENCY_MIN_SAMPLES:
+            return
+        samples = sorted(self._samples.values())
+        self.p50 = samples[len(samples) // 2]
+        self.p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+        self.timeout = min(max(self.p99 * LINK_TIMEOUT_FACTOR, LINK_TIMEOUT_MIN), self.default)
+
+    def statistics(self):
+        return {
+            "samples": self._samples.count,
+            "p50": None if self.p50 is None else round(self.p50, 4),
+            "p99": None if self.p99 is None else round(self.p99, 4),
+            "timeout": round(self.timeout, 3),
+            "timeouts": self.timeouts,
+        }
+
+
+def link_key(interface, host=None, port=None, tcp_type=None, serial_port=None):
+    """Return the key of the physical link: host:port:framer for tcp, the port name for serial."""
+    if interface == "serial":
+        return f"serial:{serial_port}"
+    return f"{host}:{port}:{tcp_type}"
+
+
+class ModbusLink:
+    """One modbus client per physical link, with a scheduler that serialises the requests of all hubs using it.
+
+    Waiting requests are granted by priority class first, so a user write goes out right after the block read in
+    progress instead of after the whole polling cycle. Within a class, requests are granted in weighted fair
+    order over flows (unit id, request group), so one device or scan group cannot starve the others: each
+    request advances the virtual time of its flow by 1/weight, and the waiting request with the lowest virtual
+    start time goes next. On serial links, the scheduler also keeps the silent interval between the end of one
+    frame and the start of the next. Requests through the client are exclusive; pipelined reads take their
+    turn the same way, but up to the pipeline window of them may be in flight at once.
+
+    The link also acts as connection manager with a circuit breaker: after LINK_FAILURE_THRESHOLD consecutive
+    failed requests the circuit opens, the client is closed and requests fail immediately until a jittered,
+    exponentially growing backoff expires. Then a single trial request may reconnect; its outcome closes the
+    circuit or doubles the backoff. Listeners are called with (key, previous state, state) on every change.
+
+    Request timeouts follow the measured round trip times of each unit, see LatencyTracker.
+    """
+
+    def __init__(self, key, client, pipeline=None, frame_gap=0.0, timeout=LINK_TIMEOUT_TCP):
+        self.key = key
+        self.client = client
+        self.pipeline = pipeline
+        self.pipeline_window = 1 if pipeline is None else pipeline.window  # as configured by the first hub
+        self.frame_gap = frame_gap
+        self.default_timeout = timeout  # also the timeout of connection attempts
+        self.latency = {}  # unit -> LatencyTracker
+        self.refcount = 0
+        self.hubs = set()  # names of the hubs using this link
+        self.weights = {}  # flow -> share of the link relative to the other flows
+        self._connect_lock = asyncio.Lock()
+        self._inflight = 0  # granted requests
+        self._client_busy = False  # a granted request uses the client
+        self._queue = []  # heap of (priority, virtual start, sequence, pipelined, future) of waiting requests
+        self._sequence = 0
+        self._vtime = 0.0  # virtual start of the last completed request
+        self._finish = {}  # flow -> virtual finish of its last request
+        self._last_end = 0.0
+        self.requests = 0
+        self.busy_time = 0.0
+        self.utilisation = None  # bus utilisation over the last completed period
+        self._period_start = monotonic()
+        self._period_busy = 0.0
+        self.wait_stats = {}  # priority -> [requests, total wait, max wait] in seconds
+        self.state = LINK_CONNECTED
+        self.listeners = []  # callables (key, previous state, state), called on health transitions
+        self._failures = 0  # consecutive failed requests
+        self._backoff = 0.0
+        self._retry_at = None  # monotonic time of the next connection attempt while the circuit is open
+        self._trial = False  # a trial request is under way while the circuit is open
+        self._transaction = None  # task of the last client transaction, see call
+
+    def set_weight(self, unit, group, weight):
+        self.weights[(unit, group)] = max(1, weight)
+
+    def tracker(self, unit):
+        tracker = self.latency.get(unit)
+        if tracker is None:
+            tracker = self.latency[unit] = LatencyTracker(self.default_timeout)
+        return tracker
+
+    def timeout(self, unit):
+        """Timeout of the next request to a unit."""
+        return self.tracker(unit).timeout
+
+    def _limit(self, unit, retries):
+        # pymodbus 3.8 takes the response timeout and the resends of a request from its transaction manager
+        self.client.ctx.comm_params.timeout_connect = self.timeout(unit)
+        self.client.ctx.retries = retries
+
+    def _tag(self, flow):
+        start = max(self._vtime, self._finish.get(flow, 0.0))
+        self._finish[flow] = start + 1.0 / self.weights.get(flow, 1)
+        return start
+
+    def _account_wait(self, priority, wait):
+        stats = self.wait_stats.setdefault(priority, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += wait
+        stats[2] = max(stats[2], wait)
+
+    @property
+    def capacity(self):
+        """Requests that may be in flight at once: the window of an active pipeline, else 1."""
+        return self.pipeline.window if self.pipeline is not None and self.pipeline.active else 1
+
+    def _can_start(self, pipelined):
+        return self._inflight < self.capacity and (pipelined or not self._client_busy)
+
+    def _start(self, pipelined):
+        self._inflight += 1
+        if not pipelined:
+            self._client_busy = True
+
+    def _release(self, pipelined):
+        self._inflight -= 1
+        if not pipelined:
+            self._client_busy = False
+        self._grant_next()
+
+    async def _async_wait_turn(self, flow, priority, pipelined=False):
+        start = self._tag(flow)
+        if not self._queue and self._can_start(pipelined):
+            self._start(pipelined)
+            self._account_wait(priority, 0.0)
+            return start
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._queue, (priority, start, self._sequence, pipelined, future))
+        enqueued = monotonic()
+        try:
+            await future
+            self._account_wait(priority, monotonic() - enqueued)
+            return start
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(pipelined)  # the turn was granted just before the cancellation: pass it on
+            raise  # otherwise the cancelled future is skipped when its turn comes
+
+    def _grant_next(self):
+        """Grant the waiting requests in order, as long as the next one can start."""
+        while self._queue:
+            *_, pipelined, future = self._queue[0]
+            if future.cancelled():
+                heapq.heappop(self._queue)
+                continue
+            if not self._can_start(pipelined):
+                return
+            heapq.heappop(self._queue)
+            self._start(pipelined)
+            future.set_result(None)
+
+    @property
+    def circuit_open(self):
+        return self._retry_at is not None
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        previous, self.state = self.state, state
+        _LOGGER.info(f"modbus link {self.key}: {previous} -> {state}")
+        for listener in self.listeners:
+            listener(self.key, previous, state)
+
+    def _admit(self):
+        """Admit a request, or fail fast while the circuit is open; return True for the trial after the backoff."""
+        if self._retry_at is None:
+            return False
+        if self._trial or monotonic() < self._retry_at:
+            raise ConnectionException(f"modbus link {self.key} is {self.state}, next attempt in {self.retry_in:.0f}s")
+        self._trial = True
+        return True
+
+    def _record(self, success):
+        self._trial = False
+        if success:
+            self._failures = 0
+            self._backoff = 0.0
+            self._retry_at = None
+            self._set_state(LINK_CONNECTED)
+            return
+        self._failures += 1
+        if self._retry_at is None and self._failures < LINK_FAILURE_THRESHOLD:
+            self._set_state(LINK_DEGRADED)
+            return
+        self._backoff = min(max(self._backoff * 2, LINK_BACKOFF_MIN), LINK_BACKOFF_MAX)
+        self._retry_at = monotonic() + self._backoff * uniform(1 - LINK_BACKOFF_JITTER, 1 + LINK_BACKOFF_JITTER)
+        if self.client.connected:
+            self.client.close()  # reconnect from scratch on the next attempt
+        self._set_state(LINK_OFFLINE if self._backoff >= LINK_BACKOFF_MAX else LINK_BACKING_OFF)
+
+    def _record_exception(self, ex, trial):
+        # errors raised by the caller itself only count when they were caused by a link failure
+        if isinstance(ex, (ModbusException, OSError, asyncio.TimeoutError)) or isinstance(
+            ex.__cause__, ModbusException
+        ):
+            self._record(False)
+        elif trial:
+            self._trial = False
+
+    @property
+    def retry_in(self):
+        return 0.0 if self._retry_at is None else max(0.0, self._retry_at - monotonic())
+
+    @asynccontextmanager
+    async def guard(self, unit=None):
+        """Turn of a pipelined read, which does not use the client, guarded by the circuit breaker.
+
+        Pipelined reads are granted by priority and fair share like all other requests, up to the pipeline
+        window at once.
+        """
+        trial = self._admit()
+        try:
+            vstart = await self._async_wait_turn((unit, request_group.get()), request_priority.get(), pipelined=True)
+        except asyncio.CancelledError:
+            if trial:
+                self._trial = False
+            raise
+        start = None
+        try:
+            if self.circuit_open and not trial:  # opened while this request was waiting
+                raise ConnectionException(f"modbus link {self.key} is {self.state}")
+            start = monotonic()
+            yield
+        except asyncio.CancelledError:
+            if trial:
+                self._trial = False
+            raise
+        except Exception as ex:
+            if start is not None:
+                if lost_frame(ex):
+                    self.tracker(unit).timed_out()
+                self._record_exception(ex, trial)
+            raise
+        else:
+            self.tracker(unit).add(monotonic() - start)
+            self._record(True)
+        finally:
+            if start is not None:
+                self._account(start, monotonic())
+            self._vtime = max(self._vtime, vstart)
+            self._release(True)
+
+    @asynccontextmanager
+    async def request(self, unit, retries=LINK_RETRIES):
+        """Exclusive access to the link for one request/response round trip, guarded by the circuit breaker.
+
+        An unanswered request is sent again up to retries times, each time with the timeout of the unit.
+        """
+        trial = self._admit()
+        try:
+            vstart = await self._async_wait_turn((unit, request_group.get()), request_priority.get())
+        except asyncio.CancelledError:
+            if trial:
+                self._trial = False
+            raise
+        start = None
+        try:
+            if self.circuit_open and not trial:  # opened while this request was waiting
+                raise ConnectionException(f"modbus link {self.key} is {self.state}")
+            if self._transaction is not None and not self._transaction.done():
+                await asyncio.wait({self._transaction})  # a cancelled request is still waiting for its response
+                self._last_end = monotonic()
+            delay = self._last_end + self.frame_gap - monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._limit(unit, retries)
+            start = monotonic()
+            yield
+        except asyncio.CancelledError:
+            if trial:
+                self._trial = False
+            raise
+        except Exception as ex:
+            if start is not None:
+                if lost_frame(ex):
+                    self.tracker(unit).timed_out()
+                self._record_exception(ex, trial)
+            raise
+        else:
+            self.tracker(unit).add(monotonic() - start)
+            self._record(True)
+        finally:
+            if start is not None:
+                self._account(start, monotonic())
+            self._vtime = max(self._vtime, vstart)
+            self._release(False)
+
+    async def call(self, transaction):
+        """Run a client transaction within request(); when the caller is cancelled, it still runs to its end.
+
+        pymodbus matches a response to the request it waits for, so a request abandoned on the wire could hand
+        its late response to the next one. The next request on the link waits for the abandoned one instead.
+        """
+        task = self._transaction = asyncio.ensure_future(transaction)
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())  # nobody may be waiting
+        return await asyncio.shield(task)
+
+    def _account(self, start, end):
+        busy = max(0.0, end - max(start, self._last_end))  # overlapping pipelined reads count once
+        self._last_end = max(self._last_end, end)
+        self.requests += 1
+        self.busy_time += busy
+        self._period_busy += busy
+        if end - self._period_start >= UTILISATION_PERIOD:
+            self.utilisation = self._period_busy / (end - self._period_start)
+            if self.utilisation > 0.9:
+                _LOGGER.warning(f"modbus link {self.key} is saturated: {self.utilisation:.0%} busy")
+            self._period_start = end
+            self._period_busy = 0.0
+
+    def statistics(self):
+        return {
+            "link": self.key,
+            "hubs": sorted(self.hubs),
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "backoff": round(self._backoff, 1),
+            "retry_in": round(self.retry_in, 1),
+            "requests": self.requests,
+            "busy_time": round(self.busy_time, 3),
+            "utilisation": None if self.utilisation is None else round(self.utilisation, 3),
+            "frame_gap": self.frame_gap,
+            "window": self.capacity,
+            "pipeline_fallbacks": None if self.pipeline is None else self.pipeline.fallbacks,
+            "latency": {str(unit): tracker.statistics() for unit, tracker in self.latency.items()},
+            "waiting": sum(1 for *_, future in self._queue if not future.cancelled()),
+            "wait_time": {
+                PRIORITY_NAMES[priority]: {
+                    "requests": count,
+                    "mean": round(total / count, 4),
+                    "max": round(longest, 4),
+                }
+                for priority, (count, total, longest) in sorted(self.wait_stats.items())
+            },
+        }
+
+    async def async_check_connection(self):
+        if self._retry_at is not None and not self._trial:
+            return False  # circuit open: connection attempts are left to the trial request
+        if not self.client.connected:
+            _LOGGER.info(f"modbus link {self.key} is not connected, trying to connect")
+            return await self.async_connect()
+        return True
+
+    async def async_connect(self):
+        async with self._connect_lock:  # several hubs may try to connect the shared client at once
+            if self.client.connected:
+                return True
+            _LOGGER.debug(f"Trying to connect to modbus link {self.key}")
+            request_timeout = self.client.ctx.comm_params.timeout_connect
+            self.client.ctx.comm_params.timeout_connect = self.default_timeout  # not the round trip based timeout
+            try:
+                result = await self.client.connect()
+            finally:
+                self.client.ctx.comm_params.timeout_connect = request_timeout
+            if result:
+                _LOGGER.info(f"modbus link {self.key} connected")
+            else:
+                _LOGGER.warning(f"Unable to connect to modbus link {self.key}")
+            return result
+
+    def close(self):
+        if self.client.connected:
+            self.client.close()
+        if self.pipeline is not None:
+            self.pipeline.close()
+
+
+def _create_link(key, interface, host, port, tcp_type, serial_port, baudrate, window):
+    pipeline = None
+    if interface == "serial":
+        client = AsyncModbusSerialClient(
+            port=serial_port,
+            baudrate=baudrate,
+            parity="N",
+            stopbits=1,
+            bytesize=8,
+            timeout=LINK_TIMEOUT_SERIAL,
+            retries=LINK_RETRIES,
+        )
+    elif tcp_type == "rtu":
+        client = AsyncModbusTcpClient(
+            host=host, port=port, timeout=LINK_TIMEOUT_TCP, framer=FramerType.RTU, retries=LINK_RETRIES
+        )
+    elif tcp_type == "ascii":
+        client = AsyncModbusTcpClient(
+            host=host, port=port, timeout=LINK_TIMEOUT_TCP, framer=FramerType.ASCII, retries=LINK_RETRIES
+        )
+    else:
+        client = AsyncModbusTcpClient(host=host, port=port, timeout=LINK_TIMEOUT_TCP, retries=LINK_RETRIES)
+        if window > 1:
+            pipeline = ModbusTcpPipeline(key, host, port, window, timeout=LINK_TIMEOUT_TCP)
+    if interface == "serial":
+        return ModbusLink(key, client, pipeline, serial_frame_gap(baudrate), LINK_TIMEOUT_SERIAL)
+    return ModbusLink(key, client, pipeline, 0.0, LINK_TIMEOUT_TCP)
+
+
+def acquire_link(hub_name, interface, host=None, port=None, tcp_type=None, serial_port=None, baudrate=None, window=1):
+    """Return the shared link for these connection parameters, creating it for the first hub."""
+    key = link_key(interface, host, port, tcp_type, serial_port)
+    link = LINKS.get(key)
+    if link is None:
+        link = LINKS[key] = _create_link(key, interface, host, port, tcp_type, serial_port, baudrate, window)
+    else:
+        _LOGGER.info(f"{hub_name}: sharing modbus link {key} with {', '.join(sorted(link.hubs))}")
+        pipelined = interface != "serial" and tcp_type not in ("rtu", "ascii")
+        if pipelined and max(window, 1) != link.pipeline_window:
+            _LOGGER.warning(
+                f"{hub_name}: pipeline window {window} differs from the shared link {key}, "
+                f"using {link.pipeline_window}"
+            )
+        if interface == "serial" and link.client.comm_params.baudrate != baudrate:
+            _LOGGER.warning(
+                f"{hub_name}: baudrate {baudrate} differs from the shared link {key}, "
+                f"using {link.client.comm_params.baudrate}"
+            )
+    link.refcount += 1
+    link.hubs.add(hub_name)
+    return link
+
+
+def release_link(hub_name, link):
+    """Drop the reference of a hub; the link is closed when the last hub releases it."""
+    link.refcount -= 1
+    link.hubs.discard(hub_name)
+    if link.refcount <= 0:
+        _LOGGER.info(f"closing modbus link {link.key}, no more users")
+        link.close()
+        if LINKS.get(link.key) is link:
+            LINKS.pop(link.key)
@@ -0,0 +1,126 @@
+"""Deferred register writes: settings written while the inverter sleeps, replayed when it wakes up."""
+
+import logging
+from time import monotonic
+
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    DOMAIN,
+    WRITEQUEUE_BACKOFF,
+    WRITEQUEUE_MAX_BACKOFF,
+    WRITEQUEUE_MAX_REGISTERS,
+    WRITEQUEUE_MAX_RETRIES,
+    WRITEQUEUE_SAVE_DELAY,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DeferredWriteQueue:
+    """Register values waiting to be written, coalesced per register and persisted in Home Assistant storage.
+
+    A later write to a register replaces the queued value, also when it is part of a multi register write.
+    On flush, consecutive registers of a unit are merged into one write_registers request. A failed request
+    is retried with exponential backoff; after WRITEQUEUE_MAX_RETRIES failures its registers are dropped.
+    """
+
+    STORAGE_VERSION = 1
+
+    def __init__(self, hass, name):
+        self._name = name
+        self._store = Store(hass, self.STORAGE_VERSION, f"{DOMAIN}.{name}_writequeue")
+        self._values = {}  # (unit, address) -> encoded register value
+        self._retries = {}  # (unit, address) -> (failed attempts, monotonic time of the next attempt)
+        self.requests = 0  # write requests sent by flushes
+        self.written = 0  # registers written by flushes
+        self.dropped = 0  # registers given up after too many failures
+
+    def __len__(self):
+        return len(self._values)
+
+    async def async_load(self):
+        stored = await self._store.async_load() or {}
+        for unit, address, value, attempts in stored.get("registers", []):
+            self._values[(unit, address)] = value
+            if attempts:
+                self._retries[(unit, address)] = (attempts, 0.0)
+        if self._values:
+            _LOGGER.info(f"{self._name}: {len(self._values)} deferred register writes restored")
+
+    def _data_to_save(self):
+        return {
+            "registers": [
+                [unit, address, value, self._retries.get((unit, address), (0, 0.0))[0]]
+                for (unit, address), value in self._values.items()
+            ]
+        }
+
+    def add(self, unit, address, registers):
+        """Queue encoded register values starting at address, replacing queued values of the same registers."""
+        for offset, value in enumerate(registers):
+            key = (unit, address + offset)
+            self._values[key] = value
+            self._retries.pop(key, None)  # a new value gets a fresh retry budget
+        self._store.async_delay_save(self._data_to_save, WRITEQUEUE_SAVE_DELAY)
+
+    def runs(self, now):
+        """Return the due registers as (unit, address, values) runs of consecutive registers."""
+        runs = []
+        for unit, address in sorted(self._values, key=lambda key: (key[0] or 0, key[1])):
+            if self._retries.get((unit, address), (0, 0.0))[1] > now:
+                continue  # backing off
+            value = self._values[(unit, address)]
+            if runs:
+                last_unit, last_address, values = runs[-1]
+                if (
+                    last_unit == unit
+                    and last_address + len(values) == address
+                    and len(values) < WRITEQUEUE_MAX_REGISTERS
+                ):
+                    values.append(value)
+                    continue
+            runs.append((unit, address, [value]))
+        return runs
+
+    async def async_flush(self, write):
+        """Write the due registers with write(unit, address, values); return True when the queue is empty."""
+        now = monotonic()
+        for unit, address, values in self.runs(now):
+            self.requests += 1
+            try:
+                resp = await write(unit, address, values)
+                success = resp is not None and not resp.isError()
+            except HomeAssistantError as ex:
+                _LOGGER.warning(f"{self._name}: deferred write at 0x{address:02x} failed: {ex}")
+                success = False
+            for offset, value in enumerate(values):
+                key = (unit, address + offset)
+                if self._values.get(key) != value:
+                    continue  # replaced by a newer value while writing
+                if success:
+                    self._values.pop(key)
+                    self._retries.pop(key, None)
+                    self.written += 1
+                    continue
+                attempts = self._retries.get(key, (0, 0.0))[0] + 1
+                if attempts > WRITEQUEUE_MAX_RETRIES:
+                    _LOGGER.error(f"{self._name}: giving up deferred write of register 0x{key[1]:02x} value {value}")
+                    self._values.pop(key)
+                    self._retries.pop(key, None)
+                    self.dropped += 1
+                else:
+                    backoff = min(WRITEQUEUE_BACKOFF * 2 ** (attempts - 1), WRITEQUEUE_MAX_BACKOFF)
+                    self._retries[key] = (attempts, now + backoff)
+        self._store.async_delay_save(self._data_to_save, WRITEQUEUE_SAVE_DELAY)
+        return not self._values
+
+    def statistics(self):
+        return {
+            "queued": len(self._values),
+            "backing_off": sum(1 for _, next_try in self._retries.values() if next_try > monotonic()),
+            "requests": self.requests,
+            "written": self.written,
+            "dropped": self.dropped,
+        }
@@ -0,0 +1,98 @@
+"""Decoding time per block: register by register with BinaryPayloadDecoder, compiled struct program, NumPy.
+
+Run from the repository root with: python tests/bench_decoder.py
+Two kinds of random blocks: a mix of all units and scales like in test_decoder.py, and blocks of plain numeric
+16/32 bit values with a number as scale, as most blocks of the large plugins are.
+"""
+
+import logging
+from pathlib import Path
+import random
+import sys
+import timeit
+
+sys.path.insert(1, str(Path(__file__).parents[1]))
+
+import conftest  # noqa: E402,F401  the integration package without Home Assistant
+from pymodbus.constants import Endian  # noqa: E402
+
+from custom_components.pichler_modbus import decoder as decoder_module  # noqa: E402
+from custom_components.pichler_modbus.const_base import REGISTER_S16, REGISTER_S32, REGISTER_U16, REGISTER_U32  # noqa
+from custom_components.pichler_modbus.datastore import DataStore  # noqa: E402
+from custom_components.pichler_modbus.decoder import BlockDecoder, decode_registers  # noqa: E402
+from custom_components.pichler_modbus.planner import block, registerWidth  # noqa: E402
+from helpers import Description  # noqa: E402
+from test_decoder import random_block, random_registers  # noqa: E402
+
+FIELDS = (10, 40, 100)  # entities per block
+BLOCKS = 20  # random blocks per kind and size
+ROUNDS = 20  # decodes of all blocks per timing
+REPEAT = 5
+
+
+def numeric_block(rng, fields):
+    """A block of plain numeric entities with small gaps."""
+    descriptions = {}
+    reg = rng.randrange(0, 0x1000)
+    for number in range(fields):
+        unit = rng.choice([REGISTER_U16, REGISTER_S16, REGISTER_U32, REGISTER_S32])
+        scale, rounding = rng.choice([(1, 0), (10, 0), (0.1, 1), (0.01, 2), (0.001, 3)])
+        descriptions[reg] = Description(key=f"k{number}", register=reg, unit=unit, scale=scale, rounding=rounding)
+        reg += registerWidth(descriptions[reg]) + rng.choice([0, 0, 0, 1])
+    regs = list(descriptions)
+    end = regs[-1] + registerWidth(descriptions[regs[-1]])
+    return block(start=regs[0], end=end, descriptions=descriptions, regs=regs)
+
+
+def awake():
+    return True
+
+
+def per_block(decode, blocks):
+    """Best time of REPEAT timings, in microseconds per decoded block."""
+    data = DataStore().cycle()
+    timings = timeit.repeat(lambda: [decode(entry, data) for entry in blocks], number=ROUNDS, repeat=REPEAT)
+    return min(timings) / ROUNDS / len(blocks) * 1e6
+
+
+def bench(make_block, fields, numpy):
+    """(legacy, struct, numpy) microseconds per block; numpy is None when NumPy is not installed."""
+    rng = random.Random(fields)
+    blocks = []
+    for _ in range(BLOCKS):
+        blk = make_block(rng, fields)
+        blocks.append((blk, random_registers(rng, blk)))
+    timings = [
+        per_block(
+            lambda entry, data: decode_registers("bench", *entry, data, Endian.BIG, Endian.BIG, {}, awake), blocks
+        )
+    ]
+    for engine in (None, numpy):
+        decoder_module.np = engine
+        compiled = [(BlockDecoder.compile(blk, Endian.BIG, Endian.BIG), registers) for blk, registers in blocks]
+        timings.append(per_block(lambda entry, data: entry[0].decode("bench", entry[1], data, {}, awake), compiled))
+    decoder_module.np = numpy
+    if numpy is None:
+        timings[2] = None
+    return timings
+
+
+def main():
+    logging.disable(logging.WARNING)  # pymodbus deprecation notes and undecodable strings, per decode
+    numpy = decoder_module.np
+    print(
+        f"{'blocks':>7} {'fields':>6} {'legacy us':>10} {'struct us':>10} {'numpy us':>10} {'struct x':>9} {'numpy x':>8}"
+    )
+    for kind, make_block in (("mixed", random_block), ("numeric", numeric_block)):
+        for fields in FIELDS:
+            legacy, scalar, vector = bench(make_block, fields, numpy)
+            print(
+                f"{kind:>7} {fields:>6} {legacy:>10.1f} {scalar:>10.1f} "
+                + (f"{vector:>10.1f}" if vector else f"{'-':>10}")
+                + f" {legacy / scalar:>9.1f} "
+                + (f"{legacy / vector:>8.1f}" if vector else f"{'-':>8}")
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+"""Test setup: the modules of the integration that do not need Home Assistant are importable without it.
+
+Importing custom_components.pichler_modbus runs the integration setup in its __init__.py, which imports Home
+Assistant. When Home Assistant is not installed, the package is registered with its path only, without running
+__init__.py, so the planner, decoder, data store, link and health modules can still be imported and tested.
+Tests of the hub itself skip in that case.
+"""
+
+import importlib.util
+from pathlib import Path
+import sys
+import types
+
+PACKAGE = "custom_components.pichler_modbus"
+
+if importlib.util.find_spec("homeassistant") is None and PACKAGE not in sys.modules:
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [str(Path(__file__).parents[1] / "custom_components" / "pichler_modbus")]
+    sys.modules[PACKAGE] = package
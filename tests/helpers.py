@@ -0,0 +1,24 @@
+"""Entity descriptions for the tests of the modules that do not need Home Assistant."""
+
+from dataclasses import dataclass
+from typing import Any
+
+from custom_components.pichler_modbus.const_base import SLEEPMODE_LAST
+
+
+@dataclass
+class Description:
+    """The fields of BaseModbusSensorEntityDescription the planner, decoder and aggregates use, same defaults."""
+
+    key: str
+    register: int = -1
+    unit: Any = None
+    scale: Any = 1
+    rounding: int = 1
+    wordcount: int = None
+    newblock: bool = False
+    sleepmode: int = SLEEPMODE_LAST
+    ignore_readerror: Any = False
+    depends_on: list = None
+    aggregate: str = None
+    aggregate_interval: float = None
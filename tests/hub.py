@@ -0,0 +1,54 @@
+"""A hub polling a simulated device, for the tests of the hub; needs Home Assistant."""
+
+from types import SimpleNamespace
+
+from homeassistant.const import CONF_HOST, CONF_NAME
+from homeassistant.core import HomeAssistant
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.pdu.register_message import ReadHoldingRegistersResponse, ReadInputRegistersResponse
+
+from custom_components.pichler_modbus import SolaXModbusHub, plugin_pichler
+
+
+class Device:
+    """Registers of a simulated device; reads touching a rejected register get an exception response."""
+
+    def __init__(self, registers=None, rejected=(), exception_code=ExceptionResponse.ILLEGAL_ADDRESS):
+        self.registers = dict(registers or {})  # register -> value, other registers read as 0
+        self.rejected = set(rejected)
+        self.exception_code = exception_code
+        self.max_count = None  # longest read accepted, longer reads are rejected
+        self.answering = True  # False: reads time out
+        self.reads = []  # (register type, address, count) of every read
+
+    def response(self, typ, address, count):
+        self.reads.append((typ, address, count))
+        if not self.answering:
+            raise TimeoutError("no answer")
+        function_code = 4 if typ == "input" else 3
+        if (self.max_count and count > self.max_count) or self.rejected.intersection(range(address, address + count)):
+            return ExceptionResponse(function_code, self.exception_code)
+        registers = [self.registers.get(reg, 0) for reg in range(address, address + count)]
+        if typ == "input":
+            return ReadInputRegistersResponse(registers=registers)
+        return ReadHoldingRegistersResponse(registers=registers)
+
+    async def check_connection(self):
+        return self.answering
+
+    async def read_holding(self, unit, address, count, retries=0):
+        return self.response("holding", address, count)
+
+    async def read_input(self, unit, address, count, retries=0):
+        return self.response("input", address, count)
+
+
+async def make_hub(config_dir, device, **options):
+    """A hub on a plain modbus tcp link that reads from device instead; call it with a running event loop."""
+    hass = HomeAssistant(str(config_dir))
+    entry = SimpleNamespace(entry_id="test", data={}, options={CONF_NAME: "test", CONF_HOST: "127.0.0.1", **options})
+    hub = SolaXModbusHub(hass, plugin_pichler, entry)
+    hub.async_read_holding_registers = device.read_holding
+    hub.async_read_input_registers = device.read_input
+    hub._check_connection = device.check_connection
+    return hub
@@ -0,0 +1,72 @@
+"""Aggregates of fast polled values, published once per window."""
+
+from custom_components.pichler_modbus.aggregate import Aggregator, SampleRing
+from custom_components.pichler_modbus.const_base import (
+    AGGREGATE_INTERVAL_DEFAULT,
+    AGGREGATE_LAST,
+    AGGREGATE_MAX,
+    AGGREGATE_MEAN,
+    AGGREGATE_MIN,
+)
+
+from helpers import Description
+
+
+def feed(aggregator, descr, values, poll_interval=5, start=0.0):
+    """Add one value per poll interval; the times at which a window completed with changed aggregates."""
+    return [
+        start + i * poll_interval
+        for i, value in enumerate(values)
+        if aggregator.add(descr, value, start + i * poll_interval, poll_interval)
+    ]
+
+
+def test_first_sample_is_published_then_one_window_per_interval():
+    aggregator = Aggregator()
+    descr = Description(key="power", aggregate=AGGREGATE_MEAN, aggregate_interval=20, rounding=1)
+    published = feed(aggregator, descr, [100, 200, 300, 400, 500, 600, 700])
+    assert published == [0, 25]  # the first window right away, the next one 20s after its first sample at 5
+    assert aggregator.results["power"] == {
+        AGGREGATE_MEAN: 400.0,
+        AGGREGATE_MIN: 200,
+        AGGREGATE_MAX: 600,
+        AGGREGATE_LAST: 600,
+        "samples": 5,
+    }
+    assert aggregator.value(descr) == 400.0
+
+
+def test_integer_samples_keep_their_type():
+    aggregator = Aggregator()
+    descr = Description(key="power", aggregate=AGGREGATE_MAX, aggregate_interval=10)
+    feed(aggregator, descr, [1, 2, 3])
+    result = aggregator.results["power"]
+    assert [type(result[name]) for name in (AGGREGATE_MIN, AGGREGATE_MAX, AGGREGATE_LAST)] == [int, int, int]
+    aggregator = Aggregator()
+    feed(aggregator, descr, [0, 1, 2.5, 3])  # the second window holds 1, 2.5 and 3
+    result = aggregator.results["power"]
+    assert (result[AGGREGATE_MIN], result[AGGREGATE_MAX], result[AGGREGATE_LAST]) == (1.0, 3.0, 3.0)
+    assert type(result[AGGREGATE_MIN]) is float
+
+
+def test_missing_interval_defaults():
+    aggregator = Aggregator()
+    descr = Description(key="power", aggregate=AGGREGATE_MEAN)
+    published = feed(aggregator, descr, range(14), poll_interval=5)
+    assert published == [0, 5 + AGGREGATE_INTERVAL_DEFAULT]
+
+
+def test_values_that_are_not_numbers_are_not_sampled():
+    aggregator = Aggregator()
+    descr = Description(key="mode", aggregate=AGGREGATE_LAST, aggregate_interval=10)
+    assert not aggregator.add(descr, "Idle", 0, 5)
+    assert not aggregator.add(descr, True, 0, 5)
+    assert aggregator.value(descr) is None
+    assert aggregator.statistics()["samples"] == 0
+
+
+def test_ring_overwrites_the_oldest_sample():
+    ring = SampleRing(3)
+    for value in range(5):
+        ring.add(value)
+    assert list(ring.values()) == [2.0, 3.0, 4.0]
@@ -0,0 +1,78 @@
+"""Read health: failing blocks are quarantined and probed, failing device groups back off."""
+
+from custom_components.pichler_modbus.blockhealth import BlockHealth, GroupHealth
+from custom_components.pichler_modbus.const_base import (
+    BLOCK_PROBE_CYCLES,
+    BLOCK_PROBE_MAX_CYCLES,
+    BLOCK_QUARANTINE_FAILURES,
+    GROUP_BACKOFF_MAX_CYCLES,
+    GROUP_FAILURE_THRESHOLD,
+)
+
+
+def quarantined_block():
+    health = BlockHealth()
+    changes = [health.record(False, group_readable=True) for _ in range(BLOCK_QUARANTINE_FAILURES)]
+    assert changes[-1] == "quarantined" and set(changes[:-1]) == {None}
+    return health
+
+
+def due_reads(health, reads):
+    """Group reads, out of the next reads, in which the block is read."""
+    return [read for read in range(reads) if health.due()]
+
+
+def test_failures_while_the_group_is_unreadable_do_not_quarantine():
+    health = BlockHealth()
+    for _ in range(BLOCK_QUARANTINE_FAILURES * 2):
+        assert health.record(False, group_readable=False) is None
+    assert not health.quarantined
+    assert health.statistics()["success_ratio"] == 0.0
+
+
+def test_quarantined_block_is_probed_every_probe_interval():
+    health = quarantined_block()
+    assert due_reads(health, 3 * BLOCK_PROBE_CYCLES) == [
+        BLOCK_PROBE_CYCLES - 1,
+        2 * BLOCK_PROBE_CYCLES - 1,
+        3 * BLOCK_PROBE_CYCLES - 1,
+    ]
+    assert (health.probes, health.skipped) == (3, 3 * (BLOCK_PROBE_CYCLES - 1))
+
+
+def test_failed_probes_double_the_interval_and_a_good_one_recovers():
+    health = quarantined_block()
+    intervals = []
+    for _ in range(8):
+        health.record(False, group_readable=True)
+        intervals.append(health.probe_interval)
+    assert intervals == [min(BLOCK_PROBE_CYCLES * 2**n, BLOCK_PROBE_MAX_CYCLES) for n in range(1, 9)]
+    assert health.record(True, group_readable=True) == "recovered"
+    assert (health.quarantined, health.probe_interval) == (False, BLOCK_PROBE_CYCLES)
+    assert due_reads(health, 3) == [0, 1, 2]
+
+
+def test_group_backs_off_after_repeated_failures():
+    health = GroupHealth()
+    changes = [health.record(False) for _ in range(GROUP_FAILURE_THRESHOLD)]
+    assert changes[-1] == "backing_off" and set(changes[:-1]) == {None}
+    assert due_reads(health, 2) == [1]  # skips one tick
+    assert health.record(False) is None  # already backing off
+    assert due_reads(health, 3) == [2]  # then two
+    assert health.state == "backing_off"
+    assert health.record(True) == "recovered"
+    assert (health.state, due_reads(health, 2)) == ("ok", [0, 1])
+
+
+def test_group_backoff_is_limited():
+    health = GroupHealth()
+    for _ in range(GROUP_FAILURE_THRESHOLD + 10):
+        health.record(False)
+    assert health.backoff == GROUP_BACKOFF_MAX_CYCLES
+
+
+def test_uncounted_failures_do_not_back_off():
+    health = GroupHealth()
+    for _ in range(GROUP_FAILURE_THRESHOLD * 2):
+        assert health.record(False, counted=False) is None
+    assert (health.state, health.failures, health.due()) == ("ok", GROUP_FAILURE_THRESHOLD * 2, True)
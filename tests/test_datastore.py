@@ -0,0 +1,81 @@
+"""The slot-indexed data store: staged cycles become visible at once on commit."""
+
+import pytest
+
+from custom_components.pichler_modbus.datastore import DataStore
+
+
+def test_staged_values_are_visible_only_after_the_commit():
+    store = DataStore(["a"])
+    store["a"] = 1
+    data = store.cycle()
+    data["a"] = 2
+    data["b"] = 3
+    assert (store["a"], "b" in store) == (1, False)
+    assert (dict(data), data.changed()) == ({"a": 2, "b": 3}, {"a", "b"})
+    assert data.commit(10.0) == ["a", "b"]
+    assert dict(store) == {"a": 2, "b": 3}
+    assert store.stamps[store.slot("b")] == 10.0
+
+
+def test_commit_reports_only_changed_values():
+    store = DataStore()
+    data = store.cycle()
+    data["a"], data["b"] = 1, "x"
+    data.commit(1.0)
+    data = store.cycle()
+    data["a"], data["b"] = 1, "y"
+    assert data.commit(2.0) == ["b"]
+    assert [store.changed[store.slot(key)] for key in ("a", "b")] == [0, 1]
+    assert store.stamps[store.slot("a")] == 1.0
+
+
+def test_buffers_stay_in_sync_over_several_cycles():
+    store = DataStore()
+    for value in range(4):  # alternate slots, so each buffer misses some writes of the other
+        data = store.cycle()
+        data["even" if value % 2 == 0 else "odd"] = value
+        data["all"] = value
+        data.commit(float(value))
+    assert dict(store) == {"even": 2, "all": 3, "odd": 3}
+    data = store.cycle()
+    assert data.changed() == set()
+    assert data.commit(5.0) == []
+    assert dict(store) == {"even": 2, "all": 3, "odd": 3}
+
+
+def test_uncommitted_cycle_is_dropped_by_the_next_one():
+    store = DataStore()
+    store["a"] = 1
+    data = store.cycle()
+    data["a"] = 2
+    data = store.cycle()
+    assert len(data) == 0
+    assert store.cycle().commit(1.0) == []
+    assert store["a"] == 1
+
+
+def test_mapping_writes_are_visible_at_once_but_staged_values_win():
+    store = DataStore()
+    data = store.cycle()
+    data["a"] = 2
+    store["a"] = 1  # e.g. a plugin value function writing to the datadict during the cycle
+    store["b"] = 5
+    assert (store["a"], store["b"]) == (1, 5)
+    data.commit(1.0)
+    assert dict(store) == {"a": 2, "b": 5}
+    del store["b"]
+    with pytest.raises(KeyError):
+        store["b"]
+    assert store.get("b", 0) == 0
+
+
+def test_deleting_a_staged_key_restores_the_committed_value():
+    store = DataStore()
+    store["a"] = 1
+    data = store.cycle()
+    data["a"] = 2
+    del data["a"]
+    assert "a" not in data
+    assert data.commit(1.0) == []
+    assert store["a"] == 1
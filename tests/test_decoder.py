@@ -0,0 +1,136 @@
+"""The compiled block decoders give the same values as the register by register decoding with BinaryPayloadDecoder."""
+
+import random
+
+import pytest
+from pymodbus.constants import Endian
+
+from custom_components.pichler_modbus import decoder as decoder_module
+from custom_components.pichler_modbus.const_base import (
+    REGISTER_S16,
+    REGISTER_S32,
+    REGISTER_STR,
+    REGISTER_U16,
+    REGISTER_U32,
+    REGISTER_U8H,
+    REGISTER_U8L,
+    REGISTER_ULSB16MSB16,
+    REGISTER_WORDS,
+    SLEEPMODE_LASTAWAKE,
+)
+from custom_components.pichler_modbus.datastore import DataStore
+from custom_components.pichler_modbus.decoder import BlockDecoder, decode_registers
+from custom_components.pichler_modbus.planner import block, registerWidth
+from helpers import Description
+
+ORDERS = [(order16, order32) for order16 in (Endian.BIG, Endian.LITTLE) for order32 in (Endian.BIG, Endian.LITTLE)]
+BLOCKS = 150  # random blocks per byte/word order
+
+UNITS = [REGISTER_U16, REGISTER_S16, REGISTER_U32, REGISTER_S32, REGISTER_ULSB16MSB16, REGISTER_STR, REGISTER_WORDS]
+
+
+def plus_one(initval, descr, datadict):
+    return initval + 1
+
+
+def random_scale(rng, unit):
+    """(scale, rounding) of a random description, numeric scales most of the time."""
+    if unit in (REGISTER_STR, REGISTER_WORDS):
+        return 1, 0
+    kind = rng.random()
+    if kind < 0.1:
+        return {0: "off", 1: "on", 2: "auto"}, 0
+    if kind < 0.15:
+        return plus_one, 0
+    if kind < 0.4:
+        return rng.choice([1, 10, 100]), 0
+    return rng.choice([0.1, 0.01, 0.001, 0.25, 1.5]), rng.choice([0, 1, 2, 3])
+
+
+def random_block(rng, fields):
+    """A block of random entities with random gaps, like planBlocks builds it."""
+    descriptions = {}
+    reg = rng.randrange(0, 0x1000)
+    for number in range(fields):
+        if rng.random() < 0.05:  # byte values sharing one register
+            descriptions[reg] = {
+                unit: Description(key=f"k{number}_{unit}", register=reg, unit=unit, scale=random_scale(rng, unit)[0])
+                for unit in (REGISTER_U8L, REGISTER_U8H)
+            }
+        else:
+            unit = rng.choice(UNITS)
+            scale, rounding = random_scale(rng, unit)
+            descriptions[reg] = Description(
+                key=f"k{number}",
+                register=reg,
+                unit=unit,
+                scale=scale,
+                rounding=rounding,
+                wordcount=rng.choice([2, 4, 8]) if unit in (REGISTER_STR, REGISTER_WORDS) else None,
+            )
+        reg += registerWidth(descriptions[reg]) + rng.choice([0, 0, 0, 1, 3])
+    regs = list(descriptions)
+    end = regs[-1] + registerWidth(descriptions[regs[-1]])
+    return block(start=regs[0], end=end, descriptions=descriptions, regs=regs)
+
+
+def random_registers(rng, blk):
+    registers = [rng.randrange(0x10000) for _ in range(blk.end - blk.start)]
+    for reg in blk.regs:
+        descr = blk.descriptions[reg]
+        if type(descr) is not dict and descr.unit == REGISTER_STR and rng.random() < 0.8:
+            for offset in range(descr.wordcount):  # mostly printable ascii, else the string fails to decode
+                registers[reg - blk.start + offset] = rng.randrange(0x20, 0x7F) << 8 | rng.randrange(0x20, 0x7F)
+    return registers
+
+
+@pytest.mark.parametrize("vector", [False, True], ids=["scalar", "numpy"])
+@pytest.mark.parametrize("order16, order32", ORDERS)
+def test_compiled_decoder_matches_binary_payload_decoder(monkeypatch, order16, order32, vector):
+    if vector and decoder_module.np is None:
+        pytest.skip("numpy is not installed")
+    if not vector:
+        monkeypatch.setattr(decoder_module, "np", None)
+    rng = random.Random(f"{order16}{order32}")
+    vectorized = 0
+    for _ in range(BLOCKS):
+        blk = random_block(rng, rng.randrange(1, 96))
+        compiled = BlockDecoder.compile(blk, order16, order32)
+        assert compiled is not None
+        vectorized += compiled._vector is not None
+        for _ in range(3):
+            registers = random_registers(rng, blk)
+            decoded = DataStore().cycle()
+            compiled.decode("test", registers, decoded, {}, lambda: True)
+            expected = DataStore().cycle()
+            decode_registers("test", blk, registers, expected, order16, order32, {}, lambda: True)
+            decoded, expected = dict(decoded), dict(expected)
+            assert decoded == expected
+            assert {key: type(value) for key, value in decoded.items()} == {
+                key: type(value) for key, value in expected.items()
+            }
+    assert (vectorized > 0) == vector
+
+
+@pytest.mark.parametrize("awake", [False, True])
+def test_held_and_lastawake_values_are_not_stored(awake):
+    descriptions = {
+        0: Description(key="held", register=0, unit=REGISTER_U16),
+        1: Description(key="lastawake", register=1, unit=REGISTER_U16, sleepmode=SLEEPMODE_LASTAWAKE),
+        2: Description(key="plain", register=2, unit=REGISTER_U16),
+    }
+    blk = block(start=0, end=3, descriptions=descriptions, regs=[0, 1, 2])
+    held = {"held": 1700000000}  # expiry of a prevent_update hold
+    calls = []
+
+    def is_awake():
+        calls.append(awake)
+        return awake
+
+    compiled = DataStore().cycle()
+    BlockDecoder.compile(blk, Endian.BIG, Endian.BIG).decode("test", [1, 2, 3], compiled, held, is_awake)
+    legacy = DataStore().cycle()
+    decode_registers("test", blk, [1, 2, 3], legacy, Endian.BIG, Endian.BIG, held, lambda: awake)
+    expected = {"lastawake": 2, "plain": 3} if awake else {"plain": 3}
+    assert dict(compiled) == dict(legacy) == expected
+    assert len(calls) == 1  # the compiled decoder asks once per block
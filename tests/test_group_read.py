@@ -0,0 +1,51 @@
+"""Judging the block reads of a device group: failed blocks get their static values only if the group was read."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.pichler_modbus.blockhealth import BlockHealth
+from custom_components.pichler_modbus.const import REGISTER_U16, BaseModbusSensorEntityDescription
+from custom_components.pichler_modbus.planner import block
+
+from hub import Device, make_hub
+
+
+def reads(*ignore_readerrors):
+    """One single register block read per ignore_readerror policy, with its health."""
+    result = []
+    for reg, ignore_readerror in enumerate(ignore_readerrors):
+        descr = BaseModbusSensorEntityDescription(
+            key=f"r{reg}", register=reg, unit=REGISTER_U16, ignore_readerror=ignore_readerror
+        )
+        blk = block(start=reg, end=reg + 1, descriptions={reg: descr}, regs=[reg], ignore_readerror=ignore_readerror)
+        result.append((blk, "holding", BlockHealth()))
+    return result
+
+
+def judge(tmp_path, blocks, delivered):
+    async def run():
+        hub = await make_hub(tmp_path, Device())
+        data = {}
+        return hub.judge_blocks(data, blocks, delivered), data
+
+    return asyncio.run(run())
+
+
+def test_failed_blocks_of_a_readable_group_get_their_static_values(tmp_path):
+    blocks = reads(False, "unknown", 5, True)
+    usable, data = judge(tmp_path, blocks, [True, False, False, False])
+    assert usable
+    assert data == {"r1": "unknown", "r2": 5}  # False and True keep the last value
+    assert [health.consecutive for _, _, health in blocks] == [0, 1, 1, 1]
+
+
+def test_nothing_is_written_when_no_block_was_read(tmp_path):
+    blocks = reads(False, "unknown", 5)
+    usable, data = judge(tmp_path, blocks, [False, False, False])
+    assert not usable
+    assert data == {}
+    # an unreadable group, e.g. a sleeping device, does not count towards the quarantine of its blocks
+    assert [(health.failures, health.consecutive) for _, _, health in blocks] == [(1, 0)] * 3
@@ -0,0 +1,35 @@
+"""The hub keeps its modbus link when its last sensor is removed, it is released only on unload."""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.pichler_modbus import transport
+from custom_components.pichler_modbus.const import DOMAIN, REGISTER_U16, BaseModbusSensorEntityDescription
+
+from hub import Device, make_hub
+
+
+def sensor():
+    return SimpleNamespace(
+        entity_description=BaseModbusSensorEntityDescription(key="r1", register=1, unit=REGISTER_U16),
+        device_info={"identifiers": {(DOMAIN, "test", "INVERTER")}},
+    )
+
+
+def test_link_is_kept_after_the_last_sensor_is_removed(tmp_path):
+    async def run():
+        hub = await make_hub(tmp_path, Device(), scan_interval=15)
+        link = hub._link
+        entity = sensor()
+        await hub.async_add_solax_modbus_sensor(entity)
+        await hub.async_remove_solax_modbus_sensor(entity)
+        users = link.refcount  # the hubs of other tests may share the link
+        kept = hub._link is link and link.key in transport.LINKS and hub._poll_task is None
+        await hub.async_close()  # async_unload_entry
+        return kept, hub._link, users - link.refcount
+
+    assert asyncio.run(run()) == (True, None, 1)
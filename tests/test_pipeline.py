@@ -0,0 +1,154 @@
+"""Pipelined Modbus TCP reads against a local server: matching, late responses, fallback and re-enabling."""
+
+import asyncio
+
+import pytest
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.framer import FramerSocket
+from pymodbus.pdu import DecodePDU
+from pymodbus.pdu.register_message import ReadHoldingRegistersResponse
+
+from custom_components.pichler_modbus import pipeline as pipeline_module
+from custom_components.pichler_modbus.const_base import PIPELINE_FALLBACK_STRIKES, PIPELINE_RETRY_DELAY
+from custom_components.pichler_modbus.pipeline import ModbusTcpPipeline
+
+
+class Server:
+    """Modbus TCP server answering register reads with the address as value, after a delay chosen per request.
+
+    delay(address) returns the seconds before the answer, None for no answer; the transaction id of the answer
+    is taken from tid(transaction id), so a test can answer a transaction that was never sent.
+    """
+
+    def __init__(self, delay=lambda address: 0, tid=lambda tid: tid):
+        self.delay = delay
+        self.tid = tid
+        self.requests = []
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.connections = 0
+        self.closed = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        framer = FramerSocket(DecodePDU(True))
+        try:
+            while True:
+                header = await reader.readexactly(7)
+                frame = header + await reader.readexactly(int.from_bytes(header[4:6], "big") - 1)
+                _, request = framer.processIncomingFrame(frame)
+                self.requests.append(request.address)
+                asyncio.create_task(self.answer(writer, framer, request))
+        except asyncio.IncompleteReadError:
+            self.closed += 1
+
+    async def answer(self, writer, framer, request):
+        self.outstanding += 1
+        self.max_outstanding = max(self.max_outstanding, self.outstanding)
+        delay = self.delay(request.address)
+        if delay is not None:
+            await asyncio.sleep(delay)
+        self.outstanding -= 1
+        if delay is None or writer.is_closing():
+            return
+        response = ReadHoldingRegistersResponse(
+            registers=[request.address] * request.count,
+            dev_id=request.dev_id,
+            transaction_id=self.tid(request.transaction_id),
+        )
+        writer.write(framer.buildFrame(response))
+
+    async def stop(self):
+        self._server.close()
+
+
+def run(server, test, window=4, timeout=0.2):
+    async def main():
+        port = await server.start()
+        pipeline = ModbusTcpPipeline("test", "127.0.0.1", port, window, timeout=timeout)
+        try:
+            return await test(pipeline)
+        finally:
+            pipeline.close()
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_reads_overlap_and_match_their_responses():
+    server = Server(delay=lambda address: 0.05 - address / 1000)  # later requests are answered first
+
+    async def test(pipeline):
+        responses = await asyncio.gather(*(pipeline.read_holding_registers(address, 2) for address in range(8)))
+        return [response.registers for response in responses]
+
+    assert run(server, test) == [[address] * 2 for address in range(8)]
+    assert server.max_outstanding == 4  # the window
+
+
+def test_late_response_is_dropped_and_pipelining_stays():
+    server = Server(delay=lambda address: 0.3 if address == 0 else 0)
+
+    async def test(pipeline):
+        with pytest.raises(ModbusIOException):
+            await pipeline.read_holding_registers(0, 1)
+        await asyncio.sleep(0.2)  # the late response arrives
+        response = await pipeline.read_holding_registers(5, 1)
+        return pipeline.active, response.registers
+
+    assert run(server, test) == (True, [5])
+    assert server.connections == 1
+
+
+def test_unknown_transaction_falls_back_and_closes_the_connection():
+    server = Server(tid=lambda tid: tid + 1000)
+
+    async def test(pipeline):
+        with pytest.raises(ModbusIOException):  # failed as a lost frame, read again on the shared client
+            await pipeline.read_holding_registers(0, 1)
+        await asyncio.sleep(0.05)
+        return pipeline.active, pipeline.connected, pipeline.fallbacks
+
+    assert run(server, test, timeout=1) == (False, False, 1)
+    assert server.closed == 1
+
+
+@pytest.mark.parametrize("lost", [PIPELINE_FALLBACK_STRIKES - 1, PIPELINE_FALLBACK_STRIKES])
+def test_fallback_only_after_repeated_timeouts(lost):
+    async def test(pipeline):
+        await pipeline.async_connect()
+        for _ in range(lost):  # each round: the request sent while another one is outstanding is lost
+            await asyncio.gather(
+                pipeline.read_holding_registers(1, 1),
+                pipeline.read_holding_registers(0, 1),
+                return_exceptions=True,
+            )
+        return pipeline.active
+
+    server = Server(delay=lambda address: None if address == 0 else 0.05)
+    assert run(server, test) == (lost < PIPELINE_FALLBACK_STRIKES)
+
+
+def test_pipelining_is_enabled_again_after_the_retry_delay(monkeypatch):
+    server = Server()
+    now = [1000.0]
+    monkeypatch.setattr(pipeline_module, "monotonic", lambda: now[0])
+
+    async def test(pipeline):
+        pipeline.fallback("test")
+        states = [pipeline.active]
+        now[0] += PIPELINE_RETRY_DELAY
+        states.append(pipeline.active)
+        response = await pipeline.read_holding_registers(3, 1)
+        pipeline.fallback("test")  # the next delay is doubled
+        now[0] += PIPELINE_RETRY_DELAY
+        states.append(pipeline.active)
+        now[0] += PIPELINE_RETRY_DELAY
+        states.append(pipeline.active)
+        return states, response.registers, pipeline.window
+
+    assert run(server, test) == ([False, True, False, True], [3], 4)
@@ -0,0 +1,110 @@
+"""planBlocks splits the registers of a device group in the cheapest read blocks within the hard limits."""
+
+import pytest
+
+from custom_components.pichler_modbus.const_base import REGISTER_U8H, REGISTER_U8L, REGISTER_U16, REGISTER_U32
+from custom_components.pichler_modbus.planner import (
+    block_cost,
+    keyFragments,
+    matchesFragment,
+    mergeRegisterMaps,
+    planBlocks,
+    readsData,
+    referencedKeys,
+)
+
+from helpers import Description
+
+COST = block_cost(request=40.0, register=1.0, max_registers=100)
+
+
+def registers(*regs, unit=REGISTER_U16, **fields):
+    return {reg: Description(key=f"r{reg}", register=reg, unit=unit, **fields) for reg in regs}
+
+
+def spans(blocks):
+    return [(blk.start, blk.end) for blk in blocks]
+
+
+def test_gap_cheaper_than_a_request_is_read_along():
+    descriptions = registers(0, 1, 30, 31)  # a 28 register gap costs less than a second request
+    assert spans(planBlocks(descriptions, COST, None)) == [(0, 32)]
+
+
+def test_gap_dearer_than_a_request_splits():
+    descriptions = registers(0, 1, 60, 61)
+    assert spans(planBlocks(descriptions, COST, None)) == [(0, 2), (60, 62)]
+
+
+def test_block_never_exceeds_max_registers():
+    descriptions = registers(*range(0, 250, 2), unit=REGISTER_U32)
+    blocks = planBlocks(descriptions, COST, None)
+    assert all(blk.end - blk.start <= COST.max_registers for blk in blocks)
+    assert [reg for blk in blocks for reg in blk.regs] == list(descriptions)
+
+
+def test_blocks_do_not_span_unreadable_ranges():
+    descriptions = registers(0, 1, 10, 11, 20, 21)
+    blocks = planBlocks(descriptions, COST, None, unreadable=[(5, 8), (15, 15)])
+    assert spans(blocks) == [(0, 2), (10, 12), (20, 22)]
+
+
+def test_newblock_forces_a_block_boundary():
+    descriptions = registers(0, 1, 3)
+    descriptions[2] = Description(key="r2", register=2, unit=REGISTER_U16, newblock=True)
+    descriptions = dict(sorted(descriptions.items()))
+    assert spans(planBlocks(descriptions, COST, None)) == [(0, 2), (2, 4)]
+
+
+@pytest.mark.parametrize("auto", [True, False])
+def test_first_block_keeps_the_flag_of_its_first_entity(auto):
+    """Only blocks the planner split off get auto_block_ignore_readerror, like the former splitInBlocks."""
+    descriptions = registers(0, 1, 200, 201)
+    blocks = planBlocks(descriptions, COST, auto)
+    assert spans(blocks) == [(0, 2), (200, 202)]
+    assert [blk.ignore_readerror for blk in blocks] == [False, auto]
+
+
+def test_declared_ignore_readerror_starts_its_own_block():
+    descriptions = registers(0, 1)
+    descriptions[2] = Description(key="r2", register=2, unit=REGISTER_U16, ignore_readerror="unknown")
+    descriptions[3] = Description(key="r3", register=3, unit=REGISTER_U16, newblock=True)
+    blocks = planBlocks(descriptions, COST, True)
+    assert spans(blocks) == [(0, 2), (2, 3), (3, 4)]
+    # declared flags and explicit newblock boundaries are kept, they are not automatically created blocks
+    assert [blk.ignore_readerror for blk in blocks] == [False, "unknown", False]
+
+
+def test_no_automatic_flag_when_auto_is_none():
+    blocks = planBlocks(registers(0, 200), COST, None)
+    assert [blk.ignore_readerror for blk in blocks] == [False, False]
+
+
+def test_byte_values_of_two_groups_share_one_register():
+    low = Description(key="low", register=5, unit=REGISTER_U8L)
+    high = Description(key="high", register=5, unit=REGISTER_U8H)
+    merged = mergeRegisterMaps([{5: low, 9: Description(key="r9", register=9)}, {5: high, 1: Description(key="r1")}])
+    assert list(merged) == [1, 5, 9]
+    assert merged[5] == {REGISTER_U8L: low, REGISTER_U8H: high}
+
+
+def test_reads_data_only_when_the_datadict_is_used():
+    def plain(initval, descr, datadict):
+        return initval * 2
+
+    def reading(initval, descr, datadict):
+        return initval * datadict.get("factor", 1)
+
+    assert not readsData(plain)
+    assert readsData(reading)
+    assert readsData(print)  # unknown callables may read anything
+
+
+def test_key_fragments_match_generated_keys():
+    def voltage(datadict, nr):
+        return datadict.get("battery_" + str(nr) + "_voltage", 0) + datadict.get("pv_" + str(nr), 0)
+
+    fragments = keyFragments(referencedKeys(voltage))
+    assert fragments == {"battery_", "_voltage"}  # "pv_" is too short to tell keys apart
+    assert matchesFragment("battery_2_voltage", fragments)
+    assert not matchesFragment("pv_2", fragments)
@@ -0,0 +1,83 @@
+"""The polling loop: interval groups on a common tick grid, coinciding ticks read in one pass per device."""
+
+import asyncio
+import sys
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.pichler_modbus.const import REGISTER_U16, BaseModbusSensorEntityDescription
+
+from hub import Device, make_hub
+
+hub_module = sys.modules["custom_components.pichler_modbus"]
+
+
+def add_group(hub, interval, *regs):
+    """Interval group polling regs of the inverter."""
+    interval_group = hub.groups.setdefault(interval, hub.empty_interval_group())
+    interval_group.interval = interval
+    group = interval_group.device_groups["inverter"] = hub.empty_device_group()
+    group.holdingRegs = {
+        reg: BaseModbusSensorEntityDescription(key=f"r{reg}", register=reg, unit=REGISTER_U16, scale=1, rounding=0)
+        for reg in regs
+    }
+    hub.plan_device_group(group)
+    return interval_group
+
+
+def test_coinciding_groups_are_read_in_one_pass(tmp_path):
+    device = Device(registers={reg: reg for reg in range(12)})
+
+    async def run():
+        hub = await make_hub(tmp_path, device)
+        fast, slow = add_group(hub, 5, 0, 1, 2), add_group(hub, 60, 8, 9, 10, 11)
+        await hub.async_refresh_modbus_data([fast, slow])
+        merged = hub._merged_groups[("inverter", (5, 60))][1]
+        await hub.async_refresh_modbus_data([fast, slow])
+        await hub.async_refresh_modbus_data([fast])
+        return hub, merged
+
+    hub, merged = asyncio.run(run())
+    assert device.reads == [("holding", 0, 12), ("holding", 0, 12), ("holding", 0, 3)]
+    assert hub._merged_groups[("inverter", (5, 60))][1] is merged  # planned once
+    assert {key: hub.data[key] for key in ("r2", "r11")} == {"r2": 2, "r11": 11}
+
+
+def test_ticks_of_harmonic_intervals_coincide(tmp_path, monkeypatch):
+    monkeypatch.setattr(hub_module, "POLL_TICK_TOLERANCE", 0.02)
+    device = Device()
+
+    async def run():
+        hub = await make_hub(tmp_path, device)
+        fast, slow = add_group(hub, 0.2, 0), add_group(hub, 0.4, 20)
+        task = asyncio.create_task(hub.async_polling_loop())
+        await asyncio.sleep(0.9)  # ticks at 0.2, 0.4, 0.6 and 0.8
+        task.cancel()
+        return fast.timing, slow.timing
+
+    fast, slow = asyncio.run(run())
+    assert (fast.cycles, fast.merged, fast.overruns) == (4, 2, 0)
+    assert (slow.cycles, slow.merged, slow.overruns) == (2, 2, 0)
+    assert device.reads == [("holding", 0, 1), ("holding", 0, 21)] * 2  # merged: one block over both groups
+
+
+def test_overrun_skips_the_missed_ticks(tmp_path):
+    device = Device()
+
+    async def slow_read(unit, address, count, retries=0):
+        await asyncio.sleep(0.35)
+        return device.response("holding", address, count)
+
+    async def run():
+        hub = await make_hub(tmp_path, device)
+        hub.async_read_holding_registers = slow_read
+        fast = add_group(hub, 0.1, 0)
+        task = asyncio.create_task(hub.async_polling_loop())
+        await asyncio.sleep(0.6)  # tick at 0.1 takes until 0.45, the ticks at 0.2, 0.3 and 0.4 are skipped
+        task.cancel()
+        return fast.timing
+
+    timing = asyncio.run(run())
+    assert (timing.cycles, timing.overruns, timing.skipped) == (2, 1, 3)
@@ -0,0 +1,103 @@
+"""The publish filter: state writes dropped within the deadband, held back by the minimum interval, heartbeats."""
+
+import asyncio
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.components.sensor import SensorDeviceClass
+from homeassistant.const import UnitOfPower
+
+from custom_components.pichler_modbus.const import (
+    CONF_PUBLISH_DEADBAND_RELATIVE,
+    CONF_PUBLISH_MIN_INTERVAL,
+    BaseModbusSensorEntityDescription,
+)
+
+from hub import Device, make_hub
+
+hub_module = sys.modules["custom_components.pichler_modbus"]
+
+
+class Entity:
+    """A sensor entity that shows the data of its key and counts its state writes."""
+
+    def __init__(self, hub, key, **fields):
+        self.hub = hub
+        self.entity_description = BaseModbusSensorEntityDescription(key=key, **fields)
+        self.native_value = None
+        self.writes = []
+
+    def update_value(self):
+        self.native_value = self.hub.data.get(self.entity_description.key)
+
+    def modbus_data_updated(self):
+        self.writes.append(self.native_value)
+
+
+class Polling:
+    """Publishes the values of one entity as the polling loop does, at the times of a fake clock."""
+
+    def __init__(self, tmp_path, monkeypatch, options=None, **fields):
+        self.now = 1000.0
+        monkeypatch.setattr(hub_module, "time", lambda: self.now)
+        self.hub = asyncio.run(make_hub(tmp_path, Device(), **(options or {})))
+        self.entity = Entity(self.hub, "power", **fields)
+        self.hub.keyEntities["power"] = [self.entity]
+        self.group = SimpleNamespace(sensors=[self.entity])
+
+    def poll(self, value, after=5):
+        self.now += after
+        changed = self.hub.data.get("power") != value
+        self.hub.data["power"] = value
+        self.hub.changedKeys = {"power"} if changed else set()
+        self.hub.publish_changes([self.group], [])
+        return self.entity.writes
+
+
+def test_changes_within_the_deadband_are_dropped(tmp_path, monkeypatch):
+    polling = Polling(tmp_path, monkeypatch, publish_deadband=5)
+    for value in (100, 103, 97, 106, 104):
+        writes = polling.poll(value)
+    assert writes == [100, 106]
+    assert polling.hub.publishStats["deadband"] == 3
+
+
+def test_changes_are_held_back_until_the_minimum_interval_passed(tmp_path, monkeypatch):
+    polling = Polling(tmp_path, monkeypatch, publish_min_interval=30)
+    polling.poll(100)
+    polling.poll(200)
+    polling.poll(300)
+    assert polling.entity.writes == [100]
+    polling.poll(300, after=25)  # unchanged, but the held back change is due now
+    assert polling.entity.writes == [100, 300]
+
+
+def test_unchanged_values_are_published_again_after_the_maximum_interval(tmp_path, monkeypatch):
+    polling = Polling(tmp_path, monkeypatch, publish_max_interval=60)
+    for _ in range(13):
+        writes = polling.poll(100)
+    assert writes == [100, 100]  # the first read, and the heartbeat 60s later
+
+
+def test_entry_options_override_the_description(tmp_path, monkeypatch):
+    options = {CONF_PUBLISH_DEADBAND_RELATIVE: 10, CONF_PUBLISH_MIN_INTERVAL: 0}
+    polling = Polling(tmp_path, monkeypatch, options, publish_deadband_relative=0.5)
+    for value in (100, 105, 111):
+        writes = polling.poll(value)
+    assert writes == [100, 111]  # 10% of the last published value
+
+
+def test_plugin_defaults_apply_by_device_class_and_unit(tmp_path, monkeypatch):
+    polling = Polling(
+        tmp_path, monkeypatch, device_class=SensorDeviceClass.POWER, native_unit_of_measurement=UnitOfPower.WATT
+    )
+    monkeypatch.setattr(
+        polling.hub.plugin, "publish_defaults", {(SensorDeviceClass.POWER, UnitOfPower.WATT): {"publish_deadband": 5}}
+    )
+    for value in (100, 103, 110):
+        writes = polling.poll(value)
+    assert writes == [100, 110]
@@ -0,0 +1,57 @@
+"""While the inverter sleeps, the hub reads only the registers of the wake_keys of the plugin."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from custom_components.pichler_modbus.const import REGISTER_U16, BaseModbusSensorEntityDescription
+
+from hub import Device, make_hub
+
+
+def description(key, reg):
+    return BaseModbusSensorEntityDescription(key=key, register=reg, unit=REGISTER_U16, scale=1, rounding=0)
+
+
+async def sleeping_hub(tmp_path, device, monkeypatch):
+    """A hub whose slow group polls the pv voltage and whose fast group the run mode and the power."""
+    hub = await make_hub(tmp_path, device)
+    monkeypatch.setattr(hub.plugin, "wake_keys", ["run_mode", "pv_voltage"])
+    monkeypatch.setattr(hub.plugin, "isAwake", lambda datadict: datadict.get("run_mode") == 1)
+    for interval, regs in ((60, {200: description("pv_voltage", 200)}), (5, {10: description("run_mode", 10)})):
+        interval_group = hub.groups.setdefault(interval, hub.empty_interval_group())
+        interval_group.device_groups["inverter"] = hub.empty_device_group()
+        interval_group.device_groups["inverter"].holdingRegs = regs
+    hub.groups[5].device_groups["inverter"].holdingRegs[11] = description("power", 11)
+    return hub
+
+
+def test_sleep_group_reads_the_wake_registers_in_order(tmp_path, monkeypatch):
+    async def run():
+        hub = await sleeping_hub(tmp_path, Device(), monkeypatch)
+        return hub.sleep_group()
+
+    group = asyncio.run(run())
+    assert list(group.holdingRegs) == [10, 200]  # the slow group comes first in the groups of the hub
+    assert [(blk.start, blk.end) for blk in group.holdingBlocks] == [(10, 11), (200, 201)]
+
+
+def test_probe_wakes_the_hub_up(tmp_path, monkeypatch):
+    device = Device(registers={10: 0, 11: 500, 200: 80})
+
+    async def run():
+        hub = await sleeping_hub(tmp_path, device, monkeypatch)
+        hub.enter_sleep(60)
+        hub.nextWakeProbe = 0
+        asleep = await hub.async_probe_wake()
+        device.registers[10] = 1
+        hub.nextWakeProbe = 0
+        awake = await hub.async_probe_wake()
+        return hub, asleep, awake
+
+    hub, asleep, awake = asyncio.run(run())
+    assert (asleep, awake, hub.asleep) == (False, True, False)
+    assert {address for _, address, _ in device.reads} == {10, 200}  # the power is not read while asleep
+    assert hub.sleepStats == {"sleeps": 1, "probes": 2}
@@ -0,0 +1,138 @@
+"""The link scheduler: priorities, fair shares, serial frame gaps, the circuit breaker and the request timeouts."""
+
+import asyncio
+
+import pytest
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+
+from custom_components.pichler_modbus import transport
+from custom_components.pichler_modbus.const_base import (
+    LINK_BACKING_OFF,
+    LINK_BACKOFF_MIN,
+    LINK_CONNECTED,
+    LINK_DEGRADED,
+    LINK_FAILURE_THRESHOLD,
+    LINK_LATENCY_MIN_SAMPLES,
+    LINK_TIMEOUT_FACTOR,
+    PRIORITY_READ_FAST,
+    PRIORITY_READ_SLOW,
+    PRIORITY_WRITE,
+)
+from custom_components.pichler_modbus.transport import LatencyTracker, ModbusLink, request_group, request_priority
+
+
+def make_link(frame_gap=0.0):
+    """A link whose client is never connected, the test runs the requests; call it with a running event loop."""
+    return ModbusLink("test", AsyncModbusTcpClient("127.0.0.1", port=1), frame_gap=frame_gap)
+
+
+async def issue(link, order, name, unit=1, group=None, priority=PRIORITY_READ_SLOW, hold=0.0):
+    request_group.set(group)
+    request_priority.set(priority)
+    async with link.request(unit):
+        order.append(name)
+        await asyncio.sleep(hold)
+
+
+async def queued(requests, weights=None):
+    """Order in which requests (name, issue keywords) are granted while the link is busy with another one."""
+    link = make_link()
+    for (unit, group), weight in (weights or {}).items():
+        link.set_weight(unit, group, weight)
+    order = []
+    tasks = [asyncio.create_task(issue(link, order, "busy", unit=0, hold=0.02))]
+    await asyncio.sleep(0)
+    for name, options in requests:
+        tasks.append(asyncio.create_task(issue(link, order, name, **options)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    return order[1:]
+
+
+def test_write_goes_before_waiting_reads():
+    requests = [("read1", {}), ("read2", {"priority": PRIORITY_READ_FAST}), ("write", {"priority": PRIORITY_WRITE})]
+    assert asyncio.run(queued(requests)) == ["write", "read2", "read1"]
+
+
+@pytest.mark.parametrize(
+    "weight, expected",
+    [(1, ["a1", "b1", "a2", "b2", "a3", "b3"]), (2, ["a1", "b1", "a2", "a3", "b2", "b3"])],
+)
+def test_flows_share_the_link_by_weight(weight, expected):
+    requests = [(f"{group}{nr}", {"group": group}) for group in "ab" for nr in (1, 2, 3)]
+    assert asyncio.run(queued(requests, {(1, "a"): weight})) == expected
+
+
+def test_serial_frames_keep_their_gap():
+    starts = []
+
+    async def run():
+        link = make_link(frame_gap=0.05)
+        for _ in range(2):
+            async with link.request(1):
+                starts.append(asyncio.get_running_loop().time())
+
+    asyncio.run(run())
+    assert starts[1] - starts[0] >= 0.05
+
+
+def test_circuit_opens_fails_fast_and_closes_after_a_trial(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(transport, "monotonic", lambda: now[0])
+    transitions = []
+
+    async def request(link, error=None):
+        async with link.request(1):
+            if error is not None:
+                raise error
+
+    async def run():
+        link = make_link()
+        link.listeners.append(lambda key, previous, state: transitions.append((previous, state)))
+        for _ in range(LINK_FAILURE_THRESHOLD):
+            with pytest.raises(ModbusIOException):
+                await request(link, ModbusIOException("no response"))
+        assert link.circuit_open
+        with pytest.raises(ConnectionException):  # fails fast, the request is not sent
+            await request(link)
+        now[0] += LINK_BACKOFF_MIN * 2
+        with pytest.raises(ModbusIOException):  # the trial fails: the backoff doubles
+            await request(link, ModbusIOException("no response"))
+        backoff = link._backoff
+        now[0] += LINK_BACKOFF_MIN * 4
+        await request(link)
+        return link, backoff
+
+    link, backoff = asyncio.run(run())
+    assert backoff == LINK_BACKOFF_MIN * 2
+    assert (link.state, link.circuit_open) == (LINK_CONNECTED, False)
+    assert transitions == [
+        (LINK_CONNECTED, LINK_DEGRADED),
+        (LINK_DEGRADED, LINK_BACKING_OFF),
+        (LINK_BACKING_OFF, LINK_CONNECTED),
+    ]
+
+
+def test_errors_of_the_caller_do_not_count_as_link_failures():
+    async def run():
+        link = make_link()
+        for _ in range(LINK_FAILURE_THRESHOLD):
+            with pytest.raises(ValueError):
+                async with link.request(1):
+                    raise ValueError("decoding failed")
+        return link
+
+    link = asyncio.run(run())
+    assert (link.state, link.circuit_open) == (LINK_CONNECTED, False)
+
+
+def test_timeout_follows_the_round_trips():
+    tracker = LatencyTracker(5.0)
+    for _ in range(LINK_LATENCY_MIN_SAMPLES):
+        tracker.add(0.2)
+    assert tracker.timeout == pytest.approx(0.2 * LINK_TIMEOUT_FACTOR)
+    tracker.timed_out()  # a single lost frame leaves the timeout alone
+    assert tracker.timeout == pytest.approx(0.2 * LINK_TIMEOUT_FACTOR)
+    tracker.timed_out()
+    assert tracker.timeout == pytest.approx(0.4 * LINK_TIMEOUT_FACTOR)
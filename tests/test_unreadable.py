@@ -0,0 +1,97 @@
+"""The hub learns the register ranges a device rejects, plans around them and probes them again later."""
+
+import asyncio
+from time import time
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from pymodbus.pdu import ExceptionResponse
+
+from custom_components.pichler_modbus.const import (
+    REGISTER_U16,
+    UNREADABLE_REPROBE_INTERVAL,
+    BaseModbusSensorEntityDescription,
+)
+from custom_components.pichler_modbus.planner import block
+
+from hub import Device, make_hub
+
+
+def holding_block(*regs):
+    descriptions = {
+        reg: BaseModbusSensorEntityDescription(key=f"r{reg}", register=reg, unit=REGISTER_U16, scale=1, rounding=0)
+        for reg in regs
+    }
+    return block(start=regs[0], end=regs[-1] + 1, descriptions=descriptions, regs=list(regs))
+
+
+def read_block(tmp_path, device, blk):
+    """(read succeeded, decoded values, learned holding ranges) of one block read."""
+
+    async def read():
+        hub = await make_hub(tmp_path, device)
+        data = hub.data.cycle()
+        ok = await hub.async_read_modbus_block(data, blk, "holding")
+        return ok, dict(data), dict(hub.unreadable["holding"])
+
+    return asyncio.run(read())
+
+
+def test_rejected_register_is_learned_and_the_rest_decoded(tmp_path):
+    device = Device(registers={reg: 100 + reg for reg in range(8)}, rejected=[5])
+    ok, data, learned = read_block(tmp_path, device, holding_block(*range(8)))
+    assert ok
+    assert list(learned) == [(5, 6)]
+    assert data == {f"r{reg}": 100 + reg for reg in range(8) if reg != 5}
+
+
+def test_rejected_length_learns_a_split(tmp_path):
+    device = Device(registers={reg: reg for reg in range(8)})
+    device.max_count = 4
+    ok, data, learned = read_block(tmp_path, device, holding_block(*range(8)))
+    assert ok
+    assert list(learned) == [(4, 4)]  # no register is rejected, blocks may just not span register 4
+    assert len(data) == 8
+
+
+@pytest.mark.parametrize(
+    "code",
+    [ExceptionResponse.SLAVE_BUSY, ExceptionResponse.GATEWAY_PATH_UNAVIABLE, ExceptionResponse.GATEWAY_NO_RESPONSE],
+)
+def test_busy_and_gateway_exceptions_are_not_rejections(tmp_path, code):
+    device = Device(rejected=[5], exception_code=code)
+    ok, data, learned = read_block(tmp_path, device, holding_block(*range(8)))
+    assert not ok
+    assert learned == {}
+    assert len(device.reads) == 1  # no bisection
+
+
+def test_learned_ranges_expire_and_are_probed_again(tmp_path):
+    async def run():
+        hub = await make_hub(tmp_path, Device())
+        hub.learn_unreadable("holding", [(5, 6), (9, 9)])
+        hub.unreadable["holding"][(5, 6)] = time() - UNREADABLE_REPROBE_INTERVAL - 1
+        assert hub.expire_unreadable()
+        assert list(hub.unreadable["holding"]) == [(9, 9)]
+        assert not hub.expire_unreadable()
+        hub.learn_unreadable("holding", [(5, 6)])  # still rejected: learned again, quietly
+        return hub
+
+    hub = asyncio.run(run())
+    assert set(hub.unreadable["holding"]) == {(5, 6), (9, 9)}
+
+
+def test_stored_ranges_without_a_learn_time_are_loaded(tmp_path):
+    async def run():
+        hub = await make_hub(tmp_path, Device())
+        hub._unreadable_stored = {"sn_1": {"holding": [[5, 6]], "input": [[1, 3, 1000.0]]}}
+        hub.select_unreadable("sn_1")
+        return hub
+
+    before = time()
+    hub = asyncio.run(run())
+    assert hub.unreadable["input"] == {(1, 3): 1000.0}
+    assert list(hub.unreadable["holding"]) == [(5, 6)]
+    assert hub.unreadable["holding"][(5, 6)] >= before  # counts as learned at load time
@@ -0,0 +1,119 @@
+"""Writes deferred while the inverter sleeps: coalesced per register, merged in runs, retried and persisted."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.pdu.register_message import WriteMultipleRegistersResponse
+
+from custom_components.pichler_modbus import writequeue
+from custom_components.pichler_modbus.const import WRITEQUEUE_BACKOFF, WRITEQUEUE_MAX_REGISTERS, WRITEQUEUE_MAX_RETRIES
+from custom_components.pichler_modbus.writequeue import DeferredWriteQueue
+
+
+class Writer:
+    """write(unit, address, values) of the hub; answers with an error response while failing is set."""
+
+    def __init__(self, failing=False):
+        self.failing = failing
+        self.writes = []
+
+    async def __call__(self, unit, address, values):
+        self.writes.append((unit, address, list(values)))
+        if self.failing == "raise":
+            raise HomeAssistantError("no connection")
+        if self.failing:
+            return ExceptionResponse(16, ExceptionResponse.SLAVE_FAILURE)
+        return WriteMultipleRegistersResponse(address=address, count=len(values))
+
+
+def run(tmp_path, test):
+    async def main():
+        hass = HomeAssistant(str(tmp_path))
+        return await test(hass, DeferredWriteQueue(hass, "test"))
+
+    return asyncio.run(main())
+
+
+def test_later_writes_replace_queued_values_and_consecutive_registers_merge(tmp_path):
+    async def test(hass, queue):
+        queue.add(1, 10, [1, 2])
+        queue.add(1, 11, [3])
+        queue.add(1, 12, [4])
+        queue.add(2, 13, [5])
+        return queue.runs(0.0)
+
+    assert run(tmp_path, test) == [(1, 10, [1, 3, 4]), (2, 13, [5])]
+
+
+def test_runs_respect_the_request_limit(tmp_path):
+    async def test(hass, queue):
+        queue.add(1, 0, list(range(WRITEQUEUE_MAX_REGISTERS + 1)))
+        return [(address, len(values)) for _, address, values in queue.runs(0.0)]
+
+    assert run(tmp_path, test) == [(0, WRITEQUEUE_MAX_REGISTERS), (WRITEQUEUE_MAX_REGISTERS, 1)]
+
+
+def test_flush_writes_the_runs_and_empties_the_queue(tmp_path):
+    writer = Writer()
+
+    async def test(hass, queue):
+        queue.add(1, 10, [1, 2])
+        queue.add(1, 20, [3])
+        return await queue.async_flush(writer), queue.statistics()
+
+    empty, statistics = run(tmp_path, test)
+    assert empty
+    assert writer.writes == [(1, 10, [1, 2]), (1, 20, [3])]
+    assert (statistics["requests"], statistics["written"], statistics["queued"]) == (2, 3, 0)
+
+
+@pytest.mark.parametrize("failing", [True, "raise"])
+def test_failed_writes_back_off_and_are_dropped_after_the_retries(tmp_path, monkeypatch, failing):
+    now = [1000.0]
+    monkeypatch.setattr(writequeue, "monotonic", lambda: now[0])
+    writer = Writer(failing)
+
+    async def test(hass, queue):
+        queue.add(1, 10, [1])
+        assert not await queue.async_flush(writer)
+        await queue.async_flush(writer)  # backing off: not sent again
+        sent = len(writer.writes)
+        for _ in range(WRITEQUEUE_MAX_RETRIES):
+            now[0] += WRITEQUEUE_BACKOFF * 2**WRITEQUEUE_MAX_RETRIES
+            await queue.async_flush(writer)
+        return sent, len(queue), queue.dropped
+
+    assert run(tmp_path, test) == (1, 0, 1)
+    assert len(writer.writes) == WRITEQUEUE_MAX_RETRIES + 1
+
+
+def test_value_replaced_during_the_write_stays_queued(tmp_path):
+    async def test(hass, queue):
+        async def write(unit, address, values):
+            queue.add(unit, address, [9])  # e.g. the user changed the setting again meanwhile
+            return WriteMultipleRegistersResponse(address=address, count=len(values))
+
+        queue.add(1, 10, [1])
+        return await queue.async_flush(write), queue.runs(0.0)
+
+    assert run(tmp_path, test) == (False, [(1, 10, [9])])
+
+
+def test_queue_is_restored_with_its_failed_attempts(tmp_path):
+    async def test(hass, queue):
+        queue.add(1, 10, [1, 2])
+        await queue.async_flush(Writer(failing=True))
+        await queue._store.async_save(queue._data_to_save())
+        restored = DeferredWriteQueue(hass, "test")
+        await restored.async_load()
+        return restored.runs(0.0), restored._retries
+
+    runs, retries = run(tmp_path, test)
+    assert runs == [(1, 10, [1, 2])]  # due right away after a restart
+    assert retries == {(1, 10): (1, 0.0), (1, 11): (1, 0.0)}